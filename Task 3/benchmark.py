@@ -0,0 +1,84 @@
+"""
+Extraction Benchmark for the News Scraper
+Runs the headline extraction engine over saved pages and reports parse time
+per source, for both the full html.parser path and the fast path (or, with
+--lxml, the lxml path), checking that both find the same headlines. Pages
+are read from the fixtures directory, named after the source (e.g. "BBC
+News" -> bbc-news.html, "Reddit r/news" -> reddit-r-news.json). The
+committed fixtures are written by make_fixtures.py:
+
+    python benchmark.py --fixtures fixtures/ --rounds 20
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from news_scraper import DEFAULT_SOURCES, extract, load_sources
+
+
+def fixture_name(source):
+    """Return the fixture file name for a source"""
+    slug = re.sub(r'[^a-z0-9]+', '-', source['name'].lower()).strip('-')
+    extension = 'json' if source.get('type', 'html') == 'json' else 'html'
+    return f"{slug}.{extension}"
+
+
+def time_extract(content, source, rounds, fast, use_lxml=False):
+    """Return (headlines, seconds per extraction)"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        headlines = extract(content, source, fast, use_lxml)
+    return headlines, (time.perf_counter() - start) / rounds
+
+
+def same_headlines(content, source, use_lxml=False):
+    """
+    Check that both paths find the same headlines, comparing every match
+    of every rule rather than only the first `limit`
+    """
+    unlimited = dict(source, limit=sys.maxsize)
+    if 'selectors' in source:
+        unlimited['selectors'] = [{key: value for key, value in rule.items() if key != 'only_if_fewer_than'}
+                                  for rule in source['selectors']]
+    return extract(content, unlimited, fast=False) == extract(content, unlimited, fast=True, use_lxml=use_lxml)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headline extraction against saved pages")
+    parser.add_argument('--sources', help="JSON file of sources (default: built-in sources)")
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'),
+                        help="Directory of saved pages (default: the fixtures made by make_fixtures.py)")
+    parser.add_argument('--rounds', type=int, default=20, help="Extractions per page")
+    parser.add_argument('--lxml', action='store_true', help="Time the opt-in lxml path as the fast path")
+    args = parser.parse_args()
+
+    sources = load_sources(args.sources) if args.sources else DEFAULT_SOURCES
+
+    print("=" * 78)
+    print(f"{'Source':<24}{'Page KB':>9}{'Headlines':>11}{'Full ms':>10}{'Fast ms':>10}{'Speedup':>9}{'Same':>5}")
+    print("-" * 78)
+    totals = [0.0, 0.0]
+    for source in sources:
+        path = os.path.join(args.fixtures, fixture_name(source))
+        if not os.path.exists(path):
+            print(f"{source['name']:<24}  (no fixture: {fixture_name(source)})")
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        expected, full = time_extract(content, source, args.rounds, fast=False)
+        headlines, fast = time_extract(content, source, args.rounds, fast=True, use_lxml=args.lxml)
+        totals[0] += full
+        totals[1] += fast
+        print(f"{source['name']:<24}{len(content) / 1024:>9.0f}{len(headlines):>11}"
+              f"{full * 1e3:>10.2f}{fast * 1e3:>10.2f}{full / max(fast, 1e-9):>8.1f}x"
+              f"{'yes' if headlines == expected and same_headlines(content, source, args.lxml) else 'NO':>5}")
+    print("=" * 78)
+    print(f"Total per round: {totals[0] * 1e3:.2f} ms full, {totals[1] * 1e3:.2f} ms fast")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Headline history for the News Scraper.
+An append-only SQLite table of every headline ever scraped, keyed by source
+and headline hash, with the first and last time each one was seen.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+class HeadlineStore:
+    """
+    SQLite-backed headline history.
+
+    Recording a scrape inserts only headlines not stored yet and bumps
+    last_seen on the others, in one transaction; nothing is rewritten.
+    first_seen is indexed, so "what's new since T" doesn't scan the table.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS headlines (
+            source TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            headline TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            PRIMARY KEY (source, hash)
+        );
+        CREATE INDEX IF NOT EXISTS headlines_first_seen ON headlines (first_seen);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def headline_hash(key):
+        """Stable hash of a normalized headline key"""
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def record(self, source, entries, seen_at=None):
+        """
+        Record one scrape of a source. `entries` are (key, headline) pairs,
+        where key is the normalized headline used for de-duplication.
+        Returns the headlines that were not in the store before.
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        rows = [(source, self.headline_hash(key), headline, seen_at, seen_at)
+                for key, headline in entries]
+        if not rows:
+            return []
+
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                new = []
+                for row in rows:
+                    cursor = self._conn.execute(
+                        'INSERT OR IGNORE INTO headlines (source, hash, headline, first_seen, last_seen) '
+                        'VALUES (?, ?, ?, ?, ?)', row)
+                    if cursor.rowcount:
+                        new.append(row[2])
+                self._conn.executemany(
+                    'UPDATE headlines SET last_seen = ? WHERE source = ? AND hash = ? AND last_seen < ?',
+                    [(seen_at, row[0], row[1], seen_at) for row in rows])
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return new
+
+    def new_since(self, since, source=None):
+        """Return (source, headline, first_seen) for headlines first seen after `since`, oldest first"""
+        query = 'SELECT source, headline, first_seen FROM headlines WHERE first_seen > ?'
+        params = [since]
+        if source is not None:
+            query += ' AND source = ?'
+            params.append(source)
+        with self._lock:
+            return self._conn.execute(query + ' ORDER BY first_seen', params).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM headlines').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+"""
+On-disk HTTP cache for the News Scraper.
+Keeps each page's body, validators (ETag / Last-Modified) and extracted
+headlines, so an unchanged page costs one conditional request and a
+304 Not Modified answer instead of a download and a parse.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def cache_key(url):
+    """File name stem for a URL"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    """A cached page: validators, extracted headlines and the body on disk"""
+
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.url = meta['url']
+        self.etag = meta.get('etag')
+        self.last_modified = meta.get('last_modified')
+        self.fingerprint = meta.get('fingerprint')
+        self.headlines = meta.get('headlines', [])
+
+    def validators(self):
+        """Request headers that turn the next GET into a conditional one"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def body(self):
+        """Read the cached page body"""
+        with open(self.cache.path(self.key, '.body'), 'rb') as f:
+            return f.read()
+
+
+class PageCache:
+    """
+    Directory of cached pages, one <sha1(url)>.json (metadata) plus
+    <sha1(url)>.body per URL.
+
+    Entries not validated for `ttl` seconds are dropped, and once the bodies
+    take more than `max_bytes` the least recently used pages are evicted.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, directory, ttl=24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0      # 304 Not Modified answers
+        self.misses = 0    # full downloads
+        self._lock = threading.Lock()
+        self._index = {}   # key -> [body size, last used time]
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _load_index(self):
+        """Rebuild the size/recency index from the files on disk, dropping expired entries"""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            key, suffix = os.path.splitext(name)
+            if suffix != '.json':
+                continue
+            try:
+                size = os.path.getsize(self.path(key, '.body'))
+                used = os.path.getmtime(self.path(key, '.json'))
+            except OSError:
+                self._delete(key)
+                continue
+            if now - used > self.ttl:
+                self._delete(key)
+                continue
+            self._index[key] = [size, used]
+            self._total += size
+        self._evict()
+
+    def get(self, url):
+        """Return the CacheEntry for a URL, or None if missing or expired"""
+        key = cache_key(url)
+        with self._lock:
+            info = self._index.get(key)
+            if info is None:
+                return None
+            if time.time() - info[1] > self.ttl:
+                self._remove(key)
+                return None
+        try:
+            with open(self.path(key, '.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+        return CacheEntry(self, key, meta)
+
+    def revalidated(self, entry, headlines=None, fingerprint=None):
+        """Record a 304 for an entry, optionally with re-extracted headlines"""
+        with self._lock:
+            self.hits += 1
+            info = self._index.get(entry.key)
+            if info is None:
+                return   # Evicted meanwhile
+            info[1] = time.time()
+        if headlines is not None:
+            entry.headlines = headlines
+            entry.fingerprint = fingerprint
+        # Rewriting the metadata also refreshes its mtime, which is the
+        # entry's last-used time after a restart
+        self._write_meta(entry.key, {
+            'url': entry.url,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'fingerprint': entry.fingerprint,
+            'headlines': entry.headlines
+        })
+
+    def store(self, url, response, headlines, fingerprint):
+        """Cache a full 200 response and the headlines extracted from it"""
+        with self._lock:
+            self.misses += 1
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return   # Nothing to revalidate with
+
+        key = cache_key(url)
+        body = response.content
+        self._write(self.path(key, '.body'), body)
+        self._write_meta(key, {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fingerprint': fingerprint,
+            'headlines': headlines
+        })
+
+        with self._lock:
+            old = self._index.get(key)
+            if old is not None:
+                self._total -= old[0]
+            self._index[key] = [len(body), time.time()]
+            self._total += len(body)
+            self._evict()
+
+    def _write_meta(self, key, meta):
+        self._write(self.path(key, '.json'), json.dumps(meta).encode('utf-8'))
+
+    def _write(self, path, data):
+        """Write a file atomically, so readers never see half of it"""
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (lock held)"""
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def _remove(self, key):
+        """Forget an entry and delete its files (lock held)"""
+        info = self._index.pop(key, None)
+        if info is not None:
+            self._total -= info[0]
+        self._delete(key)
+
+    def _delete(self, key):
+        for suffix in ('.json', '.body'):
+            try:
+                os.remove(self.path(key, suffix))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,162 @@
+"""
+Fixture Pages for the News Scraper
+Writes synthetic pages shaped like each built-in source (the same tags,
+classes and nesting the selectors look for, surrounded by navigation noise)
+into a directory, named as benchmark.py expects:
+
+    python make_fixtures.py --out fixtures/
+
+Pages are generated from a fixed seed, so every run writes the same files.
+Each HTML page also carries markup that the full and fast extraction paths
+must treat alike: entities, comments, scripts and styles, ruby text,
+headings inside <template>, unclosed, misnested and upper-case tags,
+nested inline tags and non-ASCII text.
+"""
+
+import argparse
+import json
+import os
+import random
+
+from benchmark import fixture_name
+from news_scraper import DEFAULT_SOURCES
+
+WORDS = ("storm market election court climate football minister bank tech health talks "
+         "river border strike budget rescue vote summit launch record city").split()
+
+# Markup inserted between the generated blocks of every HTML page
+AWKWARD_MARKUP = (
+    '<p>Unclosed paragraph with <b>bold text',
+    '<!-- <h3>Commented-out headline, not on the page</h3> -->',
+    '<script>var fake = "<h3>Headline inside a script string</h3>";</script>',
+    '<h3>Caf&eacute; &amp; bar owners protest new licence rules</h3>',
+    '<h3>Heading <i>with</i> inline <b>markup</b> and a <a href="#">link</a> in it</h3>',
+    '<table><tr><td><h3>Headline inside an unclosed table cell</h3></table>',
+    '<h3>Ruby <ruby>漢<rt>kan</rt></ruby> headline with a <style>.x{color:red}</style>style block</h3>',
+    '<h2 data-testid="card-headline"><span>Span</span> tail text &nbsp; and more after it</h2>',
+    '<H3 CLASS="Big">UPPER CASE TAG headline text here</H3>',
+    '<span class="titleline extra"><b>no</b><a href="#">Link nested after a bold tag in titleline</a></span>',
+    '<a class="dcr-lv2v9o" href="#">Card link without a span</a>',
+    '<h3>Émoji 🎉 and accents é ü ß in a headline</h3>',
+    '<h3>  Spaced   \n  out\theadline  with line breaks  </h3>',
+    '<h3><!-- comment -->Headline with a comment at the start</h3>',
+    '<template><h3>Headline inside a template, never shown</h3><h2 data-testid="card-headline">Templated card</h2></template>',
+    '<a class="dcr-lv2v9o" href="#"><template><div><span>Card span inside a template</span></div></template></a>',
+    '<ruby>x<rt><h3>Heading inside ruby annotation text</h3></rt></ruby>',
+    '<div class="promo"><h3>Heading closed by its parent</div> trailing text</h3>',
+    '<h3>Heading with an unclosed<p>paragraph inside it</h3>',
+    '<title><h3>Heading inside a stray title tag</h3></title>',
+    '<textarea><h3>Heading inside a textarea</h3></textarea>',
+)
+
+
+def headline(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def noise(rng, blocks):
+    """Navigation and article-teaser markup the selectors must ignore"""
+    return "".join(
+        f'<div class="wrap c{i % 7}"><p>{headline(rng, 30)}</p><ul>'
+        + "".join(f'<li><a href="/x{j}">{headline(rng, 3)}</a></li>' for j in range(8))
+        + '</ul></div>'
+        for i in range(blocks))
+
+
+def with_awkward_markup(rng, parts):
+    """Spread AWKWARD_MARKUP between the page's blocks"""
+    for markup in AWKWARD_MARKUP:
+        parts.insert(rng.randrange(len(parts) + 1), markup)
+    return parts
+
+
+def page(body, charset='utf-8', title='News'):
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="{charset}"><title>{title}</title>'
+            f'<script>window.__DATA__ = {{"page": "home"}};</script></head><body>{body}</body></html>')
+
+
+def bbc_page(rng, blocks=150):
+    parts = []
+    for i in range(blocks):
+        kind = i % 5
+        if kind == 0:
+            parts.append(f'<div><h2 data-testid="card-headline">{headline(rng, rng.randint(1, 9))}</h2></div>')
+        elif kind == 1:
+            parts.append(f'<h3><span>{headline(rng, rng.randint(1, 9))}</span> <b>{headline(rng, 2)}</b></h3>')
+        elif kind == 2:
+            parts.append(f'<a class="sc-2e6baa30-0 other" href="#">{headline(rng, rng.randint(2, 8))}</a>')
+        elif kind == 3:
+            parts.append(f'<h2 data-testid="other">{headline(rng, 5)}</h2>')
+        else:
+            parts.append(noise(rng, 1))
+    parts.append('<h2 data-testid="card-headline">  Repeated story   </h2>' * 3)
+    return page("".join(with_awkward_markup(rng, parts)), title='BBC News').encode('utf-8')
+
+
+def hacker_news_page(rng, rows=60):
+    parts = []
+    for i in range(rows):
+        parts.append(f'<tr class="athing"><td class="title"><span class="titleline">'
+                     f'<a href="https://example.com/{i}">{headline(rng, rng.randint(1, 8))}</a>'
+                     f'<span class="sitebit comhead"> (<a href="from?site=example.com">example.com</a>)</span>'
+                     f'</span></td></tr>')
+        if i % 9 == 0:
+            parts.append('<tr><td><span class="titleline">Ask HN item without a link</span></td></tr>')
+    parts.append(f'<tr><td>{noise(rng, 30)}</td></tr>')
+    body = '<table id="hnmain">' + "".join(with_awkward_markup(rng, parts)) + '</table>'
+    return page(body, title='Hacker News').encode('utf-8')
+
+
+def guardian_page(rng, blocks=150):
+    parts = []
+    for i in range(blocks):
+        if i % 4 == 0:
+            parts.append(f'<a class="dcr-lv2v9o" href="#"><div><span>{headline(rng, rng.randint(1, 8))}</span>'
+                         f'<span>x</span></div></a>')
+        elif i % 4 == 1:
+            parts.append(f'<h3>{headline(rng, rng.randint(1, 8))}</h3>')
+        else:
+            parts.append(noise(rng, 1))
+    parts.append('<h3>Pound falls as café owners fear “higher costs”</h3>')
+    # Served as windows-1252, so the encoding has to be detected
+    markup = [markup for markup in with_awkward_markup(rng, parts)
+              if markup.encode('cp1252', errors='ignore').decode('cp1252') == markup]
+    return page("".join(markup), charset='windows-1252', title='The Guardian').encode('cp1252')
+
+
+def reddit_json(rng, posts=30):
+    children = [{"kind": "t3", "data": {"title": headline(rng, rng.randint(1, 6)), "score": rng.randint(1, 5000)}}
+                for _ in range(posts)]
+    children.append({"kind": "t3", "data": {"title": "", "score": 0}})
+    return json.dumps({"kind": "Listing", "data": {"children": children}}).encode('utf-8')
+
+
+# Page generator per built-in source
+GENERATORS = {
+    "BBC News": bbc_page,
+    "Hacker News": hacker_news_page,
+    "The Guardian": guardian_page,
+    "Reddit r/news": reddit_json,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic fixture pages for benchmark.py")
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'),
+                        help="Directory to write the pages to")
+    parser.add_argument('--seed', type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for number, source in enumerate(DEFAULT_SOURCES):
+        generate = GENERATORS.get(source['name'])
+        if generate is None:
+            continue
+        path = os.path.join(args.out, fixture_name(source))
+        with open(path, 'wb') as f:
+            f.write(generate(random.Random(args.seed + number)))
+        print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,323 @@
 """
 News Headlines Web Scraper
 Scrapes top headlines from news websites and saves them to a text file.
+
+Sources are declared as config entries (see DEFAULT_SOURCES) and scraped by
+one generic engine; pass --sources to load them from a JSON file instead.
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+from bs4.builder import HTMLTreeBuilder
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
 import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict, deque
 from datetime import datetime
+from headline_store import HeadlineStore
+from http_cache import PageCache
+from poller import Poller
+
+# The opt-in lxml extraction path (--lxml) needs lxml (pip install lxml)
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Built-in sources, in display order. Each entry is:
+#   name       - source name shown in the menu and output
+#   url        - page to fetch
+#   type       - "html" (default) or "json"
+#   selectors  - html: rules applied in order, each with
+#                  select              CSS selector for candidate elements
+#                  then                CSS selectors followed inside each candidate
+#                                      (first match only), e.g. a link inside a span
+#                  min_length          shortest headline kept (default 1)
+#                  only_if_fewer_than  skip the rule once this many headlines were found
+#   items      - json: dotted path to the list of items
+#   field      - json: dotted path to the headline inside each item
+#   min_length - json: shortest headline kept (default 1)
+#   limit      - headlines kept per source (default 15)
+#   headers    - extra request headers (optional)
+#   timeout    - request timeout / scrape-all deadline in seconds (optional)
+#   interval   - seconds between polls in daemon mode (optional)
+#   note       - shown next to the name in the menu (optional)
+DEFAULT_SOURCES = [
+    {
+        "name": "BBC News",
+        "url": "https://www.bbc.com/news",
+        "selectors": [
+            {"select": "h2[data-testid='card-headline']"},
+            {"select": "h3", "min_length": 21},
+            {"select": "a.sc-2e6baa30-0", "min_length": 21}
+        ]
+    },
+    {
+        "name": "Hacker News",
+        "url": "https://news.ycombinator.com/",
+        "selectors": [
+            {"select": "span.titleline", "then": ["a"]}
+        ]
+    },
+    {
+        "name": "The Guardian",
+        "url": "https://www.theguardian.com/international",
+        "selectors": [
+            {"select": "a.dcr-lv2v9o", "then": ["span"], "min_length": 16},
+            {"select": "h3", "min_length": 16, "only_if_fewer_than": 10}
+        ]
+    },
+    {
+        "name": "Reddit r/news",
+        "url": "https://www.reddit.com/r/news.json",
+        "type": "json",
+        "items": "data.children",
+        "field": "data.title",
+        "min_length": 11,
+        "headers": {"User-Agent": "python:news-scraper:v1.0.0 (by /u/newsbot)"},
+        "note": "may have access issues"
+    }
+]
+
+DEFAULT_LIMIT = 15
+
+# Simple selectors match an element by its tag, classes and attributes alone
+# (e.g. "a.sc-2e6baa30-0", "h2[data-testid='card-headline']"): no
+# combinators or pseudo-classes, so they don't depend on the rest of the tree
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)((?:\.[\w-]+)*)((?:\[[^\]]*\])*)$')
+ATTRIBUTE_SELECTOR = re.compile(r"""\[\s*([\w-]+)\s*(?:=\s*(?:"([^"]*)"|'([^']*)'|([\w-]+))\s*)?\]""")
+
+# Punctuation and spacing ignored when comparing headlines
+# ("Trump's plan" == "Trump’s  plan" == "TRUMP'S PLAN")
+NON_WORD = re.compile(r'[\W_]+')
+
+# BeautifulSoup's get_text() leaves out the text inside these tags, and
+# inside any tag nested in them (a heading in a <template> has no text)
+HIDDEN_TEXT_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+
+def load_sources(path):
+    """Load a list of source entries from a JSON file"""
+    with open(path, encoding='utf-8') as f:
+        sources = json.load(f)
+    
+    if not isinstance(sources, list):
+        raise ValueError(f"{path}: expected a list of sources")
+    for index, source in enumerate(sources):
+        if not isinstance(source, dict) or 'name' not in source or 'url' not in source:
+            raise ValueError(f"{path}: source {index} needs a 'name' and a 'url'")
+        source_type = source.get('type', 'html')
+        if source_type == 'html' and not source.get('selectors'):
+            raise ValueError(f"{path}: source '{source['name']}' has no selectors")
+        if source_type == 'json' and not ('items' in source and 'field' in source):
+            raise ValueError(f"{path}: source '{source['name']}' needs 'items' and 'field'")
+        if source_type not in ('html', 'json'):
+            raise ValueError(f"{path}: source '{source['name']}' has unknown type '{source_type}'")
+    return sources
+
+def headline_key(headline):
+    """Normalized form of a headline used to spot duplicates"""
+    text = unicodedata.normalize('NFKC', headline).casefold()
+    return NON_WORD.sub(' ', text).strip()
+
+def source_fingerprint(source):
+    """Hash of a source's config; cached headlines are reused only if it matches"""
+    return hashlib.sha1(json.dumps(source, sort_keys=True).encode('utf-8')).hexdigest()
+
+def lookup(data, path):
+    """Follow a dotted path (e.g. 'data.title') into nested dicts"""
+    for key in path.split('.'):
+        data = data[key]
+    return data
+
+@functools.lru_cache(maxsize=None)
+def parse_selector(selector):
+    """Split a simple selector into (tag, classes, attributes), or None if it isn't one"""
+    match = SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        return None
+    
+    attributes = []
+    consumed = 0
+    for attribute in ATTRIBUTE_SELECTOR.finditer(match.group(3)):
+        if attribute.start() != consumed:
+            return None
+        consumed = attribute.end()
+        values = [value for value in attribute.group(2, 3, 4) if value is not None]
+        attributes.append((attribute.group(1).lower(), values[0] if values else None))
+    if consumed != len(match.group(3)):
+        return None
+    
+    classes = frozenset(match.group(2).split('.')[1:])
+    return match.group(1).lower(), classes, tuple(attributes)
+
+def simple_selectors(rules):
+    """Return every selector used by the rules, parsed, or None if any isn't simple"""
+    selectors = [parse_selector(rule['select']) for rule in rules]
+    selectors += [parse_selector(then) for rule in rules for then in rule.get('then', ())]
+    return None if None in selectors else selectors
+
+def element_matches(element, selector):
+    """Check an lxml element against a parsed simple selector"""
+    _, classes, attributes = selector
+    if classes and not classes <= set(element.get('class', '').split()):
+        return False
+    for name, value in attributes:
+        actual = element.get(name)
+        if actual is None or (value is not None and actual != value):
+            return False
+    return True
+
+def element_text(element):
+    """Text of an lxml element, as BeautifulSoup's get_text(strip=True) returns it"""
+    strings = [element.text or '']
+    for child in element:
+        # Comments have a non-string tag and no text of their own
+        if isinstance(child.tag, str) and child.tag not in HIDDEN_TEXT_TAGS:
+            strings.append(element_text(child))
+        strings.append((child.tail or '').strip())
+    return ''.join(string.strip() for string in strings)
+
+def lxml_matches(root, rule):
+    """Yield the text of every element a rule matches in an lxml tree"""
+    tag, *_ = select = parse_selector(rule['select'])
+    for element in root.iter(tag):
+        if not element_matches(element, select):
+            continue
+        for then in rule.get('then', ()):
+            then = parse_selector(then)
+            element = next((child for child in element.iterdescendants(then[0])
+                            if element_matches(child, then)), None)
+            if element is None:
+                break
+        if element is None:
+            continue
+        if any(parent.tag in HIDDEN_TEXT_TAGS for parent in element.iterancestors()):
+            yield ''   # BeautifulSoup finds it, with no text
+        else:
+            yield element_text(element)
+
+def soup_matches(soup, rule):
+    """Yield the text of every element a rule matches in a BeautifulSoup tree"""
+    for element in soup.select(rule['select']):
+        for selector in rule.get('then', ()):
+            element = element.select_one(selector)
+            if element is None:
+                break
+        if element is not None:
+            yield element.get_text(strip=True)
+
+class StrainedSoup(BeautifulSoup):
+    """
+    A BeautifulSoup tree that only builds the tags `parse_only` allows (and
+    everything inside them), but keeps track of the open tags it skipped.
+    An end tag closing a skipped tag closes every built tag opened inside
+    it, as it would in the full tree, so each built tag ends up with the
+    same contents: <div><h3>Title</div> more</h3> gives "Title" either way.
+    """
+    
+    def reset(self):
+        super().reset()
+        self.skipped = []   # names of the open tags that weren't built, outermost first
+    
+    def handle_starttag(self, name, *args, **kwargs):
+        tag = super().handle_starttag(name, *args, **kwargs)
+        # Void elements (<br>, <img>) close immediately and never enclose anything
+        if tag is None and not self.builder.can_be_empty_element(name):
+            self.skipped.append(name)
+        return tag
+    
+    def handle_endtag(self, name, nsprefix=None):
+        # Built tags are all nested inside the skipped ones, so an open built
+        # tag of this name is the most recent one
+        if self.open_tag_counter.get(name) or name not in self.skipped:
+            return super().handle_endtag(name, nsprefix)
+        self.endData()
+        while len(self.tagStack) > 1:
+            self.popTag()
+        del self.skipped[len(self.skipped) - 1 - self.skipped[::-1].index(name):]
+
+def extract_html(content, source, fast=True, use_lxml=False):
+    """
+    Extract headlines from an HTML page using the source's selector rules.
+    
+    In fast mode, when every selector is a simple one, html.parser only
+    builds the tags the rules can match (see StrainedSoup); the headlines
+    are the same as from a full BeautifulSoup tree.
+    
+    With use_lxml (and lxml installed) the page is parsed and matched in an
+    lxml tree instead, many times faster. libxml2 repairs malformed markup
+    differently from html.parser, though (<h3>Title<p>para</h3> ends the
+    heading at the <p>, an <h3> inside <title> is text), so on such pages
+    the headlines can differ.
+    """
+    rules = source['selectors']
+    selectors = simple_selectors(rules) if fast else None
+    
+    if selectors is not None and use_lxml and lxml is not None:
+        encoding = UnicodeDammit(content, is_html=True).original_encoding
+        try:
+            root = lxml.html.document_fromstring(content, parser=lxml.html.HTMLParser(encoding=encoding))
+        except lxml.etree.ParserError:   # empty page
+            return []
+        matches = functools.partial(lxml_matches, root)
+    elif selectors is not None:
+        # Tags hiding their text are built too, so the text under them stays hidden
+        names = sorted({parse_selector(rule['select'])[0] for rule in rules} | HIDDEN_TEXT_TAGS)
+        soup = StrainedSoup(content, 'html.parser', parse_only=SoupStrainer(names))
+        matches = functools.partial(soup_matches, soup)
+    else:
+        matches = functools.partial(soup_matches, BeautifulSoup(content, 'html.parser'))
+    limit = source.get('limit', DEFAULT_LIMIT)
+    headlines_found = []
+    seen = set()
+    
+    for rule in rules:
+        if len(headlines_found) >= limit:
+            break
+        if 'only_if_fewer_than' in rule and len(headlines_found) >= rule['only_if_fewer_than']:
+            continue
+        min_length = rule.get('min_length', 1)
+        
+        for headline in matches(rule):
+            if len(headline) >= min_length and headline not in seen:
+                seen.add(headline)
+                headlines_found.append(headline)
+    
+    return headlines_found[:limit]
+
+def extract_json(data, source):
+    """Extract headlines from a decoded JSON document"""
+    min_length = source.get('min_length', 1)
+    headlines_found = []
+    seen = set()
+    
+    for item in lookup(data, source['items']):
+        headline = lookup(item, source['field'])
+        if headline and len(headline) >= min_length and headline not in seen:
+            seen.add(headline)
+            headlines_found.append(headline)
+    
+    return headlines_found[:source.get('limit', DEFAULT_LIMIT)]
+
+def extract(content, source, fast=True, use_lxml=False):
+    """Extract a source's headlines from a fetched page body"""
+    if source.get('type', 'html') == 'json':
+        return extract_json(json.loads(content), source)
+    return extract_html(content, source, fast, use_lxml)
+
+# Headlines a daemon keeps in memory; --store keeps the full history
+DAEMON_HEADLINES_KEPT = 1000
 
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, sources=None, timeout=10, max_workers=8, fast=True, cache=None, store=None, keep=None,
+                 use_lxml=False):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -18,134 +326,147 @@ class NewsScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
-        self.headlines = []
+        self.sources = DEFAULT_SOURCES if sources is None else sources
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.fast = fast
+        self.use_lxml = use_lxml   # match on an lxml tree (faster, may differ on malformed pages)
+        self.cache = cache   # optional PageCache for conditional requests
+        self.store = store   # optional HeadlineStore keeping headline history
+        # With `keep`, only the most recent headlines (and most recently seen
+        # keys) are held, so a long-running daemon doesn't grow without bound
+        self.keep = keep
+        self.headlines = deque(maxlen=keep)
+        self.seen = OrderedDict()   # headline_key() of headlines seen so far, least recent first
+        
+        # One session for all sources: connections are kept alive and reused
+        # between scrapes, and pooled so sources can be fetched in parallel
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
-    def scrape_bbc_news(self):
-        """Scrape headlines from BBC News"""
-        print("\n🔍 Scraping BBC News...")
-        try:
-            url = "https://www.bbc.com/news"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find headlines in various BBC News formats
-            headlines_found = []
-            
-            # Method 1: h2 tags with data-testid
-            for h2 in soup.find_all('h2', {'data-testid': 'card-headline'}):
-                headline = h2.get_text(strip=True)
-                if headline and headline not in headlines_found:
-                    headlines_found.append(headline)
-            
-            # Method 2: h3 tags
-            for h3 in soup.find_all('h3'):
-                headline = h3.get_text(strip=True)
-                if headline and len(headline) > 20 and headline not in headlines_found:
-                    headlines_found.append(headline)
-            
-            # Method 3: Links with specific classes
-            for link in soup.find_all('a', class_='sc-2e6baa30-0'):
-                headline = link.get_text(strip=True)
-                if headline and len(headline) > 20 and headline not in headlines_found:
-                    headlines_found.append(headline)
-            
-            self.headlines.extend([("BBC News", headline) for headline in headlines_found[:15]])
-            print(f"✅ Found {len(headlines_found[:15])} headlines from BBC News")
-            
-        except Exception as e:
-            print(f"⚠️  Error scraping BBC News: {e}")
+    def fetch(self, url, headers=None, timeout=None):
+        """GET a page over the shared session, raising on HTTP errors"""
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response
     
-    def scrape_hacker_news(self):
-        """Scrape headlines from Hacker News"""
-        print("\n🔍 Scraping Hacker News...")
-        try:
-            url = "https://news.ycombinator.com/"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find headlines - Hacker News uses span with class 'titleline'
-            headlines_found = []
-            for span in soup.find_all('span', class_='titleline'):
-                link = span.find('a')
-                if link:
-                    headline = link.get_text(strip=True)
-                    if headline and headline not in headlines_found:
-                        headlines_found.append(headline)
-            
-            self.headlines.extend([("Hacker News", headline) for headline in headlines_found[:15]])
-            print(f"✅ Found {len(headlines_found[:15])} headlines from Hacker News")
-            
-        except Exception as e:
-            print(f"⚠️  Error scraping Hacker News: {e}")
+    def fetch_source(self, source):
+        """Fetch a source's page and return its headlines"""
+        return self.fetch_source_timed(source)[0]
     
-    def scrape_reddit_news(self):
-        """Scrape headlines from Reddit r/news (via JSON API)"""
-        print("\n🔍 Scraping Reddit r/news...")
+    def fetch_source_timed(self, source):
+        """Fetch a source's page; return (headlines, fetch seconds, parse seconds)"""
+        start = time.perf_counter()
+        if self.cache is None:
+            response = self.fetch(source['url'], source.get('headers'), source.get('timeout'))
+            fetched = time.perf_counter()
+            headlines = extract(response.content, source, self.fast, self.use_lxml)
+            return headlines, fetched - start, time.perf_counter() - fetched
+        
+        # Conditional GET: an unchanged page answers 304 and isn't parsed again
+        entry = self.cache.get(source['url'])
+        headers = dict(source.get('headers') or {})
+        if entry is not None:
+            headers.update(entry.validators())
+        response = self.fetch(source['url'], headers, source.get('timeout'))
+        fingerprint = source_fingerprint(source)
+        fetched = time.perf_counter()
+        
+        if response.status_code == 304 and entry is not None:
+            if entry.fingerprint == fingerprint:
+                self.cache.revalidated(entry)
+                return entry.headlines, fetched - start, 0.0
+            # The source's config changed since the page was cached
+            headlines = extract(entry.body(), source, self.fast, self.use_lxml)
+            self.cache.revalidated(entry, headlines, fingerprint)
+            return headlines, fetched - start, time.perf_counter() - fetched
+        
+        headlines = extract(response.content, source, self.fast, self.use_lxml)
+        parsed = time.perf_counter()
+        self.cache.store(source['url'], response, headlines, fingerprint)
+        return headlines, fetched - start, parsed - fetched
+    
+    def add_headlines(self, source, headlines):
+        """
+        Add a source's headlines to the scraped list, skipping any headline
+        already seen from any source in this or an earlier scrape. Returns
+        the number of headlines added.
+        """
+        entries = [(headline_key(headline), headline) for headline in headlines]
+        added = 0
+        for key, headline in entries:
+            if key in self.seen:
+                self.seen.move_to_end(key)
+                continue
+            self.seen[key] = None
+            self.headlines.append((source['name'], headline))
+            added += 1
+        if self.keep is not None:
+            # Headlines still on a page were just moved to the end, so only
+            # ones that dropped off every page are forgotten
+            while len(self.seen) > self.keep:
+                self.seen.popitem(last=False)
+        
+        notes = []
+        if self.store is not None:
+            notes.append(f"{len(self.store.record(source['name'], entries))} new")
+        skipped = len(headlines) - added
+        if skipped:
+            notes.append(f"{skipped} already seen")
+        note = f" ({', '.join(notes)})" if notes else ""
+        print(f"✅ Found {len(headlines)} headlines from {source['name']}{note}")
+        return added
+    
+    def report_error(self, source, error):
+        """Print a scraping error for a source"""
+        if isinstance(error, requests.exceptions.HTTPError) and error.response.status_code == 403:
+            print(f"⚠️  {source['name']} blocked the request (403). Try another source instead.")
+        else:
+            print(f"⚠️  Error scraping {source['name']}: {error}")
+    
+    def scrape_source(self, source):
+        """Scrape a single source and add its headlines"""
+        print(f"\n🔍 Scraping {source['name']}...")
         try:
-            # Use Reddit's JSON API which is more scraper-friendly
-            url = "https://www.reddit.com/r/news.json"
-            reddit_headers = self.headers.copy()
-            reddit_headers['User-Agent'] = 'python:news-scraper:v1.0.0 (by /u/newsbot)'
-            
-            response = requests.get(url, headers=reddit_headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            headlines_found = []
-            
-            for post in data['data']['children']:
-                title = post['data']['title']
-                if title and title not in headlines_found and len(title) > 10:
-                    headlines_found.append(title)
-            
-            self.headlines.extend([("Reddit r/news", headline) for headline in headlines_found[:15]])
-            print(f"✅ Found {len(headlines_found[:15])} headlines from Reddit")
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                print(f"⚠️  Reddit blocked the request (403). Try using The Guardian instead (option 3).")
-            else:
-                print(f"⚠️  Error scraping Reddit: {e}")
+            self.add_headlines(source, self.fetch_source(source))
         except Exception as e:
-            print(f"⚠️  Error scraping Reddit: {e}")
+            self.report_error(source, e)
     
-    def scrape_guardian_news(self):
-        """Scrape headlines from The Guardian"""
-        print("\n🔍 Scraping The Guardian...")
+    def scrape_all(self, deadline=None):
+        """
+        Scrape every source concurrently.
+        
+        Each source gets `deadline` seconds (default: its timeout) measured
+        from the start of the run; sources that miss it are skipped.
+        Headlines are merged in source order, whatever order they finish in.
+        """
+        start = time.monotonic()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(self.sources))))
+        futures = [(source, executor.submit(self.fetch_source, source)) for source in self.sources]
+        
         try:
-            url = "https://www.theguardian.com/international"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find headlines in The Guardian's structure
-            headlines_found = []
-            
-            # Method 1: Headlines in card links
-            for link in soup.find_all('a', class_='dcr-lv2v9o'):
-                headline_span = link.find('span')
-                if headline_span:
-                    headline = headline_span.get_text(strip=True)
-                    if headline and headline not in headlines_found and len(headline) > 15:
-                        headlines_found.append(headline)
-            
-            # Method 2: Any h3 tags (backup method)
-            if len(headlines_found) < 10:
-                for h3 in soup.find_all('h3'):
-                    headline = h3.get_text(strip=True)
-                    if headline and headline not in headlines_found and len(headline) > 15:
-                        headlines_found.append(headline)
-            
-            self.headlines.extend([("The Guardian", headline) for headline in headlines_found[:15]])
-            print(f"✅ Found {len(headlines_found[:15])} headlines from The Guardian")
-            
-        except Exception as e:
-            print(f"⚠️  Error scraping The Guardian: {e}")
+            for source, future in futures:
+                limit = deadline or source.get('timeout') or self.timeout
+                remaining = limit - (time.monotonic() - start)
+                print(f"\n🔍 Scraping {source['name']}...")
+                try:
+                    headlines = future.result(timeout=max(0, remaining))
+                except concurrent.futures.TimeoutError:
+                    print(f"⚠️  {source['name']} did not respond within {limit}s, skipped")
+                    continue
+                except Exception as e:
+                    self.report_error(source, e)
+                    continue
+                self.add_headlines(source, headlines)
+        finally:
+            # Don't wait for sources that missed their deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return time.monotonic() - start
     
     def save_to_file(self, filename='headlines.txt'):
         """Save all scraped headlines to a text file"""
@@ -204,57 +525,109 @@ class NewsScraper:
         print(f"Total: {len(self.headlines)} headlines")
         print("="*70)
 
-def display_menu():
+
+def parse_since(value):
+    """Parse --new-since: an ISO date/time, or a number of hours ago"""
+    try:
+        return time.time() - float(value) * 3600
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def display_new_headlines(store, since):
+    """Print headlines first seen after `since` (a timestamp)"""
+    rows = store.new_since(since)
+    print("\n" + "="*70)
+    print(f"NEW HEADLINES SINCE {datetime.fromtimestamp(since).strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*70)
+    for source, headline, first_seen in rows:
+        print(f"  [{datetime.fromtimestamp(first_seen).strftime('%Y-%m-%d %H:%M')}] {source}: {headline}")
+    print(f"\n{'='*70}")
+    print(f"Total: {len(rows)} new headlines")
+    print("="*70)
+
+def display_menu(sources):
     """Display the scraper menu"""
     print("\n" + "="*70)
     print("        NEWS HEADLINES WEB SCRAPER")
     print("="*70)
     print("Select news source to scrape:")
-    print("1. BBC News")
-    print("2. Hacker News")
-    print("3. The Guardian")
-    print("4. Reddit r/news (may have access issues)")
-    print("5. Scrape All Sources")
-    print("6. Display Scraped Headlines")
-    print("7. Save to File")
-    print("8. Exit")
+    for number, source in enumerate(sources, 1):
+        note = f" ({source['note']})" if source.get('note') else ""
+        print(f"{number}. {source['name']}{note}")
+    count = len(sources)
+    print(f"{count + 1}. Scrape All Sources")
+    print(f"{count + 2}. Display Scraped Headlines")
+    print(f"{count + 3}. Save to File")
+    print(f"{count + 4}. Exit")
     print("="*70)
 
 def main():
     """Main function to run the news scraper"""
-    scraper = NewsScraper()
+    parser = argparse.ArgumentParser(description="Scrape news headlines")
+    parser.add_argument('--sources', help="JSON file of sources to scrape (default: built-in sources)")
+    parser.add_argument('--full-parse', action='store_true',
+                        help="Build the whole page with html.parser instead of only the tags the selectors match")
+    parser.add_argument('--lxml', action='store_true',
+                        help="Parse and match pages with lxml: much faster, but headlines can differ on malformed markup")
+    parser.add_argument('--cache-dir', help="Cache pages here and re-fetch them with conditional requests")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="Hours an unused cached page is kept (default: 24)")
+    parser.add_argument('--cache-size', type=float, default=50, help="Cache size limit in MB (default: 50)")
+    parser.add_argument('--store', help="SQLite file keeping the history of every scraped headline")
+    parser.add_argument('--new-since', metavar='WHEN',
+                        help="Print headlines from --store first seen after WHEN (ISO date/time, or hours ago) and exit")
+    parser.add_argument('--daemon', action='store_true', help="Poll all sources continuously instead of showing the menu")
+    parser.add_argument('--interval', type=float, default=60, help="Daemon: seconds between polls of a source (default: 60)")
+    parser.add_argument('--host-delay', type=float, default=1.0,
+                        help="Daemon: minimum seconds between requests to the same host (default: 1)")
+    parser.add_argument('--report-every', type=float, default=300,
+                        help="Daemon: seconds between latency reports (default: 300)")
+    parser.add_argument('--keep', type=int, default=DAEMON_HEADLINES_KEPT,
+                        help=f"Daemon: headlines kept in memory (default: {DAEMON_HEADLINES_KEPT})")
+    args = parser.parse_args()
+    
+    store = HeadlineStore(args.store) if args.store else None
+    if args.new_since:
+        if store is None:
+            parser.error("--new-since needs --store")
+        display_new_headlines(store, parse_since(args.new_since))
+        return
+    
+    sources = load_sources(args.sources) if args.sources else None
+    cache = None
+    if args.cache_dir:
+        cache = PageCache(args.cache_dir, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_size * 1024 * 1024))
+    scraper = NewsScraper(sources, fast=not args.full_parse, cache=cache, store=store,
+                          keep=args.keep if args.daemon else None, use_lxml=args.lxml)
+    
+    if args.daemon:
+        Poller(scraper, interval=args.interval, host_delay=args.host_delay,
+               report_every=args.report_every).run()
+        if store is not None:
+            store.close()
+        return
+    
+    count = len(scraper.sources)
     
     print("\n🎉 Welcome to News Headlines Web Scraper!")
     print("This tool scrapes headlines from popular news websites.")
     
     while True:
-        display_menu()
-        choice = input("Enter your choice (1-8): ").strip()
-        
-        if choice == '1':
-            scraper.scrape_bbc_news()
-        
-        elif choice == '2':
-            scraper.scrape_hacker_news()
-        
-        elif choice == '3':
-            scraper.scrape_guardian_news()
+        display_menu(scraper.sources)
+        choice = input(f"Enter your choice (1-{count + 4}): ").strip()
+        number = int(choice) if choice.isdigit() else 0
         
-        elif choice == '4':
-            scraper.scrape_reddit_news()
+        if 1 <= number <= count:
+            scraper.scrape_source(scraper.sources[number - 1])
         
-        elif choice == '5':
+        elif number == count + 1:
             print("\n🔄 Scraping all sources...")
-            scraper.scrape_bbc_news()
-            scraper.scrape_hacker_news()
-            scraper.scrape_guardian_news()
-            scraper.scrape_reddit_news()
-            print("\n✅ All sources scraped!")
+            elapsed = scraper.scrape_all()
+            print(f"\n✅ All sources scraped in {elapsed:.1f}s!")
         
-        elif choice == '6':
+        elif number == count + 2:
             scraper.display_headlines()
         
-        elif choice == '7':
+        elif number == count + 3:
             if scraper.headlines:
                 filename = input("Enter filename (default: headlines.txt): ").strip()
                 if not filename:
@@ -265,12 +638,12 @@ def main():
             else:
                 print("\n⚠️  No headlines to save. Please scrape some news first!")
         
-        elif choice == '8':
+        elif number == count + 4:
             print("\n👋 Thank you for using News Headlines Scraper. Goodbye!")
             break
         
         else:
-            print("\n⚠️  Invalid choice! Please select 1-8.")
+            print(f"\n⚠️  Invalid choice! Please select 1-{count + 4}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+"""
+Daemon mode for the News Scraper.
+Polls every source on its own interval without the interactive menu, backs
+off from failing hosts, spaces out requests to the same host and reports
+fetch/parse latency per source:
+
+    python news_scraper.py --daemon --interval 60 --store headlines.db
+"""
+
+import concurrent.futures
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# Latency samples kept per source for the report
+SAMPLES_KEPT = 200
+
+
+def timestamp():
+    """Prefix for log lines"""
+    return f"[{datetime.now().strftime('%H:%M:%S')}]"
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def retry_after(error):
+    """Seconds asked for by a Retry-After header on an HTTP error, if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+class SourceStats:
+    """Poll counts and recent fetch/parse latencies for one source"""
+
+    def __init__(self):
+        self.polls = 0
+        self.errors = 0
+        self.added = 0      # headlines not seen before
+        self.failures = 0   # consecutive, drives the backoff
+        self.fetch = deque(maxlen=SAMPLES_KEPT)
+        self.parse = deque(maxlen=SAMPLES_KEPT)
+
+
+class Poller:
+    """
+    Polls a NewsScraper's sources forever (or until stop()).
+
+    - Each source is polled every `interval` seconds (or its own "interval").
+    - A failing source waits interval * 2^failures (capped at `max_backoff`,
+      or longer if the server sent Retry-After) before its next attempt, and
+      the whole host is held back for the same time.
+    - Requests to one host are at least `host_delay` seconds apart.
+    - Fetches run in a thread pool over the scraper's keep-alive session, so
+      connections are reused from one cycle to the next.
+    """
+
+    def __init__(self, scraper, interval=60, host_delay=1.0, max_backoff=3600, report_every=300):
+        self.scraper = scraper
+        self.interval = interval
+        self.host_delay = host_delay
+        self.max_backoff = max_backoff
+        self.report_every = report_every
+        self.stats = {source['name']: SourceStats() for source in scraper.sources}
+        self._host_ready = {}   # host -> earliest time of the next request
+        self._stop = threading.Event()
+
+    def source_interval(self, source):
+        return source.get('interval', self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def log(self, message):
+        print(f"{timestamp()} {message}")
+
+    def run(self, duration=None):
+        """Poll until stop() is called, Ctrl+C, or `duration` seconds have passed"""
+        start = time.monotonic()
+        end = None if duration is None else start + duration
+        next_report = start + self.report_every
+
+        # (due time, position, source): every source is due immediately
+        schedule = [(start, index, source) for index, source in enumerate(self.scraper.sources)]
+        heapq.heapify(schedule)
+        running = {}   # future -> (position, source)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(self.scraper.max_workers, len(self.scraper.sources))))
+
+        self.log(f"🔄 Polling {len(schedule)} sources every {self.interval}s (Ctrl+C to stop)")
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+
+                # Start every source that is due and whose host may be contacted
+                while schedule and schedule[0][0] <= now:
+                    _, index, source = heapq.heappop(schedule)
+                    host = urlsplit(source['url']).hostname
+                    ready = self._host_ready.get(host, 0)
+                    if ready > now:
+                        heapq.heappush(schedule, (ready, index, source))
+                        continue
+                    self._host_ready[host] = now + self.host_delay
+                    future = executor.submit(self.scraper.fetch_source_timed, source)
+                    running[future] = (index, source)
+
+                if now >= next_report:
+                    self.report()
+                    next_report = now + self.report_every
+
+                # Sleep until a fetch finishes or the next source is due
+                wake = [next_report]
+                if schedule:
+                    wake.append(schedule[0][0])
+                if end is not None:
+                    wake.append(end)
+                timeout = max(0.0, min(wake) - time.monotonic())
+                if running:
+                    done, _ = concurrent.futures.wait(
+                        running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                else:
+                    self._stop.wait(timeout)
+                    done = ()
+
+                for future in done:
+                    index, source = running.pop(future)
+                    delay = self.finished(source, future)
+                    heapq.heappush(schedule, (time.monotonic() + delay, index, source))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.report()
+
+    def finished(self, source, future):
+        """Handle a completed poll; return seconds until the source's next poll"""
+        stats = self.stats[source['name']]
+        stats.polls += 1
+        interval = self.source_interval(source)
+        try:
+            headlines, fetch_time, parse_time = future.result()
+        except Exception as e:
+            stats.errors += 1
+            stats.failures += 1
+            delay = min(interval * 2 ** stats.failures, self.max_backoff)
+            delay = max(delay, retry_after(e) or 0) * random.uniform(1.0, 1.1)
+            host = urlsplit(source['url']).hostname
+            self._host_ready[host] = max(self._host_ready.get(host, 0), time.monotonic() + delay)
+
+            print(f"{timestamp()} ", end='')
+            self.scraper.report_error(source, e)
+            self.log(f"⏳ Backing off {source['name']} ({host}) for {delay:.0f}s")
+            return delay
+
+        stats.failures = 0
+        stats.fetch.append(fetch_time)
+        stats.parse.append(parse_time)
+        print(f"{timestamp()} ", end='')
+        stats.added += self.scraper.add_headlines(source, headlines)
+        return interval
+
+    def report(self):
+        """Print poll counts and latency percentiles per source"""
+        print("\n" + "="*78)
+        print(f"{'Source':<22}{'Polls':>7}{'Errors':>8}{'Fetch p50':>11}{'Fetch p95':>11}{'Parse p50':>11}{'Parse p95':>11}")
+        print("-"*78)
+        for name, stats in self.stats.items():
+            print(f"{name[:21]:<22}{stats.polls:>7}{stats.errors:>8}"
+                  f"{percentile(stats.fetch, 0.50) * 1e3:>9.1f}ms{percentile(stats.fetch, 0.95) * 1e3:>9.1f}ms"
+                  f"{percentile(stats.parse, 0.50) * 1e3:>9.1f}ms{percentile(stats.parse, 0.95) * 1e3:>9.1f}ms")
+        print("="*78)
+        print(f"Total headlines collected: {sum(stats.added for stats in self.stats.values())}"
+              f" ({len(self.scraper.headlines)} kept in memory)")
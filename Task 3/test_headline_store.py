@@ -0,0 +1,66 @@
+"""
+Tests for the SQLite headline history
+
+    python -m unittest test_headline_store
+"""
+
+import os
+import tempfile
+import unittest
+
+from headline_store import HeadlineStore
+
+
+class HeadlineStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'headlines.db')
+        self.store = HeadlineStore(self.path)
+        self.addCleanup(lambda: self.store.close())
+
+    def seen(self, source, key):
+        return self.store._conn.execute(
+            'SELECT first_seen, last_seen FROM headlines WHERE source = ? AND hash = ?',
+            (source, HeadlineStore.headline_hash(key))).fetchone()
+
+    def test_only_new_headlines_are_inserted(self):
+        first = self.store.record('BBC', [('a', 'A'), ('b', 'B')], seen_at=100)
+        self.assertEqual(first, ['A', 'B'])
+        again = self.store.record('BBC', [('b', 'B!'), ('c', 'C')], seen_at=200)
+        self.assertEqual(again, ['C'])
+        self.assertEqual(self.store.count(), 3)
+        # The same key from another source is another headline
+        self.assertEqual(self.store.record('Guardian', [('a', 'A')], seen_at=200), ['A'])
+        self.assertEqual(self.store.record('BBC', [], seen_at=300), [])
+
+    def test_repeats_bump_last_seen(self):
+        self.store.record('BBC', [('a', 'A')], seen_at=100)
+        self.store.record('BBC', [('a', 'A')], seen_at=250)
+        self.assertEqual(self.seen('BBC', 'a'), (100, 250))
+        # An older scrape recorded late doesn't move last_seen back
+        self.store.record('BBC', [('a', 'A')], seen_at=150)
+        self.assertEqual(self.seen('BBC', 'a'), (100, 250))
+
+    def test_new_since(self):
+        self.store.record('BBC', [('a', 'A')], seen_at=100)
+        self.store.record('Guardian', [('b', 'B')], seen_at=200)
+        self.store.record('BBC', [('a', 'A'), ('c', 'C')], seen_at=300)
+        self.assertEqual(self.store.new_since(0), [('BBC', 'A', 100), ('Guardian', 'B', 200), ('BBC', 'C', 300)])
+        # Strictly after: a repeat seen later is not new
+        self.assertEqual(self.store.new_since(100), [('Guardian', 'B', 200), ('BBC', 'C', 300)])
+        self.assertEqual(self.store.new_since(100, source='BBC'), [('BBC', 'C', 300)])
+        self.assertEqual(self.store.new_since(0, source='Reuters'), [])
+        self.assertEqual(self.store.new_since(300), [])
+
+    def test_history_survives_reopening(self):
+        self.store.record('BBC', [('a', 'A')], seen_at=100)
+        self.store.close()
+        self.store = HeadlineStore(self.path)
+        self.assertEqual(self.store.record('BBC', [('a', 'A'), ('b', 'B')], seen_at=200), ['B'])
+        self.assertEqual(self.store.new_since(0), [('BBC', 'A', 100), ('BBC', 'B', 200)])
+
+
+if __name__ == '__main__':
+    unittest.main()
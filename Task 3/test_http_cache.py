@@ -0,0 +1,129 @@
+"""
+Tests for the on-disk page cache: TTL expiry, size-based eviction and
+rebuilding the index from the files on disk
+
+    python -m unittest test_http_cache
+"""
+
+import os
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+import http_cache
+from http_cache import PageCache, cache_key
+
+
+def response(body, etag='"v1"'):
+    """The parts of a requests.Response the cache reads"""
+    return types.SimpleNamespace(headers={'ETag': etag} if etag else {}, content=body)
+
+
+class PageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.now = time.time()
+        clock = mock.patch.object(http_cache, 'time', types.SimpleNamespace(time=lambda: self.now))
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def cache(self, **settings):
+        return PageCache(self.folder, **settings)
+
+    def files(self):
+        return sorted(os.listdir(self.folder))
+
+    def test_hit_keeps_validators_and_headlines(self):
+        cache = self.cache()
+        cache.store('http://a/', response(b'page', etag='"x"'), ['One', 'Two'], 'f1')
+        entry = cache.get('http://a/')
+        self.assertEqual(entry.validators(), {'If-None-Match': '"x"'})
+        self.assertEqual((entry.headlines, entry.fingerprint, entry.body()), (['One', 'Two'], 'f1', b'page'))
+        self.assertEqual(cache.misses, 1)
+
+    def test_pages_without_validators_are_not_cached(self):
+        cache = self.cache()
+        cache.store('http://a/', response(b'page', etag=None), ['One'], None)
+        self.assertIsNone(cache.get('http://a/'))
+        self.assertEqual(self.files(), [])
+
+    def test_entries_expire_after_ttl(self):
+        cache = self.cache(ttl=60)
+        cache.store('http://a/', response(b'page'), ['One'], None)
+        self.now += 59
+        self.assertIsNotNone(cache.get('http://a/'))
+        self.now += 2
+        self.assertIsNone(cache.get('http://a/'))
+        self.assertEqual(self.files(), [])
+
+    def test_revalidation_restarts_the_ttl(self):
+        cache = self.cache(ttl=60)
+        cache.store('http://a/', response(b'page'), ['One'], None)
+        self.now += 50
+        cache.revalidated(cache.get('http://a/'), ['One', 'Two'], 'f2')
+        self.now += 50
+        entry = cache.get('http://a/')
+        self.assertEqual(entry.headlines, ['One', 'Two'])
+        self.assertEqual(cache.hits, 1)
+
+    def test_least_recently_used_pages_are_evicted_over_max_bytes(self):
+        cache = self.cache(max_bytes=250)
+        for index, url in enumerate(('http://a/', 'http://b/', 'http://c/')):
+            self.now += 1
+            cache.store(url, response(b'x' * 100), [str(index)], None)
+        # a was the oldest: c pushed the bodies to 300 bytes
+        self.assertIsNone(cache.get('http://a/'))
+        self.assertEqual(cache._total, 200)
+        # Using b makes c the least recently used
+        self.now += 1
+        cache.revalidated(cache.get('http://b/'))
+        self.now += 1
+        cache.store('http://d/', response(b'x' * 100), ['3'], None)
+        self.assertIsNone(cache.get('http://c/'))
+        self.assertIsNotNone(cache.get('http://b/'))
+        self.assertIsNotNone(cache.get('http://d/'))
+        self.assertEqual(cache._total, 200)
+        self.assertEqual(len(self.files()), 4)
+
+    def test_replacing_a_page_counts_its_new_size(self):
+        cache = self.cache()
+        cache.store('http://a/', response(b'x' * 100), [], None)
+        cache.store('http://a/', response(b'x' * 30, etag='"v2"'), [], None)
+        self.assertEqual(cache._total, 30)
+        self.assertEqual(cache.get('http://a/').etag, '"v2"')
+
+    def test_index_is_rebuilt_from_disk(self):
+        cache = self.cache()
+        cache.store('http://a/', response(b'x' * 100), ['A'], None)
+        cache.store('http://b/', response(b'x' * 40), ['B'], None)
+        # Stale metadata (an old mtime) and a page missing its body
+        old = os.path.join(self.folder, cache_key('http://a/') + '.json')
+        os.utime(old, (self.now - 120, self.now - 120))
+        cache.store('http://c/', response(b'x' * 10), ['C'], None)
+        os.remove(os.path.join(self.folder, cache_key('http://c/') + '.body'))
+
+        reloaded = self.cache(ttl=60)
+        self.assertEqual(reloaded._total, 40)
+        self.assertEqual(reloaded.get('http://b/').headlines, ['B'])
+        self.assertIsNone(reloaded.get('http://a/'))
+        self.assertIsNone(reloaded.get('http://c/'))
+        self.assertEqual(self.files(), sorted(cache_key('http://b/') + suffix for suffix in ('.body', '.json')))
+
+    def test_reloaded_index_is_evicted_to_max_bytes(self):
+        cache = self.cache()
+        for index, url in enumerate(('http://a/', 'http://b/')):
+            cache.store(url, response(b'x' * 100), [], None)
+            path = os.path.join(self.folder, cache_key(url) + '.json')
+            os.utime(path, (self.now - 10 + index, self.now - 10 + index))
+        reloaded = self.cache(max_bytes=150)
+        self.assertIsNone(reloaded.get('http://a/'))
+        self.assertIsNotNone(reloaded.get('http://b/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the News Headlines Scraper
+The fast extraction path (html.parser building only the tags the selectors
+match) must find exactly the headlines the full BeautifulSoup tree finds;
+the opt-in lxml path only on well-formed markup.
+
+    python -m unittest test_news_scraper
+"""
+
+import os
+import random
+import sys
+import unittest
+
+import news_scraper
+from benchmark import fixture_name, same_headlines
+from news_scraper import DEFAULT_SOURCES, extract_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+SOURCE = {"name": "Test", "limit": sys.maxsize,
+          "selectors": [{"select": "h3"}, {"select": "span.x"}, {"select": "div.card", "then": ["span.x"]}]}
+
+HIDDEN_HEADINGS = b"""<html><body>
+<h3>Visible heading</h3>
+<template><h3>Heading inside a template</h3><div><span class="x">Span inside a template</span></div></template>
+<ruby>x<rt><h3>Heading inside ruby text</h3></rt></ruby>
+<div class="card"><template><span class="x">Then-match inside a template</span></template></div>
+<span class="x">Visible span</span>
+</body></html>"""
+
+# Malformed markup, and the headlines the full html.parser tree finds in it
+MALFORMED = {
+    b'<h3>Title<p>para</h3>': ["Titlepara"],
+    b'<html><head><title><h3>In title</h3></title></head></html>': ["In title"],
+    b'<textarea><h3>In a textarea</h3></textarea>': ["In a textarea"],
+    b'<div><h3>Title</div> more</h3>': ["Title"],
+    b'<span><h3>A</span>B</h3>': ["A"],
+    b'<b><h3>x</b>y</h3>z': ["x"],
+    b'<div><span class="x">one<div>two</span> three</div>': ["onetwo"],
+    b'<h3>a<h3>b</h3>c</h3>': ["abc", "b"],
+}
+
+TAGS = ['div', 'h3', 'span', 'p', 'b', 'table', 'tr', 'td', 'template', 'rt', 'ruby', 'br', 'li', 'a',
+        'title', 'textarea', 'script', 'img']
+
+
+def random_markup(rng):
+    """Tag soup: unclosed, misnested, stray end and self-closing tags"""
+    parts = []
+    for _ in range(rng.randint(5, 40)):
+        tag, roll = rng.choice(TAGS), rng.random()
+        if roll < 0.4:
+            parts.append(f'<{tag}{" class=x" if rng.random() < 0.5 else ""}>')
+        elif roll < 0.7:
+            parts.append(f'</{tag}>')
+        elif roll < 0.75:
+            parts.append(f'<{tag}/>')
+        elif roll < 0.8:
+            parts.append('<!-- c -->')
+        else:
+            parts.append(rng.choice(['text', '&amp;', ' word ', '&#150;']))
+    return ''.join(parts).encode()
+
+
+class FastPathTest(unittest.TestCase):
+
+    def check(self, content, source=SOURCE):
+        expected = extract_html(content, source, fast=False)
+        self.assertEqual(extract_html(content, source, fast=True), expected, content)
+        return expected
+
+    def test_headings_in_hidden_containers(self):
+        self.assertEqual(self.check(HIDDEN_HEADINGS), ["Visible heading", "Visible span"])
+
+    def test_malformed_markup(self):
+        for content, expected in MALFORMED.items():
+            with self.subTest(content=content):
+                self.assertEqual(self.check(content), expected)
+
+    def test_random_tag_soup(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            self.check(random_markup(rng))
+
+    def test_fixtures(self):
+        for source in DEFAULT_SOURCES:
+            if not source.get('selectors'):
+                continue
+            with self.subTest(source=source['name']):
+                with open(os.path.join(FIXTURES, fixture_name(source)), 'rb') as f:
+                    content = f.read()
+                self.assertEqual(len(self.check(content, source)), source.get('limit', news_scraper.DEFAULT_LIMIT))
+                self.assertTrue(same_headlines(content, source))
+
+
+@unittest.skipIf(news_scraper.lxml is None, "lxml is not installed")
+class LxmlPathTest(unittest.TestCase):
+
+    def test_hidden_containers(self):
+        self.assertEqual(extract_html(HIDDEN_HEADINGS, SOURCE, use_lxml=True), ["Visible heading", "Visible span"])
+
+    def test_differs_on_malformed_markup(self):
+        # Why lxml is opt-in: libxml2 ends the heading at <p> and drops it from <title>
+        self.assertEqual(extract_html(b'<h3>Title<p>para</h3>', SOURCE, use_lxml=True), ["Title"])
+        self.assertEqual(extract_html(b'<title><h3>In title</h3></title>', SOURCE, use_lxml=True), [])
+
+    def test_only_when_asked(self):
+        content = b'<h3>Title<p>para</h3>'
+        self.assertEqual(extract_html(content, SOURCE), ["Titlepara"])
+        self.assertEqual(news_scraper.NewsScraper([]).use_lxml, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
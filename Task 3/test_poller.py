@@ -0,0 +1,158 @@
+"""
+Tests for daemon mode, against a fake news server on localhost
+The server serves the committed fixture pages with ETag validators, plus a
+page with new headlines on every request and a host that always answers 403.
+
+    python -m unittest test_poller
+"""
+
+import contextlib
+import copy
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark import fixture_name
+from http_cache import PageCache
+from news_scraper import DEFAULT_SOURCES, NewsScraper
+from poller import Poller
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FakeNewsServer(ThreadingHTTPServer):
+    """Serves `pages` (path -> bytes) and logs (path, status, time) per request"""
+
+    daemon_threads = True
+
+    def __init__(self, pages):
+        super().__init__(('127.0.0.1', 0), FakeNewsHandler)
+        self.pages = pages
+        self.live_count = 0
+        self.log = []
+        self.lock = threading.Lock()
+
+    def url(self, path, host='127.0.0.1'):
+        return f"http://{host}:{self.server_address[1]}{path}"
+
+    def requests(self, path):
+        return [entry for entry in self.log if entry[0] == path]
+
+
+class FakeNewsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            if self.path == '/live':
+                # Three new headlines on every request
+                server.live_count += 1
+                body = ''.join(f'<h3>Live story {server.live_count}-{i}</h3>' for i in range(3)).encode()
+            else:
+                body = server.pages.get(self.path)
+        etag = f'"{hashlib.md5(body).hexdigest()}"' if body is not None else None
+
+        if body is None:
+            status, body = (403 if self.path == '/blocked' else 404), b'nope'
+        elif self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        else:
+            status = 200
+        with server.lock:
+            server.log.append((self.path, status, time.monotonic()))
+
+        self.send_response(status)
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PollerTest(unittest.TestCase):
+
+    def setUp(self):
+        pages = {}
+        self.sources = []
+        for source in copy.deepcopy(DEFAULT_SOURCES):
+            with open(os.path.join(FIXTURES, fixture_name(source)), 'rb') as f:
+                pages['/' + fixture_name(source)] = f.read()
+            self.sources.append(source)
+        self.server = FakeNewsServer(pages)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        for source in self.sources:
+            source['url'] = self.server.url('/' + fixture_name(source))
+
+    def poll(self, sources, duration, keep=None, cache=None, **settings):
+        scraper = NewsScraper(sources, keep=keep, cache=cache)
+        self.addCleanup(scraper.session.close)
+        poller = Poller(scraper, report_every=3600, **settings)
+        with contextlib.redirect_stdout(io.StringIO()):
+            poller.run(duration=duration)
+        return scraper, poller
+
+    def test_polls_every_source(self):
+        scraper, poller = self.poll(self.sources, 1.0, interval=0.2, host_delay=0)
+        for source in self.sources:
+            stats = poller.stats[source['name']]
+            self.assertGreaterEqual(stats.polls, 3, source['name'])
+            self.assertEqual(stats.errors, 0)
+            # The same page again adds nothing new
+            self.assertEqual(stats.added, source.get('limit', 15))
+        self.assertEqual(len(scraper.headlines), sum(stats.added for stats in poller.stats.values()))
+
+    def test_memory_is_bounded(self):
+        live = {"name": "Live", "url": self.server.url('/live'), "selectors": [{"select": "h3"}]}
+        bbc = self.sources[0]
+        scraper, poller = self.poll([bbc, live], 1.5, keep=30, interval=0.05, host_delay=0)
+        self.assertGreater(poller.stats['Live'].added, 45)
+        self.assertEqual(len(scraper.headlines), 30)
+        self.assertLessEqual(len(scraper.seen), 30)
+        self.assertEqual(scraper.headlines[-1][0], 'Live')
+        # BBC's headlines stay on its page, so they are never forgotten and re-added
+        self.assertEqual(poller.stats[bbc['name']].added, 15)
+
+    def test_backs_off_a_blocked_source(self):
+        blocked = dict(self.sources[3], name="Blocked", url=self.server.url('/blocked', host='localhost'))
+        _, poller = self.poll([self.sources[0], blocked], 1.6, interval=0.1, host_delay=0, max_backoff=10)
+        stats = poller.stats['Blocked']
+        self.assertEqual(stats.errors, stats.polls)
+        # Waits of 0.2s, 0.4s and 0.8s (+10% jitter): four attempts at most
+        self.assertLessEqual(len(self.server.requests('/blocked')), 4)
+        self.assertGreaterEqual(poller.stats[self.sources[0]['name']].polls, 8)
+
+    def test_requests_to_one_host_are_spaced(self):
+        # All on 127.0.0.1: three sources due every 0.5s, one request per 0.15s
+        _, poller = self.poll(self.sources[:3], 1.2, interval=0.5, host_delay=0.15)
+        times = sorted(when for _, _, when in self.server.log)
+        self.assertGreaterEqual(len(times), 6)
+        self.assertGreaterEqual(min(b - a for a, b in zip(times, times[1:])), 0.14)
+        self.assertTrue(all(stats.polls >= 2 for stats in poller.stats.values()))
+
+    def test_unchanged_pages_are_revalidated(self):
+        with tempfile.TemporaryDirectory() as folder:
+            scraper, poller = self.poll(self.sources[:2], 0.8, cache=PageCache(folder), interval=0.2, host_delay=0)
+        statuses = defaultdict(list)
+        for path, status, _ in self.server.log:
+            statuses[path].append(status)
+        for path, seen in statuses.items():
+            self.assertEqual(seen[0], 200, path)
+            self.assertGreater(len(seen), 1, path)
+            self.assertEqual(set(seen[1:]), {304}, path)
+        self.assertEqual(len(scraper.headlines), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,25 +3,78 @@ REST API with Flask - User Management System
 A RESTful API for managing user data with CRUD operations.
 """
 
-from flask import Flask, request, jsonify
-from datetime import datetime
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+from metrics import metrics, current_route
+from storage import create_store, USER_FIELDS
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that reports jsonify() time as the 'serialization' phase"""
+    def response(self, *args, **kwargs):
+        with metrics.timed('serialization'):
+            return super().response(*args, **kwargs)
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
+
+# Storage settings (override with FLASK_USER_STORE=wal, FLASK_USER_STORE_DIR=..., etc.)
+app.config.update(
+    USER_STORE='memory',
+    USER_STORE_DIR=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),
+    WAL_COMPACT_EVERY=100000,
+    WAL_FSYNC=True,
+    METRICS_ENABLED=False
+)
+app.config.from_prefixed_env()
+
+# Request metrics, exposed at /metrics (enable with FLASK_METRICS_ENABLED=true)
+metrics.enabled = app.config['METRICS_ENABLED']
+
+# User storage (thread-safe; see storage.py)
+store = create_store(app.config)
 
-# In-memory storage for users
-users = {}
-next_user_id = 1
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 500
+MAX_BULK_ITEMS = 10000
+RESPONSE_CACHE_SIZE = 10000
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
 
-# Helper function to generate user ID
-def get_next_id():
-    global next_user_id
-    current_id = next_user_id
-    next_user_id += 1
-    return current_id
+# Serialized JSON bodies of hot GET responses: key -> (etag, body)
+response_cache = OrderedDict()
+response_cache_lock = threading.Lock()
+response_cache_bytes = 0
+
+# Request timing middleware
+@app.before_request
+def start_request_timer():
+    """Remember when the request started and which route it matched"""
+    if not metrics.enabled:
+        return
+    g.request_start = time.perf_counter()
+    current_route.set(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def record_request_time(response):
+    """Record the request duration by route, method and status"""
+    if metrics.enabled and 'request_start' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code,
+                                time.perf_counter() - g.request_start)
+    return response
 
 # Helper function to validate user data
 def validate_user_data(data, required_fields=None):
     """Validate user data and return error message if invalid"""
+    with metrics.timed('validation'):
+        return check_user_data(data, required_fields)
+
+def check_user_data(data, required_fields):
+    """Return the first validation error in data, or None"""
     if required_fields is None:
         required_fields = ['name', 'email']
     
@@ -33,11 +86,59 @@ def validate_user_data(data, required_fields=None):
             return f"'{field}' is required"
     
     # Email validation (basic)
-    if 'email' in data and '@' not in data['email']:
+    if 'email' in data and (not isinstance(data['email'], str) or '@' not in data['email']):
         return "Invalid email format"
     
     return None
 
+# Helper functions for the serialized response cache
+def get_cached_body(key, etag):
+    """Return the cached body for key if it was stored under etag"""
+    global response_cache_bytes
+    with response_cache_lock:
+        entry = response_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] != etag:
+            # Written since; drop the stale body now rather than waiting for LRU
+            del response_cache[key]
+            response_cache_bytes -= len(entry[1])
+            return None
+        response_cache.move_to_end(key)
+        return entry[1]
+
+def cache_body(key, etag, body):
+    """Cache a serialized body, evicting the least recently used entries"""
+    global response_cache_bytes
+    if len(body) > RESPONSE_CACHE_BYTES // 16:
+        return
+    with response_cache_lock:
+        old = response_cache.pop(key, None)
+        if old is not None:
+            response_cache_bytes -= len(old[1])
+        response_cache[key] = (etag, body)
+        response_cache_bytes += len(body)
+        while len(response_cache) > RESPONSE_CACHE_SIZE or response_cache_bytes > RESPONSE_CACHE_BYTES:
+            _, (_, evicted) = response_cache.popitem(last=False)
+            response_cache_bytes -= len(evicted)
+
+def clear_response_cache():
+    """Drop every cached body"""
+    global response_cache_bytes
+    with response_cache_lock:
+        response_cache.clear()
+        response_cache_bytes = 0
+
+# Helper function to build a JSON response carrying an ETag
+def etag_response(body, etag):
+    """Return a 200 response for a serialized body, or 304 if the client has it"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
 @app.route('/')
 def home():
     """Home endpoint with API documentation"""
@@ -45,11 +146,16 @@ def home():
         "message": "Welcome to User Management API",
         "version": "1.0.0",
         "endpoints": {
-            "GET /users": "Retrieve all users",
+            "GET /users": "Retrieve users (?limit=&cursor=&fields=&role=&min_age=&max_age=)",
+            "GET /users/export": "Stream all users as NDJSON (?after=<id> to resume)",
             "GET /users/<id>": "Retrieve a specific user by ID",
             "POST /users": "Create a new user",
             "PUT /users/<id>": "Update an existing user",
-            "DELETE /users/<id>": "Delete a user"
+            "DELETE /users/<id>": "Delete a user",
+            "POST /users/bulk": "Create many users (JSON array or NDJSON)",
+            "PUT /users/bulk": "Update many users (each item includes its 'id')",
+            "DELETE /users/bulk": "Delete many users (array of IDs)",
+            "GET /metrics": "Request metrics in Prometheus format (when enabled)"
         },
         "example_user": {
             "name": "John Doe",
@@ -59,28 +165,139 @@ def home():
         }
     }), 200
 
+# Helper function to parse GET /users query parameters
+def parse_user_query(args):
+    """Parse pagination/filter parameters, returning (query, error)"""
+    query = {
+        'limit': None,
+        'cursor': 0,
+        'fields': None,
+        'role': args.get('role'),
+        'min_age': None,
+        'max_age': None
+    }
+    
+    for name in ('limit', 'cursor', 'min_age', 'max_age'):
+        value = args.get(name)
+        if value is None:
+            continue
+        try:
+            query[name] = int(value)
+        except ValueError:
+            return None, f"'{name}' must be an integer"
+    
+    if query['limit'] is not None and not 1 <= query['limit'] <= MAX_PAGE_SIZE:
+        return None, f"'limit' must be between 1 and {MAX_PAGE_SIZE}"
+    if query['cursor'] < 0:
+        return None, "'cursor' must not be negative"
+    
+    if 'fields' in args:
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        for field in fields:
+            if field not in USER_FIELDS:
+                return None, f"Unknown field '{field}'"
+        query['fields'] = fields
+    
+    return query, None
+
 @app.route('/users', methods=['GET'])
 def get_users():
-    """GET /users - Retrieve all users"""
-    return jsonify({
+    """GET /users - Retrieve users (supports pagination, projection and filters)"""
+    query, error = parse_user_query(request.args)
+    if error:
+        return jsonify({
+            "success": False,
+            "error": error
+        }), 400
+    
+    # Any write changes the collection tag, which invalidates cached pages.
+    # Keyed on the parsed query, so unknown or reordered parameters share an entry
+    etag = store.collection_tag()
+    cache_key = ('users', query['limit'], query['cursor'], query['role'], query['min_age'], query['max_age'],
+                 None if query['fields'] is None else tuple(query['fields']))
+    if request.if_none_match.contains(etag):
+        return etag_response(None, etag)
+    body = get_cached_body(cache_key, etag)
+    if body is not None:
+        return etag_response(body, etag)
+    
+    page = store.find(query['cursor'], None if query['limit'] is None else query['limit'] + 1,
+                      query['role'], query['min_age'], query['max_age'])
+    
+    next_cursor = None
+    if query['limit'] is not None and len(page) > query['limit']:
+        page = page[:query['limit']]
+        next_cursor = page[-1]['id']
+    
+    if query['fields'] is not None:
+        page = [{field: user[field] for field in query['fields']} for user in page]
+    
+    response = {
         "success": True,
-        "count": len(users),
-        "users": list(users.values())
-    }), 200
+        "count": len(page),
+        "users": page
+    }
+    if query['limit'] is not None:
+        response["next_cursor"] = next_cursor
+    
+    body = jsonify(response).get_data()
+    # Only cache pages (not the whole table), and only if no write happened
+    # while the page was being read
+    if query['limit'] is not None and store.collection_tag() == etag:
+        cache_body(cache_key, etag, body)
+    return etag_response(body, etag)
+
+# Helper function to stream users as NDJSON
+def export_users(after=0):
+    """Yield NDJSON chunks for users with an ID greater than after"""
+    while True:
+        # Continue from the last exported ID on every chunk so users created
+        # or deleted while the export is running never shift the position
+        chunk = store.scan(after, EXPORT_CHUNK_SIZE)
+        if not chunk:
+            return
+        after = chunk[-1]['id']
+        yield "".join(json.dumps(user) + "\n" for user in chunk)
+
+@app.route('/users/export', methods=['GET'])
+def export_users_ndjson():
+    """GET /users/export - Stream all users as NDJSON (resumable with ?after=<id>)"""
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "'after' must be an integer"
+        }), 400
+    
+    return Response(export_users(after), mimetype='application/x-ndjson'), 200
 
 @app.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     """GET /users/<id> - Retrieve a specific user by ID"""
-    if user_id not in users:
+    # Updating or deleting the user changes its tag, which invalidates the cache
+    etag = store.user_tag(user_id)
+    if etag is not None:
+        if request.if_none_match.contains(etag):
+            return etag_response(None, etag)
+        body = get_cached_body(('user', user_id), etag)
+        if body is not None:
+            return etag_response(body, etag)
+    
+    user, etag = store.get_tagged(user_id)
+    if user is None:
         return jsonify({
             "success": False,
             "error": f"User with ID {user_id} not found"
         }), 404
     
-    return jsonify({
+    body = jsonify({
         "success": True,
-        "user": users[user_id]
-    }), 200
+        "user": user
+    }).get_data()
+    if store.user_tag(user_id) == etag:
+        cache_body(('user', user_id), etag, body)
+    return etag_response(body, etag)
 
 @app.route('/users', methods=['POST'])
 def create_user():
@@ -95,38 +312,24 @@ def create_user():
             "error": error
         }), 400
     
-    # Check if email already exists
-    for user in users.values():
-        if user['email'] == data['email']:
-            return jsonify({
-                "success": False,
-                "error": "Email already exists"
-            }), 409
-    
-    # Create new user
-    user_id = get_next_id()
-    new_user = {
-        "id": user_id,
-        "name": data['name'],
-        "email": data['email'],
-        "age": data.get('age'),
-        "role": data.get('role', 'user'),
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-    
-    users[user_id] = new_user
+    # Create new user (fails if the email already exists)
+    created, failures = store.create_many([data])
+    if failures:
+        return jsonify({
+            "success": False,
+            "error": failures[0]['error']
+        }), failures[0]['status']
     
     return jsonify({
         "success": True,
         "message": "User created successfully",
-        "user": new_user
+        "user": created[0]
     }), 201
 
 @app.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     """PUT /users/<id> - Update an existing user"""
-    if user_id not in users:
+    if store.get(user_id) is None:
         return jsonify({
             "success": False,
             "error": f"User with ID {user_id} not found"
@@ -134,62 +337,207 @@ def update_user(user_id):
     
     data = request.get_json()
     
-    if not data:
+    # Validate input
+    error = validate_user_data(data, required_fields=[])
+    if error:
         return jsonify({
             "success": False,
-            "error": "Request body is required"
+            "error": error
         }), 400
     
-    # Check if email is being changed and already exists
-    if 'email' in data and data['email'] != users[user_id]['email']:
-        for uid, user in users.items():
-            if uid != user_id and user['email'] == data['email']:
-                return jsonify({
-                    "success": False,
-                    "error": "Email already exists"
-                }), 409
-    
-    # Update user fields
-    user = users[user_id]
-    if 'name' in data:
-        user['name'] = data['name']
-    if 'email' in data:
-        if '@' not in data['email']:
-            return jsonify({
-                "success": False,
-                "error": "Invalid email format"
-            }), 400
-        user['email'] = data['email']
-    if 'age' in data:
-        user['age'] = data['age']
-    if 'role' in data:
-        user['role'] = data['role']
-    
-    user['updated_at'] = datetime.now().isoformat()
+    # Update user fields (fails if the email belongs to another user)
+    updated, failures = store.update_many([(user_id, data)])
+    if failures:
+        return jsonify({
+            "success": False,
+            "error": failures[0]['error']
+        }), failures[0]['status']
     
     return jsonify({
         "success": True,
         "message": "User updated successfully",
-        "user": user
+        "user": updated[0]
     }), 200
 
 @app.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     """DELETE /users/<id> - Delete a user"""
-    if user_id not in users:
+    deleted, failures = store.delete_many([user_id])
+    if failures:
         return jsonify({
             "success": False,
-            "error": f"User with ID {user_id} not found"
-        }), 404
-    
-    deleted_user = users.pop(user_id)
+            "error": failures[0]['error']
+        }), failures[0]['status']
     
     return jsonify({
         "success": True,
         "message": "User deleted successfully",
-        "user": deleted_user
+        "user": deleted[0]
     }), 200
 
+# Helper function to read a bulk request body
+def parse_bulk_items():
+    """Read a JSON array or NDJSON request body, returning (items, error)"""
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        lines = request.get_data(as_text=True).splitlines()
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                return None, f"Invalid JSON on line {line_number}"
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return None, "Request body must be a JSON array or NDJSON"
+    
+    if not items:
+        return None, "At least one item is required"
+    if len(items) > MAX_BULK_ITEMS:
+        return None, f"A bulk request can contain at most {MAX_BULK_ITEMS} items"
+    
+    return items, None
+
+# Helper function to report a rejected batch
+def bulk_rejection(failures, total):
+    """Build the error response for a batch where at least one item failed"""
+    return jsonify({
+        "success": False,
+        "error": f"{len(failures)} of {total} item(s) failed; no changes were applied",
+        "results": failures
+    }), min(failure['status'] for failure in failures)
+
+# Helper function to read the user ID of a bulk update/delete item
+def bulk_item_id(item):
+    """Return the user ID referenced by a bulk item, or None if missing"""
+    user_id = item.get('id') if isinstance(item, dict) else item
+    if isinstance(user_id, int) and not isinstance(user_id, bool):
+        return user_id
+    return None
+
+@app.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """POST /users/bulk - Create many users in one atomic batch"""
+    items, error = parse_bulk_items()
+    if error:
+        return jsonify({
+            "success": False,
+            "error": error
+        }), 400
+    
+    # Validate every item before touching the store
+    failures = []
+    for index, data in enumerate(items):
+        if not isinstance(data, dict):
+            error = "Each item must be a JSON object"
+        else:
+            error = validate_user_data(data)
+        if error:
+            failures.append({"index": index, "status": 400, "error": error})
+    
+    if not failures:
+        created, failures = store.create_many(items)
+    if failures:
+        return bulk_rejection(failures, len(items))
+    
+    results = [{"index": index, "status": 201, "user": user}
+               for index, user in enumerate(created)]
+    
+    return jsonify({
+        "success": True,
+        "message": f"{len(results)} user(s) created successfully",
+        "count": len(results),
+        "results": results
+    }), 201
+
+@app.route('/users/bulk', methods=['PUT'])
+def bulk_update_users():
+    """PUT /users/bulk - Update many users (each item carries its 'id') atomically"""
+    items, error = parse_bulk_items()
+    if error:
+        return jsonify({
+            "success": False,
+            "error": error
+        }), 400
+    
+    # Validate every item before touching the store
+    failures = []
+    changes = []
+    for index, data in enumerate(items):
+        if not isinstance(data, dict):
+            error = "Each item must be a JSON object"
+        elif bulk_item_id(data) is None:
+            error = "'id' is required"
+        else:
+            error = validate_user_data(data, required_fields=[])
+        if error:
+            failures.append({"index": index, "status": 400, "error": error})
+        else:
+            changes.append((data['id'], data))
+    
+    if not failures:
+        updated, failures = store.update_many(changes)
+    if failures:
+        return bulk_rejection(failures, len(items))
+    
+    results = [{"index": index, "status": 200, "user": user}
+               for index, user in enumerate(updated)]
+    
+    return jsonify({
+        "success": True,
+        "message": f"{len(results)} user(s) updated successfully",
+        "count": len(results),
+        "results": results
+    }), 200
+
+@app.route('/users/bulk', methods=['DELETE'])
+def bulk_delete_users():
+    """DELETE /users/bulk - Delete many users (IDs or {"id": ...} objects) atomically"""
+    items, error = parse_bulk_items()
+    if error:
+        return jsonify({
+            "success": False,
+            "error": error
+        }), 400
+    
+    # Validate every item before touching the store
+    failures = []
+    user_ids = []
+    for index, item in enumerate(items):
+        user_id = bulk_item_id(item)
+        if user_id is None:
+            failures.append({"index": index, "status": 400,
+                             "error": "Each item must be a user ID or an object with an 'id'"})
+        user_ids.append(user_id)
+    
+    if not failures:
+        deleted, failures = store.delete_many(user_ids)
+    if failures:
+        return bulk_rejection(failures, len(items))
+    
+    results = [{"index": index, "status": 200, "user": user}
+               for index, user in enumerate(deleted)]
+    
+    return jsonify({
+        "success": True,
+        "message": f"{len(results)} user(s) deleted successfully",
+        "count": len(results),
+        "results": results
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """GET /metrics - Request latency histograms in Prometheus text format"""
+    if not metrics.enabled:
+        return jsonify({
+            "success": False,
+            "error": "Metrics are disabled (set FLASK_METRICS_ENABLED=true)"
+        }), 404
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,346 @@
+"""
+Benchmarks for the User Management API
+Sends requests through Flask's test client (no network) against stores
+seeded with many users.
+
+Latency of POST /users, PUT /users/<id> (changing the email) and DELETE
+/users/<id> as the number of stored users grows. Stored and new users have
+random ages and roles, so every write lands at a random spot in the role
+and age indexes; with the email index and bucketed sorted indexes,
+latency should stay flat:
+
+    python benchmark.py --users 1000 100000 1000000
+
+or compares creating users one POST /users at a time with POST /users/bulk
+batches (JSON array and NDJSON):
+
+    python benchmark.py --bulk 10000 --batch-size 1000
+
+or measures read throughput (store.get and GET /users/<id>) from 1, 2, 4...
+threads while other threads keep updating users:
+
+    python benchmark.py --threads 1 2 4 8 16
+
+or measures the write-ahead log store (FLASK_USER_STORE=wal): durable writes
+per second from 1 and 16 threads (fsync on), and the startup time of a store
+holding 1M users, replayed from the WAL and loaded from a snapshot:
+
+    python benchmark.py --wal --store-size 1000000
+
+or compares p50/p99 latency of every CRUD route on the in-memory and SQLite
+backends (the response cache is cleared before each request, so every GET
+reads the store):
+
+    python benchmark.py --backends --store-size 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import app as api
+from storage import DurableUserStore, InMemoryUserStore, SQLiteUserStore
+
+
+def random_user(rng, name, email):
+    """A user dict with a random age and role"""
+    return {"name": name, "email": email, "age": rng.randint(18, 80), "role": rng.choice(('developer', 'manager', 'user'))}
+
+
+def seed_users(store, count, batch_size=10000, seed=1):
+    """Create count users with random ages and roles, in batches"""
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        store.create_many([random_user(rng, f"Seed User {i}", f"seed-{i}@example.com")
+                           for i in range(start, min(count, start + batch_size))])
+
+
+def use_store(store):
+    """Point the app's routes at store, dropping cached responses"""
+    api.store = store
+    api.clear_response_cache()
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def time_requests(client, requests, expected):
+    """Send (method, path, body) requests, returning sorted latencies in seconds"""
+    samples = []
+    for method, path, body in requests:
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != expected:
+            raise SystemExit(f"{method} {path} returned {response.status_code}: {response.get_data()[:200]!r}")
+    return sorted(samples)
+
+
+def bench_email_index(sizes, count):
+    """POST, email-changing PUT and DELETE latency at each store size"""
+    client = api.app.test_client()
+    print("=" * 82)
+    print(f"{'Users':>10}{'Seed s':>8}{'POST p50':>11}{'POST p99':>11}{'PUT p50':>10}{'PUT p99':>10}"
+          f"{'DEL p50':>11}{'DEL p99':>11}")
+    print("-" * 82)
+    for size in sizes:
+        rng = random.Random(size)
+        store = InMemoryUserStore()
+        start = time.perf_counter()
+        seed_users(store, size)
+        seeded = time.perf_counter() - start
+        use_store(store)
+
+        posts = time_requests(client, [('POST', '/users', random_user(rng, f"New User {i}", f"New-{i}@Example.com"))
+                                       for i in range(count)], 201)
+        step = max(1, size // count)
+        puts = time_requests(client, [('PUT', f"/users/{1 + i * step % size}", {"email": f"moved-{i}@example.com"})
+                                      for i in range(count)], 200)
+        deletes = time_requests(client, [('DELETE', f"/users/{user_id}", None)
+                                         for user_id in rng.sample(range(1, size + 1), min(count, size))], 200)
+        print(f"{size:>10}{seeded:>8.1f}"
+              f"{percentile(posts, 0.50) * 1e3:>11.3f}{percentile(posts, 0.99) * 1e3:>11.3f}"
+              f"{percentile(puts, 0.50) * 1e3:>10.3f}{percentile(puts, 0.99) * 1e3:>10.3f}"
+              f"{percentile(deletes, 0.50) * 1e3:>11.3f}{percentile(deletes, 0.99) * 1e3:>11.3f}")
+    print("=" * 82)
+    print("Latency in ms. Flat rows mean neither the email check nor the index updates depend on the user count.")
+
+
+def new_users(start, count):
+    """Return count new user dicts with unique emails"""
+    return [{"name": f"Bulk User {i}", "email": f"bulk-{i}@example.com", "age": 18 + i % 50}
+            for i in range(start, start + count)]
+
+
+def bench_bulk(count, batch_size):
+    """Users created per second by single POSTs and by bulk batches"""
+    client = api.app.test_client()
+    users = new_users(0, count)
+
+    use_store(InMemoryUserStore())
+    start = time.perf_counter()
+    time_requests(client, [('POST', '/users', user) for user in users], 201)
+    single = time.perf_counter() - start
+
+    use_store(InMemoryUserStore())
+    start = time.perf_counter()
+    time_requests(client, [('POST', '/users/bulk', users[i:i + batch_size])
+                           for i in range(0, count, batch_size)], 201)
+    bulk = time.perf_counter() - start
+
+    use_store(InMemoryUserStore())
+    start = time.perf_counter()
+    for i in range(0, count, batch_size):
+        body = "".join(json.dumps(user) + "\n" for user in users[i:i + batch_size])
+        response = client.post('/users/bulk', data=body, content_type='application/x-ndjson')
+        if response.status_code != 201:
+            raise SystemExit(f"POST /users/bulk returned {response.status_code}: {response.get_data()[:200]!r}")
+    ndjson = time.perf_counter() - start
+
+    print("=" * 52)
+    print(f"{'Path':<30}{'Seconds':>10}{'Users/s':>12}")
+    print("-" * 52)
+    print(f"{'POST /users':<30}{single:>10.2f}{count / single:>12.0f}")
+    print(f"{f'POST /users/bulk x{batch_size}':<30}{bulk:>10.2f}{count / bulk:>12.0f}")
+    print(f"{f'POST /users/bulk x{batch_size} NDJSON':<30}{ndjson:>10.2f}{count / ndjson:>12.0f}")
+    print("=" * 52)
+
+
+def read_throughput(read, thread_count, duration, user_count, writers):
+    """Reads per second from thread_count threads calling read(user_id) for duration seconds"""
+    stop = threading.Event()
+    reads = []
+
+    def reader(seed):
+        rng = random.Random(seed)
+        done = 0
+        while not stop.is_set():
+            for _ in range(100):
+                read(rng.randint(1, user_count))
+            done += 100
+        reads.append(done)
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            api.store.update_many([(rng.randint(1, user_count), {"age": rng.randint(18, 70)})])
+
+    threads = ([threading.Thread(target=reader, args=(n,)) for n in range(thread_count)]
+               + [threading.Thread(target=writer, args=(-n,)) for n in range(1, writers + 1)])
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / duration
+
+
+def bench_threads(thread_counts, user_count, duration, writers):
+    """Read throughput as reader threads are added"""
+    store = InMemoryUserStore()
+    seed_users(store, user_count)
+    use_store(store)
+    client = api.app.test_client()
+
+    def read_route(user_id):
+        client.get(f"/users/{user_id}")
+
+    print("=" * 50)
+    print(f"{'Threads':>8}{'get()/s':>14}{'GET /users/<id>/s':>20}")
+    print("-" * 50)
+    for count in thread_counts:
+        gets = read_throughput(store.get, count, duration, user_count, writers)
+        routes = read_throughput(read_route, count, duration, user_count, writers)
+        print(f"{count:>8}{gets:>14.0f}{routes:>20.0f}")
+    print("=" * 50)
+    print(f"With {writers} writer thread(s) updating users throughout.")
+
+
+def write_throughput(data_dir, thread_count, writes):
+    """Single-user creates per second on a fresh WAL store, split over thread_count threads"""
+    store = DurableUserStore(data_dir)
+    per_thread = writes // thread_count
+
+    def writer(number):
+        for i in range(per_thread):
+            store.create_many([{"name": "Writer", "email": f"w{number}-{i}@example.com"}])
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return per_thread * thread_count / elapsed
+
+
+def time_recovery(data_dir):
+    """Return (seconds to open the store, users recovered)"""
+    start = time.perf_counter()
+    store = DurableUserStore(data_dir, compact_every=10**9)
+    elapsed = time.perf_counter() - start
+    count = store.count()
+    store.close()
+    return elapsed, count
+
+
+def bench_wal(user_count, writes, thread_counts):
+    """Durable write throughput and recovery time of DurableUserStore"""
+    with tempfile.TemporaryDirectory() as temp:
+        print("=" * 50)
+        print(f"{'Threads':>8}{'Writes':>10}{'Writes/s':>14}")
+        print("-" * 50)
+        for count in thread_counts:
+            rate = write_throughput(os.path.join(temp, f"writes-{count}"), count, writes)
+            print(f"{count:>8}{writes // count * count:>10}{rate:>14.0f}")
+        print("=" * 50)
+
+        # Recovery: everything in the WAL, then everything in a snapshot
+        data_dir = os.path.join(temp, 'recovery')
+        store = DurableUserStore(data_dir, compact_every=10**9, fsync=False)
+        seed_users(store, user_count, batch_size=1000)
+        store.close()
+        wal_seconds, wal_users = time_recovery(data_dir)
+
+        # One more write past compact_every rotates the log and writes a snapshot
+        store = DurableUserStore(data_dir, compact_every=1, fsync=False)
+        store.create_many([{"name": "Snapshot", "email": "snapshot@example.com"}])
+        store.close()
+        snapshot_seconds, snapshot_users = time_recovery(data_dir)
+
+        print(f"{'Recovery from':<16}{'Users':>10}{'Seconds':>10}")
+        print("-" * 50)
+        print(f"{'WAL':<16}{wal_users:>10}{wal_seconds:>10.2f}")
+        print(f"{'Snapshot':<16}{snapshot_users:>10}{snapshot_seconds:>10.2f}")
+        print("=" * 50)
+
+
+def route_latencies(client, user_count, count, rng):
+    """Time count requests per CRUD route against a store seeded with user_count users"""
+    def uncached(requests, expected):
+        samples = []
+        for request in requests:
+            api.clear_response_cache()
+            samples += time_requests(client, [request], expected)
+        return sorted(samples)
+
+    ids = rng.sample(range(1, user_count + 1), count * 2)
+    return {
+        'POST /users': uncached([('POST', '/users', {"name": "Bench", "email": f"bench-{i}@example.com"})
+                                 for i in range(count)], 201),
+        'GET /users/<id>': uncached([('GET', f"/users/{user_id}", None) for user_id in ids[:count]], 200),
+        'GET /users?limit=20': uncached([('GET', f"/users?limit=20&cursor={rng.randrange(user_count)}", None)
+                                         for _ in range(count)], 200),
+        'GET /users?role=&min_age=': uncached([('GET', f"/users?limit=20&role=manager&min_age={rng.randint(18, 60)}",
+                                                None) for _ in range(count)], 200),
+        'PUT /users/<id>': uncached([('PUT', f"/users/{user_id}", {"age": rng.randint(18, 70)})
+                                     for user_id in ids[:count]], 200),
+        'DELETE /users/<id>': uncached([('DELETE', f"/users/{user_id}", None) for user_id in ids[count:]], 200),
+    }
+
+
+def bench_backends(user_count, count):
+    """p50/p99 per CRUD route, in-memory vs SQLite"""
+    client = api.app.test_client()
+    results = {}
+    with tempfile.TemporaryDirectory() as temp:
+        for name, store in (('memory', InMemoryUserStore()),
+                            ('sqlite', SQLiteUserStore(os.path.join(temp, 'users.db')))):
+            seed_users(store, user_count)
+            use_store(store)
+            results[name] = route_latencies(client, user_count, count, random.Random(1))
+            store.close()
+
+    print("=" * 74)
+    print(f"{'Route':<28}{'memory p50':>12}{'p99':>8}{'sqlite p50':>14}{'p99':>8}")
+    print("-" * 74)
+    for route in results['memory']:
+        memory, sqlite = results['memory'][route], results['sqlite'][route]
+        print(f"{route:<28}{percentile(memory, 0.50) * 1e3:>12.3f}{percentile(memory, 0.99) * 1e3:>8.3f}"
+              f"{percentile(sqlite, 0.50) * 1e3:>14.3f}{percentile(sqlite, 0.99) * 1e3:>8.3f}")
+    print("=" * 74)
+    print(f"Latency in ms, {count} requests per route, {user_count} users.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the User Management API")
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 100000, 1000000],
+                        help="Store sizes to seed")
+    parser.add_argument('--requests', type=int, default=2000, help="Timed requests per route and size")
+    parser.add_argument('--bulk', type=int, metavar='USERS',
+                        help="Compare single and bulk creation of this many users")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Users per bulk request for --bulk")
+    parser.add_argument('--threads', type=int, nargs='+', help="Reader thread counts to measure")
+    parser.add_argument('--writers', type=int, default=1, help="Writer threads running during --threads")
+    parser.add_argument('--duration', type=float, default=2, help="Seconds per --threads measurement")
+    parser.add_argument('--store-size', type=int, default=100000, help="Users seeded for --threads and --wal")
+    parser.add_argument('--wal', action='store_true', help="Benchmark the write-ahead log store")
+    parser.add_argument('--writes', type=int, default=4000, help="Durable writes timed per thread count for --wal")
+    parser.add_argument('--backends', action='store_true', help="Compare route latency on memory and SQLite")
+    args = parser.parse_args()
+
+    if args.backends:
+        bench_backends(args.store_size, args.requests)
+    elif args.wal:
+        bench_wal(args.store_size, args.writes, args.threads or [1, 16])
+    elif args.threads:
+        bench_threads(args.threads, args.store_size, args.duration, args.writers)
+    elif args.bulk:
+        bench_bulk(args.bulk, args.batch_size)
+    else:
+        bench_email_index(args.users, args.requests)
+
+
+if __name__ == '__main__':
+    main()
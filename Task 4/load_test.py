@@ -0,0 +1,220 @@
+"""
+Load Generator for the User Management API
+Opens many concurrent keep-alive connections, sends a mixed CRUD workload and
+reports throughput and latency percentiles per operation.
+
+    python load_test.py --connections 1000 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlsplit
+
+# Share of requests per operation
+WORKLOAD = (
+    ('GET /users/<id>', 0.60),
+    ('GET /users?limit=20', 0.20),
+    ('POST /users', 0.10),
+    ('PUT /users/<id>', 0.07),
+    ('DELETE /users/<id>', 0.03)
+)
+
+
+class Connection:
+    """A single keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def request(self, method, path, body=None):
+        """Send a request and return (status, body), reconnecting if the server closed"""
+        if self.writer is None:
+            await self.open()
+
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        head = (f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n")
+        self.writer.write(head.encode('latin-1') + payload)
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+
+        length = None
+        chunked = False
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding' and 'chunked' in value:
+                chunked = True
+            elif name == 'connection' and value == 'close':
+                keep_alive = False
+
+        if chunked:
+            data = bytearray()
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while await self.reader.readline() not in (b'\r\n', b''):
+                        pass
+                    break
+                data += await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+        elif length is not None:
+            data = await self.reader.readexactly(length)
+        else:
+            data = await self.reader.read()
+            keep_alive = False
+
+        if not keep_alive:
+            self.close()
+        return status, bytes(data)
+
+
+class Stats:
+    """Latency samples and error counts per operation"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name, _ in WORKLOAD}
+        self.errors = {name: 0 for name, _ in WORKLOAD}
+
+    def record(self, operation, seconds, ok):
+        self.latencies[operation].append(seconds)
+        if not ok:
+            self.errors[operation] += 1
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def client(number, args, run_id, user_ids, stats, deadline):
+    """Run one connection's request loop until the deadline"""
+    conn = Connection(args.host, args.port)
+    operations = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    created = 0
+
+    while time.perf_counter() < deadline:
+        operation = random.choices(operations, weights)[0]
+        user_id = random.choice(user_ids) if user_ids else 1
+
+        if operation == 'GET /users/<id>':
+            request = ('GET', f"/users/{user_id}", None)
+        elif operation == 'GET /users?limit=20':
+            request = ('GET', f"/users?limit=20&cursor={random.randint(0, max(user_ids, default=0))}", None)
+        elif operation == 'POST /users':
+            created += 1
+            request = ('POST', '/users', {
+                "name": f"Load User {number}-{created}",
+                "email": f"load-{run_id}-{number}-{created}@example.com",
+                "age": random.randint(18, 70),
+                "role": random.choice(['developer', 'manager', 'user'])
+            })
+        elif operation == 'PUT /users/<id>':
+            request = ('PUT', f"/users/{user_id}", {"age": random.randint(18, 70)})
+        else:
+            request = ('DELETE', f"/users/{user_id}", None)
+
+        start = time.perf_counter()
+        try:
+            status, body = await conn.request(*request)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            conn.close()
+            stats.record(operation, time.perf_counter() - start, False)
+            continue
+        elapsed = time.perf_counter() - start
+
+        # 404s are expected once users start being deleted
+        stats.record(operation, elapsed, status < 400 or status == 404)
+        if operation == 'POST /users' and status == 201:
+            user_ids.append(json.loads(body)['user']['id'])
+        elif operation == 'DELETE /users/<id>' and status == 200 and user_id in user_ids:
+            user_ids.remove(user_id)
+
+    conn.close()
+
+
+async def seed_users(args, run_id):
+    """Create the initial users in one bulk request and return their IDs"""
+    conn = Connection(args.host, args.port)
+    items = [{"name": f"Seed User {i}", "email": f"seed-{run_id}-{i}@example.com", "age": 18 + i % 50}
+             for i in range(args.seed_users)]
+    status, body = await conn.request('POST', '/users/bulk', items)
+    conn.close()
+    if status != 201:
+        raise SystemExit(f"Seeding failed with status {status}: {body[:200]!r}")
+    return [result['user']['id'] for result in json.loads(body)['results']]
+
+
+async def run(args):
+    run_id = uuid.uuid4().hex[:8]
+    user_ids = await seed_users(args, run_id) if args.seed_users else []
+    stats = Stats()
+
+    print(f"Running {args.connections} connections for {args.duration}s against {args.url}")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(client(number, args, run_id, user_ids, stats, deadline)
+                           for number in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(samples) for samples in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    print("=" * 78)
+    print(f"{'Operation':<24}{'Requests':>10}{'Errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    print("-" * 78)
+    for operation, samples in stats.latencies.items():
+        samples.sort()
+        print(f"{operation:<24}{len(samples):>10}{stats.errors[operation]:>8}"
+              f"{percentile(samples, 0.50) * 1e3:>10.2f}"
+              f"{percentile(samples, 0.90) * 1e3:>10.2f}"
+              f"{percentile(samples, 0.99) * 1e3:>10.2f}")
+    print("=" * 78)
+    print(f"Total: {total} requests, {errors} errors, {total / elapsed:.0f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the User Management API")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="API base URL")
+    parser.add_argument('--connections', type=int, default=100, help="Concurrent keep-alive connections")
+    parser.add_argument('--duration', type=float, default=10, help="Test duration in seconds")
+    parser.add_argument('--seed-users', type=int, default=1000, help="Users created before the test")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    args.host = url.hostname
+    args.port = url.port or 80
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Request metrics for the User Management API.
+Latency histograms and counters, rendered in the Prometheus text format.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route of the request being handled, used to label phase timings
+current_route = contextvars.ContextVar('current_route', default='unknown')
+
+# Shared no-op context returned by timed() while metrics are disabled
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def escape_label(value):
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """
+    Collects per-route request latencies and per-phase timings.
+
+    While disabled, timed() returns a shared no-op context manager and
+    nothing is recorded, so instrumented code pays almost nothing.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._requests = {}   # (route, method, status) -> Histogram
+        self._phases = {}     # (route, phase) -> Histogram
+
+    def observe_request(self, route, method, status, seconds):
+        """Record the duration of one handled request"""
+        with self._lock:
+            key = (route, method, status)
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_phase(self, phase, seconds):
+        """Record time spent in one phase of the current request"""
+        with self._lock:
+            key = (current_route.get(), phase)
+            histogram = self._phases.get(key)
+            if histogram is None:
+                histogram = self._phases[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timed(self, phase):
+        """Context manager timing a phase (validation, duplicate_check, ...)"""
+        if not self.enabled:
+            return _DISABLED
+        return self._timer(phase)
+
+    @contextmanager
+    def _timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = {key: (list(h.counts), h.sum, h.count) for key, h in self._requests.items()}
+            phases = {key: (list(h.counts), h.sum, h.count) for key, h in self._phases.items()}
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by route, method and status.",
+            "# TYPE http_requests_total counter"
+        ]
+        for (route, method, status), (_, _, count) in sorted(requests.items()):
+            labels = f'route="{escape_label(route)}",method="{method}",status="{status}"'
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route, method and status.",
+            "# TYPE http_request_duration_seconds histogram"
+        ]
+        for (route, method, status), values in sorted(requests.items()):
+            labels = f'route="{escape_label(route)}",method="{method}",status="{status}"'
+            lines += self._render_histogram("http_request_duration_seconds", labels, values)
+
+        lines += [
+            "# HELP user_api_phase_duration_seconds Time spent in request phases, by route and phase.",
+            "# TYPE user_api_phase_duration_seconds histogram"
+        ]
+        for (route, phase), values in sorted(phases.items()):
+            labels = f'route="{escape_label(route)}",phase="{phase}"'
+            lines += self._render_histogram("user_api_phase_duration_seconds", labels, values)
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(name, labels, values):
+        counts, total, count = values
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+
+# Shared instance used by the app and the storage backends
+metrics = Metrics()
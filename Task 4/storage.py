@@ -0,0 +1,964 @@
+"""
+Storage backends for the User Management API.
+Holds user records together with the secondary indexes used by the routes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import islice
+
+from metrics import metrics
+
+# Fields stored for every user, in response order
+USER_FIELDS = ('id', 'name', 'email', 'age', 'role', 'created_at', 'updated_at')
+
+# Fields a client may change with PUT
+UPDATABLE_FIELDS = ('name', 'email', 'age', 'role')
+
+
+def normalize_email(email):
+    """Return the case-insensitive key used by the email index"""
+    return email.strip().lower()
+
+
+def is_indexable_age(age):
+    """Only numeric ages take part in age-range filtering"""
+    return isinstance(age, (int, float)) and not isinstance(age, bool)
+
+
+def failure(index, status, error):
+    """Build a per-item failure entry for batch results"""
+    return {"index": index, "status": status, "error": error}
+
+
+class SortedList:
+    """
+    A sorted list kept in buckets of at most 2 * LOAD values.
+
+    Inserting into or deleting from one flat list shifts every value after
+    that position, O(n) work done under the store's write lock; here add()
+    and remove() only shift values within one bucket (plus the list of
+    buckets when one splits or empties).
+    """
+
+    LOAD = 1024
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self._buckets = [values[i:i + self.LOAD] for i in range(0, len(values), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]   # last value of each bucket
+        self._len = len(values)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, value):
+        """Insert a value, keeping the list sorted"""
+        if not self._buckets:
+            self._buckets.append([value])
+            self._maxes.append(value)
+        else:
+            position = min(bisect_right(self._maxes, value), len(self._buckets) - 1)
+            bucket = self._buckets[position]
+            insort(bucket, value)
+            self._maxes[position] = bucket[-1]
+            if len(bucket) > 2 * self.LOAD:
+                self._buckets[position:position + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+                self._maxes[position:position + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+        self._len += 1
+
+    def remove(self, value):
+        """Remove one occurrence of a value; raises ValueError if it isn't there"""
+        position = bisect_left(self._maxes, value)
+        if position < len(self._buckets):
+            bucket = self._buckets[position]
+            index = bisect_left(bucket, value)
+            if bucket[index] == value:
+                del bucket[index]
+                if bucket:
+                    self._maxes[position] = bucket[-1]
+                else:
+                    del self._buckets[position]
+                    del self._maxes[position]
+                self._len -= 1
+                return
+        raise ValueError(f"{value!r} not in list")
+
+    def _bounds(self, low, high):
+        """Return (bucket, index) of the first value >= low and just past the last value <= high"""
+        first = last = (len(self._buckets), 0)
+        if low is None:
+            first = (0, 0)
+        else:
+            position = bisect_left(self._maxes, low)
+            if position < len(self._buckets):
+                first = (position, bisect_left(self._buckets[position], low))
+        if high is not None:
+            position = bisect_right(self._maxes, high)
+            if position < len(self._buckets):
+                last = (position, bisect_right(self._buckets[position], high))
+        return first, last
+
+    def count(self, low=None, high=None):
+        """Return how many values are in [low, high] (None = no bound)"""
+        (first, start), (last, stop) = self._bounds(low, high)
+        if (first, start) >= (last, stop):
+            return 0
+        if 2 * (last - first) <= len(self._buckets):
+            return sum(map(len, islice(self._buckets, first, last))) - start + stop
+        # Wide range: count what lies outside it instead
+        return (self._len - sum(map(len, islice(self._buckets, first)))
+                - sum(map(len, islice(self._buckets, last, None))) - start + stop)
+
+    def values(self, low=None, high=None):
+        """Return the values in [low, high] (None = no bound) as a list"""
+        (first, start), (last, stop) = self._bounds(low, high)
+        if (first, start) >= (last, stop):
+            return []
+        if first == last:
+            return self._buckets[first][start:stop]
+        values = self._buckets[first][start:]
+        for bucket in islice(self._buckets, first + 1, last):
+            values.extend(bucket)
+        if last < len(self._buckets):
+            values.extend(self._buckets[last][:stop])
+        return values
+
+    def iter_after(self, value):
+        """Iterate in order over the values greater than value"""
+        position = bisect_right(self._maxes, value)
+        if position < len(self._buckets):
+            bucket = self._buckets[position]
+            yield from bucket[bisect_right(bucket, value):]
+            for bucket in islice(self._buckets, position + 1, None):
+                yield from bucket
+
+
+class InMemoryUserStore:
+    """
+    Thread-safe in-memory user store.
+
+    All writes go through one lock that covers ID allocation, the email
+    uniqueness check and every index, so check-then-insert is atomic and
+    IDs are never handed out twice. Records are copy-on-write: an update
+    publishes a new dict instead of mutating the old one, so get() reads
+    without locking and never sees a half-applied update.
+
+    Every user has a version counter, bumped whenever it changes, and the
+    store has a collection version bumped on every write; both are exposed
+    as opaque tags (prefixed with a per-process epoch) for HTTP ETags.
+    """
+
+    # Use the age index only when its range is this much smaller than the
+    # ID/role list (its slice must be re-sorted by ID before paging)
+    AGE_INDEX_SELECTIVITY = 16
+
+    def __init__(self):
+        self._users = {}          # user ID -> user record
+        self._email_index = {}    # normalized email -> user ID
+        self._user_ids = SortedList()   # all user IDs
+        self._role_index = {}           # role -> SortedList of user IDs
+        self._age_index = SortedList()  # (age, user ID) for numeric ages
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions = {}           # user ID -> version
+        self._collection_version = 0
+
+    # ----- Reads -----
+
+    def get(self, user_id):
+        """Return the user with the given ID, or None"""
+        return self._users.get(user_id)
+
+    def count(self):
+        """Return the number of stored users"""
+        return len(self._users)
+
+    def user_tag(self, user_id):
+        """Return the current version tag of a user, or None if it doesn't exist"""
+        version = self._versions.get(user_id)
+        return None if version is None else f"{self._epoch}-{user_id}-{version}"
+
+    def get_tagged(self, user_id):
+        """Return (user, version tag), or (None, None)"""
+        # Writers publish the record before bumping its version, so at worst
+        # this pairs a new record with the previous tag, never the reverse
+        tag = self.user_tag(user_id)
+        user = self._users.get(user_id)
+        if user is None or tag is None:
+            return None, None
+        return user, tag
+
+    def collection_tag(self):
+        """Return a tag that changes whenever any user is created, updated or deleted"""
+        return f"{self._epoch}-{self._collection_version}"
+
+    def find(self, cursor=0, limit=None, role=None, min_age=None, max_age=None):
+        """Return up to limit matching users with an ID greater than cursor, in ID order"""
+        with self._lock:
+            matching_ids = self._find_ids(cursor, role, min_age, max_age)
+            return [self._users[uid] for uid in islice(matching_ids, limit)]
+
+    def scan(self, after, limit):
+        """Return the next limit users with an ID greater than after"""
+        with self._lock:
+            return [self._users[uid] for uid in islice(self._user_ids.iter_after(after), limit)]
+
+    # ----- Writes -----
+
+    def create_many(self, items):
+        """
+        Create users from validated data, all or nothing
+
+        Returns:
+            (created users, failures) - nothing is created if failures is non-empty
+        """
+        with self._lock:
+            failures = []
+            batch_emails = set()
+            with metrics.timed('duplicate_check'):
+                for index, data in enumerate(items):
+                    email_key = normalize_email(data['email'])
+                    if email_key in self._email_index or email_key in batch_emails:
+                        failures.append(failure(index, 409, "Email already exists"))
+                    batch_emails.add(email_key)
+            if failures:
+                return [], failures
+
+            created = []
+            now = datetime.now().isoformat()
+            for data in items:
+                user = {
+                    "id": self._next_id,
+                    "name": data['name'],
+                    "email": data['email'],
+                    "age": data.get('age'),
+                    "role": data.get('role', 'user'),
+                    "created_at": now,
+                    "updated_at": now
+                }
+                self._next_id += 1
+                self._insert(user)
+                created.append(user)
+            self._collection_version += 1
+            lsn = self._log({"op": "put", "users": created, "next_id": self._next_id})
+        self._await_durable(lsn)
+        return created, []
+
+    def update_many(self, changes):
+        """
+        Apply validated (user ID, data) updates, all or nothing
+
+        Returns:
+            (updated users, failures) - nothing is changed if failures is non-empty
+        """
+        with self._lock:
+            failures = []
+            seen_ids = set()
+            claimed_emails = set()
+            # Users changing their email free up their old one for other items
+            moving_ids = {user_id for user_id, data in changes if 'email' in data}
+            for index, (user_id, data) in enumerate(changes):
+                if user_id in seen_ids:
+                    failures.append(failure(index, 400, f"User with ID {user_id} appears more than once"))
+                elif user_id not in self._users:
+                    failures.append(failure(index, 404, f"User with ID {user_id} not found"))
+                elif 'email' in data:
+                    with metrics.timed('duplicate_check'):
+                        email_key = normalize_email(data['email'])
+                        owner_id = self._email_index.get(email_key)
+                        if email_key in claimed_emails or (
+                                owner_id is not None and owner_id != user_id and owner_id not in moving_ids):
+                            failures.append(failure(index, 409, "Email already exists"))
+                        claimed_emails.add(email_key)
+                seen_ids.add(user_id)
+            if failures:
+                return [], failures
+
+            # Release all old emails first so users can swap emails within a batch
+            for user_id, data in changes:
+                if 'email' in data:
+                    del self._email_index[normalize_email(self._users[user_id]['email'])]
+
+            updated = []
+            now = datetime.now().isoformat()
+            for user_id, data in changes:
+                old_user = self._users[user_id]
+                user = dict(old_user)
+                for field in UPDATABLE_FIELDS:
+                    if field in data:
+                        user[field] = data[field]
+                user['updated_at'] = now
+
+                # Role and age indexes only move when those fields do
+                reindex = self._index_keys(user) != self._index_keys(old_user)
+                if reindex:
+                    self._unindex(old_user)
+                self._users[user_id] = user
+                self._email_index[normalize_email(user['email'])] = user_id
+                if reindex:
+                    self._index(user)
+                self._versions[user_id] += 1
+                updated.append(user)
+            self._collection_version += 1
+            lsn = self._log({"op": "put", "users": updated})
+        self._await_durable(lsn)
+        return updated, []
+
+    def delete_many(self, user_ids):
+        """
+        Delete users by ID, all or nothing
+
+        Returns:
+            (deleted users, failures) - nothing is deleted if failures is non-empty
+        """
+        with self._lock:
+            failures = []
+            seen_ids = set()
+            for index, user_id in enumerate(user_ids):
+                if user_id in seen_ids:
+                    failures.append(failure(index, 400, f"User with ID {user_id} appears more than once"))
+                elif user_id not in self._users:
+                    failures.append(failure(index, 404, f"User with ID {user_id} not found"))
+                seen_ids.add(user_id)
+            if failures:
+                return [], failures
+
+            deleted = [self._remove(user_id) for user_id in user_ids]
+            self._collection_version += 1
+            lsn = self._log({"op": "delete", "ids": list(user_ids)})
+        self._await_durable(lsn)
+        return deleted, []
+
+    # ----- Durability hooks (overridden by DurableUserStore) -----
+
+    def _log(self, record):
+        """Record a write while holding the lock; returns a token for _await_durable"""
+        return None
+
+    def _await_durable(self, lsn):
+        """Block until the write identified by lsn is durable"""
+
+    def close(self):
+        """Release any resources held by the store"""
+
+    # ----- Index maintenance (caller holds the lock) -----
+
+    def _rebuild_indexes(self):
+        """Rebuild every secondary index from self._users in one pass"""
+        self._user_ids = SortedList(self._users)
+        self._email_index = {}
+        roles = {}
+        for uid in self._user_ids:
+            user = self._users[uid]
+            self._email_index[normalize_email(user['email'])] = uid
+            if isinstance(user['role'], str):
+                roles.setdefault(user['role'], []).append(uid)
+        self._role_index = {role: SortedList(ids) for role, ids in roles.items()}
+        self._age_index = SortedList((user['age'], uid) for uid, user in self._users.items()
+                                     if is_indexable_age(user['age']))
+        self._versions = dict.fromkeys(self._users, 1)
+
+    def _insert(self, user):
+        """Store a new user and add it to all indexes"""
+        self._versions[user['id']] = 1
+        self._users[user['id']] = user
+        self._email_index[normalize_email(user['email'])] = user['id']
+        self._user_ids.add(user['id'])
+        self._index(user)
+
+    def _remove(self, user_id):
+        """Delete a user and drop it from all indexes, returning the removed record"""
+        user = self._users.pop(user_id)
+        del self._versions[user_id]
+        self._email_index.pop(normalize_email(user['email']), None)
+        self._user_ids.remove(user_id)
+        self._unindex(user)
+        return user
+
+    @staticmethod
+    def _index_keys(user):
+        """Return what the role and age indexes hold for a user"""
+        return (user['role'] if isinstance(user['role'], str) else None,
+                user['age'] if is_indexable_age(user['age']) else None)
+
+    def _index(self, user):
+        """Add a user to the role and age indexes"""
+        if isinstance(user['role'], str):
+            self._role_index.setdefault(user['role'], SortedList()).add(user['id'])
+        if is_indexable_age(user['age']):
+            self._age_index.add((user['age'], user['id']))
+
+    def _unindex(self, user):
+        """Remove a user from the role and age indexes"""
+        if isinstance(user['role'], str):
+            ids = self._role_index[user['role']]
+            ids.remove(user['id'])
+            if not ids:
+                del self._role_index[user['role']]
+        if is_indexable_age(user['age']):
+            self._age_index.remove((user['age'], user['id']))
+
+    def _find_ids(self, cursor, role, min_age, max_age):
+        """Yield IDs of matching users in ascending order, starting after cursor"""
+        candidates = self._user_ids
+        if role is not None:
+            candidates = self._role_index.get(role, SortedList())
+
+        age_filtered = min_age is not None or max_age is not None
+        if age_filtered:
+            low = None if min_age is None else (min_age,)
+            high = None if max_age is None else (max_age, float('inf'))
+            if self._age_index.count(low, high) <= len(candidates) // self.AGE_INDEX_SELECTIVITY:
+                candidates = SortedList(uid for _, uid in self._age_index.values(low, high))
+
+        for uid in candidates.iter_after(cursor):
+            user = self._users[uid]
+            if role is not None and user['role'] != role:
+                continue
+            if age_filtered:
+                if not is_indexable_age(user['age']):
+                    continue
+                if min_age is not None and user['age'] < min_age:
+                    continue
+                if max_age is not None and user['age'] > max_age:
+                    continue
+            yield uid
+
+
+class DurableUserStore(InMemoryUserStore):
+    """
+    In-memory user store backed by a write-ahead log on disk.
+
+    Every successful write appends one JSON line to the current WAL segment
+    and returns once that line is fsynced. Concurrent writers share fsyncs
+    (group commit): a writer that finds no flush in progress writes out
+    everything queued so far, the others wait for it. After compact_every
+    records the log is rotated to a new segment and a snapshot of the data
+    is written by a background thread, after which older segments are
+    deleted. Startup loads the snapshot and replays the newer segments.
+    """
+
+    SNAPSHOT_FILE = 'users.snapshot'
+    SNAPSHOT_CHUNK_SIZE = 1000
+    SEGMENT_PREFIX = 'wal-'
+    SEGMENT_SUFFIX = '.log'
+
+    def __init__(self, data_dir, compact_every=100000, fsync=True):
+        super().__init__()
+        self.data_dir = data_dir
+        self.compact_every = compact_every
+        self.fsync = fsync
+        os.makedirs(data_dir, exist_ok=True)
+
+        self._flush_cond = threading.Condition()
+        self._pending = []          # encoded records and rotation markers not yet written
+        self._appended_lsn = 0
+        self._durable_lsn = 0
+        self._flushing = False
+        self._records_since_snapshot = 0
+        self._compaction = None
+
+        self._segment = self._recover()
+        self._wal = open(self._segment_path(self._segment), 'ab')
+
+    # ----- Recovery -----
+
+    def _segment_path(self, segment):
+        return os.path.join(self.data_dir, f"{self.SEGMENT_PREFIX}{segment:08d}{self.SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        """Return the numbers of all WAL segments on disk, sorted"""
+        segments = []
+        for filename in os.listdir(self.data_dir):
+            if filename.startswith(self.SEGMENT_PREFIX) and filename.endswith(self.SEGMENT_SUFFIX):
+                segments.append(int(filename[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _recover(self):
+        """Load the latest snapshot, replay newer WAL segments and return the active segment"""
+        first_segment = 1
+        snapshot_path = os.path.join(self.data_dir, self.SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as f:
+                header = json.loads(f.readline())
+                first_segment = header['segment']
+                self._next_id = header['next_id']
+                for line in f:
+                    for user in json.loads(line):
+                        self._users[user['id']] = user
+
+        segments = self._list_segments()
+        for segment in segments:
+            if segment < first_segment:
+                # Already covered by the snapshot (compaction stopped before cleanup)
+                os.remove(self._segment_path(segment))
+            else:
+                self._replay(self._segment_path(segment))
+
+        self._rebuild_indexes()
+        return max(segments + [first_segment])
+
+    def _replay(self, path):
+        """Apply every complete record in a WAL segment"""
+        valid_bytes = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self._apply(record)
+                valid_bytes += len(line)
+
+        # A crash can leave a torn record at the end of the log; drop it
+        if valid_bytes < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def _apply(self, record):
+        """Apply one WAL record to self._users"""
+        if record['op'] == 'put':
+            for user in record['users']:
+                self._users[user['id']] = user
+            self._next_id = max(self._next_id, record.get('next_id', 0))
+        elif record['op'] == 'delete':
+            for user_id in record['ids']:
+                self._users.pop(user_id, None)
+
+    # ----- Logging and group commit -----
+
+    def _log(self, record):
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with self._flush_cond:
+            self._pending.append(line)
+            self._appended_lsn += 1
+            lsn = self._appended_lsn
+
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self.compact_every and self._compaction is None:
+            self._start_compaction()
+        return lsn
+
+    def _await_durable(self, lsn):
+        if lsn is None:
+            return
+        with self._flush_cond:
+            while self._durable_lsn < lsn:
+                if self._flushing:
+                    self._flush_cond.wait()
+                    continue
+
+                # Become the flusher for everything queued so far
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                batch_lsn = self._appended_lsn
+                self._flush_cond.release()
+                try:
+                    self._write_batch(batch)
+                except BaseException:
+                    self._flush_cond.acquire()
+                    self._pending = batch + self._pending
+                    self._flushing = False
+                    self._flush_cond.notify_all()
+                    raise
+                self._flush_cond.acquire()
+                self._flushing = False
+                self._durable_lsn = batch_lsn
+                self._flush_cond.notify_all()
+
+    def _write_batch(self, batch):
+        """Write queued records to the WAL, switching segments at rotation markers"""
+        lines = []
+        for item in batch:
+            if isinstance(item, int):
+                self._wal.write(b''.join(lines))
+                lines = []
+                self._sync_wal()
+                self._wal.close()
+                self._wal = open(self._segment_path(item), 'ab')
+            else:
+                lines.append(item)
+        self._wal.write(b''.join(lines))
+        self._sync_wal()
+
+    def _sync_wal(self):
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    # ----- Snapshot compaction -----
+
+    def _start_compaction(self):
+        """Rotate the WAL and snapshot the current data in the background (lock held)"""
+        self._records_since_snapshot = 0
+        # Records are never mutated in place, so a shallow copy is a consistent view
+        users = dict(self._users)
+        next_id = self._next_id
+        with self._flush_cond:
+            self._segment += 1
+            segment = self._segment
+            self._pending.append(segment)
+            self._appended_lsn += 1
+            rotation_lsn = self._appended_lsn
+
+        self._compaction = threading.Thread(
+            target=self._compact, args=(users, next_id, segment, rotation_lsn),
+            name='user-store-compaction')
+        self._compaction.start()
+
+    def _compact(self, users, next_id, segment, rotation_lsn):
+        """Write a snapshot covering everything before segment, then drop older segments"""
+        try:
+            # Make sure earlier records are no longer written to the old segments
+            self._await_durable(rotation_lsn)
+
+            snapshot_path = os.path.join(self.data_dir, self.SNAPSHOT_FILE)
+            temp_path = snapshot_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write((json.dumps({"segment": segment, "next_id": next_id}) + '\n').encode('utf-8'))
+                # Users are written in chunks per line, which parses much
+                # faster on startup than one line per user
+                records = list(users.values())
+                for start in range(0, len(records), self.SNAPSHOT_CHUNK_SIZE):
+                    chunk = records[start:start + self.SNAPSHOT_CHUNK_SIZE]
+                    f.write((json.dumps(chunk) + '\n').encode('utf-8'))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(temp_path, snapshot_path)
+
+            for old_segment in self._list_segments():
+                if old_segment < segment:
+                    os.remove(self._segment_path(old_segment))
+        finally:
+            with self._lock:
+                self._compaction = None
+
+    def close(self):
+        """Flush the log, wait for a running compaction and close the WAL"""
+        self._await_durable(self._appended_lsn)
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        self._wal.close()
+
+
+class SQLiteUserStore:
+    """
+    User store backed by a SQLite database, shareable by several processes.
+
+    The database runs in WAL mode so readers never block the writer, and a
+    unique index on the normalized email enforces uniqueness across
+    processes. Each thread reuses its own connection (sqlite3 connections
+    can't be shared between threads); statements are fixed SQL strings so
+    every connection's statement cache serves them prepared. Writes start
+    with BEGIN IMMEDIATE, making each batch's checks and changes atomic.
+
+    The full user record is stored as JSON in `data` (so values keep their
+    JSON types); `email_key`, `role` and `age` are copied into indexed
+    columns for lookups and filtering. Per-user and collection versions
+    live in the database so every process hands out the same tags.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_key TEXT UNIQUE,
+            role TEXT,
+            age REAL,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1
+        )""",
+        "CREATE INDEX IF NOT EXISTS users_role ON users (role, id)",
+        "CREATE INDEX IF NOT EXISTS users_age ON users (age)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)",
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)"
+    )
+
+    SELECT_USER = "SELECT data FROM users WHERE id = ?"
+    SELECT_TAGGED_USER = "SELECT data, version FROM users WHERE id = ?"
+    SELECT_USER_VERSION = "SELECT version FROM users WHERE id = ?"
+    SELECT_COLLECTION_VERSION = "SELECT value FROM meta WHERE key = 'version'"
+    BUMP_COLLECTION_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+    SELECT_EMAIL_OWNER = "SELECT id FROM users WHERE email_key = ?"
+    SELECT_SCAN = "SELECT id, data FROM users WHERE id > ? ORDER BY id LIMIT ?"
+    INSERT_USER = "INSERT INTO users (email_key, role, age, data) VALUES (?, ?, ?, ?)"
+    UPDATE_USER = "UPDATE users SET email_key = ?, role = ?, age = ?, data = ?, version = version + 1 WHERE id = ?"
+    RELEASE_EMAIL = "UPDATE users SET email_key = NULL WHERE id = ?"
+    DELETE_USER = "DELETE FROM users WHERE id = ?"
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+        if 'version' not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+        # The epoch keeps tags unique if the database is ever recreated
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)",
+                     (uuid.uuid4().hex[:8],))
+        self._epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    # ----- Connections -----
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transactions are started explicitly;
+            # check_same_thread=False only so close() can close every thread's connection
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    # ----- Row conversion -----
+
+    @staticmethod
+    def _row_to_user(user_id, data):
+        return {"id": user_id, **json.loads(data)}
+
+    @staticmethod
+    def _columns(user):
+        """Return the indexed column values plus the JSON data for a user record"""
+        role = user['role'] if isinstance(user['role'], str) else None
+        age = user['age'] if is_indexable_age(user['age']) else None
+        data = json.dumps({field: user[field] for field in USER_FIELDS if field != 'id'})
+        return normalize_email(user['email']), role, age, data
+
+    # ----- Reads -----
+
+    def get(self, user_id):
+        """Return the user with the given ID, or None"""
+        row = self._connection().execute(self.SELECT_USER, (user_id,)).fetchone()
+        return None if row is None else self._row_to_user(user_id, row[0])
+
+    def count(self):
+        """Return the number of stored users"""
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def user_tag(self, user_id):
+        """Return the current version tag of a user, or None if it doesn't exist"""
+        row = self._connection().execute(self.SELECT_USER_VERSION, (user_id,)).fetchone()
+        return None if row is None else f"{self._epoch}-{user_id}-{row[0]}"
+
+    def get_tagged(self, user_id):
+        """Return (user, version tag), or (None, None)"""
+        row = self._connection().execute(self.SELECT_TAGGED_USER, (user_id,)).fetchone()
+        if row is None:
+            return None, None
+        return self._row_to_user(user_id, row[0]), f"{self._epoch}-{user_id}-{row[1]}"
+
+    def collection_tag(self):
+        """Return a tag that changes whenever any user is created, updated or deleted"""
+        version = self._connection().execute(self.SELECT_COLLECTION_VERSION).fetchone()[0]
+        return f"{self._epoch}-{version}"
+
+    def find(self, cursor=0, limit=None, role=None, min_age=None, max_age=None):
+        """Return up to limit matching users with an ID greater than cursor, in ID order"""
+        conditions = ["id > ?"]
+        params = [cursor]
+        if role is not None:
+            conditions.append("role = ?")
+            params.append(role)
+        if min_age is not None:
+            conditions.append("age >= ?")
+            params.append(min_age)
+        if max_age is not None:
+            conditions.append("age <= ?")
+            params.append(max_age)
+        params.append(-1 if limit is None else limit)
+
+        sql = f"SELECT id, data FROM users WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+        rows = self._connection().execute(sql, params).fetchall()
+        return [self._row_to_user(user_id, data) for user_id, data in rows]
+
+    def scan(self, after, limit):
+        """Return the next limit users with an ID greater than after"""
+        rows = self._connection().execute(self.SELECT_SCAN, (after, limit)).fetchall()
+        return [self._row_to_user(user_id, data) for user_id, data in rows]
+
+    # ----- Writes -----
+
+    def _transaction(self, apply):
+        """Run apply(conn) in one BEGIN IMMEDIATE transaction, committed only without failures"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result, failures = apply(conn)
+            if not failures:
+                conn.execute(self.BUMP_COLLECTION_VERSION)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("ROLLBACK" if failures else "COMMIT")
+        return result, failures
+
+    def create_many(self, items):
+        """
+        Create users from validated data, all or nothing
+
+        Returns:
+            (created users, failures) - nothing is created if failures is non-empty
+        """
+        def apply(conn):
+            failures = []
+            batch_emails = set()
+            with metrics.timed('duplicate_check'):
+                for index, data in enumerate(items):
+                    email_key = normalize_email(data['email'])
+                    owner = conn.execute(self.SELECT_EMAIL_OWNER, (email_key,)).fetchone()
+                    if owner is not None or email_key in batch_emails:
+                        failures.append(failure(index, 409, "Email already exists"))
+                    batch_emails.add(email_key)
+            if failures:
+                return [], failures
+
+            created = []
+            now = datetime.now().isoformat()
+            for data in items:
+                user = {
+                    "id": None,
+                    "name": data['name'],
+                    "email": data['email'],
+                    "age": data.get('age'),
+                    "role": data.get('role', 'user'),
+                    "created_at": now,
+                    "updated_at": now
+                }
+                user['id'] = conn.execute(self.INSERT_USER, self._columns(user)).lastrowid
+                created.append(user)
+            return created, []
+
+        return self._transaction(apply)
+
+    def update_many(self, changes):
+        """
+        Apply validated (user ID, data) updates, all or nothing
+
+        Returns:
+            (updated users, failures) - nothing is changed if failures is non-empty
+        """
+        def apply(conn):
+            failures = []
+            seen_ids = set()
+            claimed_emails = set()
+            current = {}
+            # Users changing their email free up their old one for other items
+            moving_ids = {user_id for user_id, data in changes if 'email' in data}
+            for index, (user_id, data) in enumerate(changes):
+                row = None if user_id in seen_ids else conn.execute(self.SELECT_USER, (user_id,)).fetchone()
+                if user_id in seen_ids:
+                    failures.append(failure(index, 400, f"User with ID {user_id} appears more than once"))
+                elif row is None:
+                    failures.append(failure(index, 404, f"User with ID {user_id} not found"))
+                else:
+                    current[user_id] = self._row_to_user(user_id, row[0])
+                    if 'email' in data:
+                        with metrics.timed('duplicate_check'):
+                            email_key = normalize_email(data['email'])
+                            owner = conn.execute(self.SELECT_EMAIL_OWNER, (email_key,)).fetchone()
+                            owner_id = None if owner is None else owner[0]
+                            if email_key in claimed_emails or (
+                                    owner_id is not None and owner_id != user_id and owner_id not in moving_ids):
+                                failures.append(failure(index, 409, "Email already exists"))
+                            claimed_emails.add(email_key)
+                seen_ids.add(user_id)
+            if failures:
+                return [], failures
+
+            # Release all old emails first so users can swap emails within a batch
+            for user_id, data in changes:
+                if 'email' in data:
+                    conn.execute(self.RELEASE_EMAIL, (user_id,))
+
+            updated = []
+            now = datetime.now().isoformat()
+            for user_id, data in changes:
+                user = current[user_id]
+                for field in UPDATABLE_FIELDS:
+                    if field in data:
+                        user[field] = data[field]
+                user['updated_at'] = now
+                conn.execute(self.UPDATE_USER, self._columns(user) + (user_id,))
+                updated.append(user)
+            return updated, []
+
+        return self._transaction(apply)
+
+    def delete_many(self, user_ids):
+        """
+        Delete users by ID, all or nothing
+
+        Returns:
+            (deleted users, failures) - nothing is deleted if failures is non-empty
+        """
+        def apply(conn):
+            failures = []
+            deleted = []
+            seen_ids = set()
+            for index, user_id in enumerate(user_ids):
+                row = None if user_id in seen_ids else conn.execute(self.SELECT_USER, (user_id,)).fetchone()
+                if user_id in seen_ids:
+                    failures.append(failure(index, 400, f"User with ID {user_id} appears more than once"))
+                elif row is None:
+                    failures.append(failure(index, 404, f"User with ID {user_id} not found"))
+                else:
+                    deleted.append(self._row_to_user(user_id, row[0]))
+                seen_ids.add(user_id)
+            if failures:
+                return [], failures
+
+            for user_id in user_ids:
+                conn.execute(self.DELETE_USER, (user_id,))
+            return deleted, []
+
+        return self._transaction(apply)
+
+
+def create_store(config):
+    """Create the user store selected by config['USER_STORE']"""
+    backend = config.get('USER_STORE', 'memory')
+    if backend == 'memory':
+        return InMemoryUserStore()
+    if backend == 'wal':
+        return DurableUserStore(config['USER_STORE_DIR'],
+                                compact_every=config.get('WAL_COMPACT_EVERY', 100000),
+                                fsync=config.get('WAL_FSYNC', True))
+    if backend == 'sqlite':
+        return SQLiteUserStore(os.path.join(config['USER_STORE_DIR'], 'users.db'))
+    raise ValueError(f"Unknown USER_STORE backend '{backend}'")
@@ -111,6 +111,16 @@ curl -s -X POST $API_URL/users \
   }' | python -m json.tool
 echo -e "\n"
 
+# Test 14: Bulk create with a non-string email
+echo "1️⃣4️⃣  Testing POST /users/bulk (Email not a string - item 1 should fail with 400)"
+curl -s -X POST $API_URL/users/bulk \
+  -H "Content-Type: application/json" \
+  -d '[
+    {"name": "Dana White", "email": "dana@example.com"},
+    {"name": "Eve Black", "email": 5}
+  ]' | python -m json.tool
+echo -e "\n"
+
 echo "=================================="
 echo "✅ All API tests completed!"
 echo "=================================="
@@ -0,0 +1,151 @@
+"""
+Tests for the serialized response cache and the /metrics endpoint of the
+User Management API
+
+    python -m unittest test_app
+"""
+
+import unittest
+from unittest import mock
+
+import app as api
+import metrics as metrics_module
+from metrics import BUCKETS, Metrics, metrics
+from storage import InMemoryUserStore
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = api.store
+        api.store = InMemoryUserStore()
+        api.store.create_many([{"name": f"User {i}", "email": f"user{i}@example.com", "age": 20 + i}
+                               for i in range(50)])
+        api.clear_response_cache()
+        self.addCleanup(setattr, api, 'store', previous)
+        self.addCleanup(api.clear_response_cache)
+        self.client = api.app.test_client()
+
+    def test_junk_parameters_share_an_entry(self):
+        for i in range(20):
+            self.assertEqual(self.client.get(f"/users?limit=10&x={i}").status_code, 200)
+        self.client.get("/users?x=1&limit=10")
+        self.assertEqual(len(api.response_cache), 1)
+
+    def test_full_table_is_not_cached(self):
+        response = self.client.get("/users")
+        self.assertEqual(response.get_json()['count'], 50)
+        self.assertEqual(len(api.response_cache), 0)
+        # Conditional GET still works without a cached body
+        self.assertEqual(self.client.get("/users", headers={"If-None-Match": response.headers['ETag']}).status_code,
+                         304)
+
+    def test_bounded_by_bytes(self):
+        with mock.patch.object(api, 'RESPONSE_CACHE_BYTES', 16 * 1024):
+            for cursor in range(50):
+                self.client.get(f"/users?limit=5&cursor={cursor}")
+            self.assertLessEqual(api.response_cache_bytes, 16 * 1024)
+            self.assertEqual(api.response_cache_bytes, sum(len(body) for _, body in api.response_cache.values()))
+            self.assertLess(len(api.response_cache), 50)
+
+    def test_stale_entry_dropped_on_read(self):
+        self.client.get("/users?limit=5")
+        self.client.get("/users/1")
+        self.client.put("/users/1", json={"age": 99})
+        self.assertEqual(self.client.get("/users/1").get_json()['user']['age'], 99)
+        self.assertEqual(self.client.get("/users?limit=5").get_json()['users'][0]['age'], 99)
+        # Each key holds only its current body
+        self.assertEqual(len(api.response_cache), 2)
+        self.assertEqual(api.response_cache_bytes, sum(len(body) for _, body in api.response_cache.values()))
+
+
+def samples(text, name):
+    """{labels: value} for every sample of a metric in Prometheus text"""
+    found = {}
+    for line in text.splitlines():
+        if line.startswith(name + '{'):
+            labels, value = line[len(name) + 1:].rsplit('} ', 1)
+            found[labels] = float(value)
+    return found
+
+
+class HistogramRenderTest(unittest.TestCase):
+
+    def test_buckets_are_cumulative(self):
+        registry = Metrics(enabled=True)
+        for seconds in (0.0001, 0.0005, 0.003, 0.003, 0.2, 30):
+            registry.observe_request('/users', 'GET', 200, seconds)
+        buckets = samples(registry.render(), 'http_request_duration_seconds_bucket')
+        labels = 'route="/users",method="GET",status="200"'
+        expected = {'0.0005': 2, '0.001': 2, '0.0025': 2, '0.005': 4, '0.1': 4, '0.25': 5, '10.0': 5, '+Inf': 6}
+        for bound, count in expected.items():
+            self.assertEqual(buckets[f'{labels},le="{bound}"'], count, bound)
+        self.assertEqual(len(buckets), len(BUCKETS) + 1)
+        text = registry.render()
+        self.assertEqual(samples(text, 'http_request_duration_seconds_count')[labels], 6)
+        self.assertAlmostEqual(samples(text, 'http_request_duration_seconds_sum')[labels], 30.2066)
+        self.assertEqual(samples(text, 'http_requests_total')[labels], 6)
+
+    def test_label_values_are_escaped(self):
+        registry = Metrics(enabled=True)
+        registry.observe_request('/a"b\\c', 'GET', 200, 0.1)
+        self.assertIn('route="/a\\"b\\\\c"', registry.render())
+
+    def test_timed_is_a_shared_no_op_while_disabled(self):
+        registry = Metrics()
+        self.assertIs(registry.timed('validation'), registry.timed('serialization'))
+        self.assertIs(registry.timed('validation'), metrics_module._DISABLED)
+        with registry.timed('validation'):
+            pass
+        self.assertNotIn('phase=', registry.render())
+        registry.enabled = True
+        self.assertIsNot(registry.timed('validation'), metrics_module._DISABLED)
+
+
+class MetricsEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = api.store
+        api.store = InMemoryUserStore()
+        api.clear_response_cache()
+        self.addCleanup(setattr, api, 'store', previous)
+        self.addCleanup(api.clear_response_cache)
+        patcher = mock.patch.multiple(metrics, enabled=True, _requests={}, _phases={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = api.app.test_client()
+
+    def test_not_found_while_disabled(self):
+        metrics.enabled = False
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.get_json()['success'])
+        # Nothing is recorded either
+        self.client.post("/users", json={"name": "Ann", "email": "ann@example.com"})
+        metrics.enabled = True
+        self.assertEqual(samples(self.client.get("/metrics").get_data(as_text=True), 'http_requests_total'), {})
+
+    def test_requests_and_phases_are_labelled(self):
+        for i in range(3):
+            self.assertEqual(self.client.post("/users", json={"name": f"U{i}", "email": f"u{i}@example.com"}).status_code,
+                             201)
+        self.assertEqual(self.client.post("/users", json={"name": "U", "email": "u0@example.com"}).status_code, 409)
+        self.client.get("/users/1")
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        totals = samples(text, 'http_requests_total')
+        self.assertEqual(totals['route="/users",method="POST",status="201"'], 3)
+        self.assertEqual(totals['route="/users",method="POST",status="409"'], 1)
+        self.assertEqual(totals['route="/users/<int:user_id>",method="GET",status="200"'], 1)
+        phases = samples(text, 'user_api_phase_duration_seconds_count')
+        self.assertEqual(phases['route="/users",phase="validation"'], 4)
+        self.assertEqual(phases['route="/users",phase="duplicate_check"'], 4)
+        self.assertEqual(phases['route="/users",phase="serialization"'], 4)
+        self.assertIn('route="/users/<int:user_id>",phase="serialization"', phases)
+
+
+if __name__ == '__main__':
+    unittest.main()
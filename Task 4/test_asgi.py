@@ -0,0 +1,131 @@
+"""
+Tests for the ASGI entry point, driving `application` with a fake
+receive/send instead of a server
+
+    python -m unittest test_asgi
+"""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import app as api
+import asgi
+from storage import InMemoryUserStore
+
+
+def scope(method, path, query=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'http_version': '1.1',
+            'headers': list(headers), 'server': ('testserver', 8000), 'client': ('127.0.0.1', 5555)}
+
+
+def call(scope, messages):
+    """Run the application on one connection; return everything it sent"""
+    incoming = list(messages)
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    return sent
+
+
+def request(method, path, body=b'', query=b'', headers=()):
+    """One request with its body in a single message; returns (status, headers, body chunks)"""
+    sent = call(scope(method, path, query, headers), [{'type': 'http.request', 'body': body}])
+    start, chunks = sent[0], sent[1:]
+    return start['status'], dict(start['headers']), chunks
+
+
+class BuildEnvironTest(unittest.TestCase):
+
+    def test_translates_the_scope(self):
+        environ = asgi.build_environ(dict(scope('POST', '/users/café', b'a=1&b=2', [
+            (b'content-type', b'application/json'),
+            (b'content-length', b'999'),
+            (b'accept', b'text/plain'),
+            (b'accept', b'application/json'),
+            (b'x-request-id', b'abc')
+        ]), root_path='/api'), b'{"x": 1}')
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(environ['SCRIPT_NAME'], '/api')
+        # WSGI paths are the UTF-8 bytes as latin-1
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode('utf-8'), '/users/café')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1&b=2')
+        self.assertEqual((environ['SERVER_NAME'], environ['SERVER_PORT']), ('testserver', '8000'))
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        # The length is that of the body actually received
+        self.assertEqual(environ['CONTENT_LENGTH'], '8')
+        self.assertEqual(environ['wsgi.input'].read(), b'{"x": 1}')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/plain,application/json')
+        self.assertEqual(environ['HTTP_X_REQUEST_ID'], 'abc')
+        self.assertNotIn('HTTP_CONTENT_TYPE', environ)
+
+
+class ApplicationTest(unittest.TestCase):
+
+    def setUp(self):
+        previous = api.store
+        api.store = InMemoryUserStore()
+        api.store.create_many([{"name": f"User {i}", "email": f"user{i}@example.com", "age": 20 + i}
+                               for i in range(5)])
+        api.clear_response_cache()
+        self.addCleanup(setattr, api, 'store', previous)
+        self.addCleanup(api.clear_response_cache)
+
+    def test_body_sent_in_several_messages(self):
+        body = json.dumps({"name": "Ann", "email": "ann@example.com", "age": 30}).encode()
+        sent = call(scope('POST', '/users', headers=[(b'content-type', b'application/json')]), [
+            {'type': 'http.request', 'body': body[:10], 'more_body': True},
+            {'type': 'http.request', 'body': body[10:], 'more_body': False}
+        ])
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(json.loads(b''.join(m['body'] for m in sent[1:]))['user']['name'], 'Ann')
+        self.assertEqual(sent[-1], {'type': 'http.response.body', 'body': b''})
+
+    def test_errors_and_conditional_requests(self):
+        status, _, chunks = request('GET', '/users/99')
+        self.assertEqual(status, 404)
+        self.assertFalse(json.loads(b''.join(m['body'] for m in chunks))['success'])
+        status, headers, _ = request('GET', '/users/1')
+        self.assertEqual(status, 200)
+        status, _, chunks = request('GET', '/users/1', headers=[(b'if-none-match', headers[b'etag'])])
+        self.assertEqual(status, 304)
+        self.assertEqual(b''.join(m['body'] for m in chunks), b'')
+
+    def test_export_is_streamed_chunk_by_chunk(self):
+        for backend in ('memory', 'sqlite'):
+            # sqlite runs the app and each next() in a worker thread
+            with self.subTest(backend=backend), mock.patch.object(api, 'EXPORT_CHUNK_SIZE', 2), \
+                    mock.patch.dict(api.app.config, USER_STORE=backend):
+                status, headers, chunks = request('GET', '/users/export', query=b'after=1')
+                self.assertEqual(status, 200)
+                self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+                # Users 2-5 in two chunks, then the end of the body
+                self.assertEqual([m.get('more_body', False) for m in chunks], [True, True, False])
+                lines = b''.join(m['body'] for m in chunks).decode().splitlines()
+                self.assertEqual([json.loads(line)['id'] for line in lines], [2, 3, 4, 5])
+
+    def test_client_gone_before_the_body(self):
+        self.assertEqual(call(scope('POST', '/users'), [{'type': 'http.disconnect'}]), [])
+        self.assertEqual(len(api.store.scan(0, 100)), 5)
+
+    def test_lifespan_closes_the_store(self):
+        store = mock.Mock()
+        with mock.patch.object(asgi, 'store', store):
+            sent = call({'type': 'lifespan'}, [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        self.assertEqual(sent, [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}])
+        store.close.assert_called_once_with()
+
+    def test_other_scopes_are_ignored(self):
+        self.assertEqual(call({'type': 'websocket'}, []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
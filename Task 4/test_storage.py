@@ -0,0 +1,330 @@
+"""
+Tests for the user stores
+Many threads create, update and read at once; every write must land exactly
+once and no read may see a half-applied change. The in-memory and SQLite
+backends must also answer the same requests identically.
+
+    python -m unittest test_storage
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import app as api
+import storage
+from storage import DurableUserStore, InMemoryUserStore, SortedList, SQLiteUserStore
+
+THREADS = 16
+
+
+def yielding_normalize_email(email, normalize=storage.normalize_email):
+    """normalize_email that lets other threads run, widening any check-then-write window"""
+    time.sleep(0)
+    return normalize(email)
+
+
+def run_threads(target, count=THREADS):
+    """Run target(number) in count threads, started together; re-raise the first error"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def run(number):
+        try:
+            barrier.wait()
+            target(number)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+class StoreConcurrencyTests:
+    """Shared tests; subclasses provide make_store()"""
+
+    def setUp(self):
+        patcher = mock.patch('storage.normalize_email', yielding_normalize_email)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = self.make_store()
+        self.addCleanup(self.store.close)
+
+    def create(self, count, prefix, age=30):
+        created, failures = self.store.create_many([
+            {"name": f"User {prefix}-{i}", "email": f"{prefix}-{i}@example.com", "age": age, "role": "user"}
+            for i in range(count)])
+        self.assertEqual(failures, [])
+        return created
+
+    def test_concurrent_creates_get_unique_ids(self):
+        def create(number):
+            for i in range(100):
+                self.create(1, f"t{number}-{i}")
+
+        run_threads(create)
+        users = self.store.scan(0, THREADS * 200)
+        ids = [user['id'] for user in users]
+        self.assertEqual(len(ids), THREADS * 100)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(self.store.count(), THREADS * 100)
+        self.assertEqual(len({user['email'] for user in users}), len(users))
+
+    def test_racing_creates_with_one_email(self):
+        results = []
+
+        def create(number):
+            # Same address, different case: the index compares them equal
+            email = "Race@Example.com" if number % 2 else "race@example.com"
+            created, _ = self.store.create_many([{"name": f"Racer {number}", "email": email}])
+            results.append(len(created))
+
+        run_threads(create, 32)
+        self.assertEqual(sum(results), 1)
+        self.assertEqual(self.store.count(), 1)
+
+    def test_concurrent_updates_are_not_lost(self):
+        user = self.create(1, "shared")[0]
+        own = {number: self.create(1, f"own-{number}")[0]['id'] for number in range(THREADS)}
+        start_tag = self.store.user_tag(user['id'])
+
+        def update(number):
+            for i in range(50):
+                _, failures = self.store.update_many([(user['id'], {"age": i})])
+                self.assertEqual(failures, [])
+                _, failures = self.store.update_many([(own[number], {"age": i, "name": f"Owner {number}"})])
+                self.assertEqual(failures, [])
+
+        run_threads(update)
+        # Every update bumps the version once
+        version = int(self.store.user_tag(user['id']).rsplit('-', 1)[1])
+        self.assertEqual(version, int(start_tag.rsplit('-', 1)[1]) + THREADS * 50)
+        for number, user_id in own.items():
+            updated = self.store.get(user_id)
+            self.assertEqual((updated['age'], updated['name']), (49, f"Owner {number}"))
+            self.assertEqual(updated['email'], f"own-{number}-0@example.com")
+
+    def test_filtered_reads_during_updates(self):
+        users = self.create(200, "moving", age=20)
+        stop = threading.Event()
+
+        def work(number):
+            if number == 0:
+                # Writer: move users in and out of the filtered range
+                try:
+                    for i in range(200):
+                        user = users[i % len(users)]
+                        self.store.update_many([(user['id'], {"age": 20 + i % 40})])
+                finally:
+                    stop.set()
+            else:
+                while not stop.is_set():
+                    for found in self.store.find(min_age=30, max_age=40):
+                        self.assertTrue(30 <= found['age'] <= 40, found)
+                    for found in self.store.find(role='user', limit=50):
+                        self.assertEqual(found['role'], 'user')
+
+        run_threads(work, 3)
+
+
+class InMemoryStoreTest(StoreConcurrencyTests, unittest.TestCase):
+    def make_store(self):
+        return InMemoryUserStore()
+
+
+class DurableStoreTest(StoreConcurrencyTests, unittest.TestCase):
+    def make_store(self, compact_every=100000):
+        if not hasattr(self, 'data_dir'):
+            temp = tempfile.TemporaryDirectory()
+            self.addCleanup(temp.cleanup)
+            self.data_dir = temp.name
+        return DurableUserStore(self.data_dir, compact_every=compact_every, fsync=False)
+
+    def reopened(self):
+        self.store.close()
+        self.store = self.make_store()
+        return self.store
+
+    def test_concurrent_writes_survive_restart(self):
+        def write(number):
+            created = self.create(20, f"r{number}")
+            self.store.update_many([(created[0]['id'], {"role": f"role-{number}"})])
+            self.store.delete_many([created[1]['id']])
+
+        run_threads(write)
+        before = self.store.scan(0, THREADS * 20)
+        self.assertEqual(self.reopened().scan(0, THREADS * 20), before)
+        self.assertEqual(len(before), THREADS * 19)
+
+    def test_snapshot_during_concurrent_writes(self):
+        self.store.close()
+        self.store = self.make_store(compact_every=25)
+
+        def write(number):
+            for i in range(20):
+                self.create(1, f"s{number}-{i}")
+
+        run_threads(write)
+        before = self.store.scan(0, THREADS * 20)
+        self.assertEqual(self.reopened().scan(0, THREADS * 20), before)
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, DurableUserStore.SNAPSHOT_FILE)))
+        self.assertEqual(self.store.create_many([{"name": "Next", "email": "next@example.com"}])[0][0]['id'],
+                         THREADS * 20 + 1)
+
+
+class SQLiteStoreTest(StoreConcurrencyTests, unittest.TestCase):
+    def make_store(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        return SQLiteUserStore(os.path.join(temp.name, 'users.db'))
+
+
+def random_requests(rng, count):
+    """A random mix of every route, including conflicts, missing users and bad input"""
+    emails = [f"user{i}@example.com" for i in range(60)]
+    for _ in range(count):
+        user_id = rng.randint(1, 80)
+        email = rng.choice(emails)
+        if rng.random() < 0.2:
+            email = email.upper()
+        user = {"name": f"User {rng.randint(1, 9)}", "email": email,
+                "age": rng.choice([None, rng.randint(18, 70), 30.5, "unknown"]),
+                "role": rng.choice(['developer', 'manager', 'user'])}
+        choice = rng.randrange(10)
+        if choice == 0:
+            yield 'POST', '/users', user
+        elif choice == 1:
+            yield 'GET', f"/users/{user_id}", None
+        elif choice == 2:
+            query = rng.choice(["", "?limit=5", f"?limit=3&cursor={user_id}", "?role=manager",
+                                "?min_age=30&max_age=50", "?fields=id,email&role=user", "?limit=0"])
+            yield 'GET', f"/users{query}", None
+        elif choice == 3:
+            yield 'PUT', f"/users/{user_id}", rng.choice([{"email": email}, {"age": user['age']},
+                                                          {"role": user['role'], "name": "Renamed"}])
+        elif choice == 4:
+            yield 'DELETE', f"/users/{user_id}", None
+        elif choice == 5:
+            yield 'POST', '/users/bulk', [dict(user, email=rng.choice(emails)) for _ in range(rng.randint(1, 4))]
+        elif choice == 6:
+            yield 'PUT', '/users/bulk', [{"id": rng.randint(1, 80), "email": rng.choice(emails)}
+                                         for _ in range(rng.randint(1, 3))]
+        elif choice == 7:
+            yield 'DELETE', '/users/bulk', [rng.randint(1, 80) for _ in range(rng.randint(1, 3))]
+        elif choice == 8:
+            yield 'GET', f"/users/export?after={user_id // 2}", None
+        else:
+            yield 'POST', '/users', {"name": "No Email"}
+
+
+def without_timestamps(value):
+    """Drop created_at/updated_at, which differ between runs"""
+    if isinstance(value, dict):
+        return {key: without_timestamps(item) for key, item in value.items()
+                if key not in ('created_at', 'updated_at')}
+    if isinstance(value, list):
+        return [without_timestamps(item) for item in value]
+    return value
+
+
+class BackendEquivalenceTest(unittest.TestCase):
+    """The in-memory and SQLite backends answer every request the same way"""
+
+    def responses(self, store):
+        previous = api.store
+        api.store = store
+        try:
+            client = api.app.test_client()
+            results = []
+            for method, path, body in random_requests(random.Random(7), 1500):
+                api.clear_response_cache()
+                response = client.open(path, method=method, json=body)
+                if response.mimetype == 'application/x-ndjson':
+                    data = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+                else:
+                    data = response.get_json()
+                results.append((method, path, response.status_code, without_timestamps(data)))
+            return results
+        finally:
+            api.store = previous
+            store.close()
+
+    def test_same_responses(self):
+        with tempfile.TemporaryDirectory() as temp:
+            memory = self.responses(InMemoryUserStore())
+            sqlite = self.responses(SQLiteUserStore(os.path.join(temp, 'users.db')))
+        self.assertGreater(sum(status == 201 for _, _, status, _ in memory), 50)
+        for expected, actual in zip(memory, sqlite):
+            self.assertEqual(expected, actual)
+
+
+class SortedListTest(unittest.TestCase):
+    """The bucketed index lists behave like one sorted list"""
+
+    def test_matches_a_sorted_list(self):
+        rng = random.Random(3)
+        with mock.patch.object(SortedList, 'LOAD', 4):
+            values = SortedList(rng.sample(range(1000), 50))
+            expected = sorted(values)
+            for _ in range(3000):
+                if expected and rng.random() < 0.45:
+                    value = rng.choice(expected)
+                    values.remove(value)
+                    expected.remove(value)
+                else:
+                    value = rng.randrange(1000)
+                    values.add(value)
+                    expected.append(value)
+                    expected.sort()
+                self.assertEqual(len(values), len(expected))
+                low, high = sorted(rng.sample(range(-10, 1010), 2))
+                self.assertEqual(values.values(low, high), [v for v in expected if low <= v <= high])
+                self.assertEqual(values.count(low, high), len(values.values(low, high)))
+                self.assertEqual(values.values(high=low), [v for v in expected if v <= low])
+                self.assertEqual(values.count(low), len([v for v in expected if v >= low]))
+                self.assertEqual(list(values.iter_after(low)), [v for v in expected if v > low])
+            self.assertEqual(list(values), expected)
+            self.assertLessEqual(max(len(bucket) for bucket in values._buckets), 2 * SortedList.LOAD)
+
+    def test_remove_missing(self):
+        values = SortedList([1, 3])
+        with self.assertRaises(ValueError):
+            values.remove(2)
+        with self.assertRaises(ValueError):
+            values.remove(4)
+
+
+class ThreadedRoutesTest(unittest.TestCase):
+    """Concurrent POST /users through the Flask routes"""
+
+    def setUp(self):
+        self.previous = api.store
+        api.store = InMemoryUserStore()
+        self.addCleanup(setattr, api, 'store', self.previous)
+
+    def test_concurrent_posts(self):
+        ids = []
+
+        def post(number):
+            client = api.app.test_client()
+            for i in range(50):
+                response = client.post('/users', json={"name": "Client", "email": f"c{number}-{i}@example.com"})
+                self.assertEqual(response.status_code, 201)
+                ids.append(response.get_json()['user']['id'])
+
+        run_threads(post, 8)
+        self.assertEqual(sorted(ids), list(range(1, 8 * 50 + 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,374 @@
+"""
+Batch Resize Benchmark
+Generates a folder of sample photos and times batch_resize with different
+worker counts:
+
+    python benchmark.py --images 100 --size 3000x2000 --workers 1 2 4 8
+
+or compares reducing_gap settings (draft decoding + pre-reduction) against
+full decoding, per image, with the PSNR of each output against the full one:
+
+    python benchmark.py --images 20 --size 6000x4000 --reducing-gap 2 3 --exact
+
+or times batch_render against making each rendition and format separately:
+
+    python benchmark.py --images 20 --size 4000x3000 --renditions
+
+or checks that a memory_budget holds: large JPEG, uncompressed TIFF and BMP
+files are resized with and without the budget, and the peak memory of the
+processes doing the work is compared with it (Linux only, exits with an
+error if the budget is exceeded):
+
+    python benchmark.py --images 4 --size 10000x8000 --memory-budget 128 --workers 2
+
+or compares encoder settings (quality, optimize, progressive, WebP method,
+max_bytes and min_psnr searches) on resized images, by output size and
+encode time:
+
+    python benchmark.py --images 20 --encoders --max-kb 30 --min-psnr 38
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+import image_resizer
+from image_resizer import DEFAULT_RENDITIONS, FORMAT_EXTENSIONS, ImageResizer
+
+
+def make_sample(path, width, height, seed):
+    """Write a photo-like JPEG: gradients, shapes and a little noise"""
+    rng = random.Random(seed)
+    img = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(20, max(21, width // 6))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+    img = img.filter(ImageFilter.GaussianBlur(2))
+    noise = Image.effect_noise((width, height), 12).convert('RGB')
+    Image.blend(img, noise, 0.08).save(path, quality=90)
+
+
+def make_samples(folder, count, width, height):
+    os.makedirs(folder, exist_ok=True)
+    for index in range(count):
+        make_sample(os.path.join(folder, f"sample_{index:05d}.jpg"), width, height, index)
+
+
+def make_large_samples(folder, count, width, height):
+    """Write JPEG, uncompressed TIFF and BMP copies of a photo-like image"""
+    os.makedirs(folder, exist_ok=True)
+    sample = os.path.join(folder, 'sample.jpg')
+    make_sample(sample, width, height, 0)
+    with Image.open(sample) as img:
+        for index in range(count):
+            extension = ('jpg', 'tiff', 'bmp')[index % 3]
+            img.save(os.path.join(folder, f"large_{index:03d}.{extension}"), quality=90)
+    os.remove(sample)
+
+
+def process_memory(pid):
+    """(current RSS, peak RSS) of a process in bytes, from /proc"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                values[key] = int(value.split()[0]) * 1024
+    return values['VmRSS'], values['VmHWM']
+
+
+def descendants(pid):
+    """Process ids of every child, grandchild, ... of a process"""
+    parents = {}
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    parents.setdefault(int(f.read().rsplit(')', 1)[1].split()[1]), []).append(int(name))
+            except OSError:
+                pass
+    found, stack = [], [pid]
+    while stack:
+        children = parents.get(stack.pop(), [])
+        found.extend(children)
+        stack.extend(children)
+    return found
+
+
+def run_batch(ready, input_folder, output_folder, workers, width, height, memory_budget):
+    ready.set()   # Imported and about to start: this is the baseline
+    resizer = ImageResizer(input_folder, output_folder, width, height, workers=workers,
+                           incremental=False, memory_budget=memory_budget)
+    with contextlib.redirect_stdout(io.StringIO()):
+        resizer.batch_resize()
+    if resizer.error_count:
+        sys.exit(1)
+
+
+def peak_memory(input_folder, output_folder, workers, width, height, memory_budget):
+    """
+    Run batch_resize in a child process and return (seconds, bytes), where
+    bytes is the sum over that process and its workers of how far each
+    one's peak RSS rose above the batch process's RSS once imported.
+    Workers are first seen before their imports finish, so their own
+    first reading would count the interpreter and Pillow as image data.
+
+    The child is spawned rather than forked: a forked child would reuse
+    memory this process freed but still holds, and hide its allocations.
+    """
+    shutil.rmtree(output_folder, ignore_errors=True)
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    process = context.Process(target=run_batch, args=(
+        ready, input_folder, output_folder, workers, width, height, memory_budget))
+    baseline, peak = {}, {}
+
+    def sample():
+        while not ready.wait(0.01) and process.is_alive():
+            pass
+        while process.is_alive():
+            for pid in [process.pid] + descendants(process.pid):
+                try:
+                    rss, hwm = process_memory(pid)
+                except (OSError, KeyError):
+                    continue
+                baseline.setdefault(pid, baseline.get(process.pid, rss))
+                peak[pid] = hwm
+            time.sleep(0.001)
+
+    start = time.perf_counter()
+    process.start()
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    process.join()
+    sampler.join()
+    if process.exitcode:
+        raise RuntimeError("batch_resize reported errors")
+    return time.perf_counter() - start, sum(max(0, peak[pid] - baseline[pid]) for pid in peak)
+
+
+def check_memory_budget(temp, count, width, height, workers, target_width, target_height, budget_mb):
+    """Compare peak memory with and without a budget; return False if the budget was exceeded"""
+    input_folder = os.path.join(temp, 'large')
+    make_large_samples(input_folder, count, width, height)
+    output_folder = os.path.join(temp, 'output')
+    print("Files: " + ", ".join(sorted(os.listdir(input_folder))))
+    print("=" * 60)
+    print(f"{'Budget':>10}{'Workers':>9}{'Seconds':>10}{'Peak MB':>10}")
+    print("-" * 60)
+    within = True
+    for budget in (None, budget_mb * 2**20):
+        seconds, peak = peak_memory(input_folder, output_folder, workers, target_width, target_height, budget)
+        label = 'none' if budget is None else f"{budget_mb} MB"
+        print(f"{label:>10}{workers:>9}{seconds:>10.2f}{peak / 2**20:>10.0f}")
+        if budget is not None and peak > budget:
+            within = False
+    print("=" * 60)
+    print("Peak memory stayed within the budget" if within else "Peak memory EXCEEDED the budget")
+    return within
+
+
+def time_batch(input_folder, output_folder, workers, width, height):
+    """Run batch_resize quietly; return (seconds, processed, errors)"""
+    shutil.rmtree(output_folder, ignore_errors=True)
+    resizer = ImageResizer(input_folder, output_folder, width, height, workers=workers)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resizer.batch_resize()
+    return time.perf_counter() - start, resizer.processed_count, resizer.error_count
+
+
+def psnr(path_a, path_b):
+    """Peak signal-to-noise ratio between two image files of the same size, in dB"""
+    with Image.open(path_a) as a, Image.open(path_b) as b:
+        return image_resizer.psnr(a, b)
+
+
+def encoder_settings(max_kb, min_psnr):
+    """(label, format, ImageResizer options) compared by --encoders"""
+    return [
+        ("JPEG q95 optimize", 'JPEG', {}),
+        ("JPEG q95", 'JPEG', {'optimize': False}),
+        ("JPEG q85 optimize", 'JPEG', {'quality': 85}),
+        ("JPEG q85 progressive", 'JPEG', {'quality': 85, 'progressive': True}),
+        (f"JPEG min PSNR {min_psnr:g}dB", 'JPEG', {'min_psnr': min_psnr}),
+        (f"JPEG max {max_kb}KB", 'JPEG', {'max_bytes': max_kb * 1024}),
+        ("WebP q80 method 0", 'WEBP', {'quality': 80, 'webp_method': 0}),
+        ("WebP q80 method 4", 'WEBP', {'quality': 80}),
+        ("WebP q80 method 6", 'WEBP', {'quality': 80, 'webp_method': 6}),
+        (f"WebP min PSNR {min_psnr:g}dB", 'WEBP', {'min_psnr': min_psnr}),
+        (f"WebP max {max_kb}KB", 'WEBP', {'max_bytes': max_kb * 1024}),
+    ]
+
+
+def compare_encoders(input_folder, temp, width, height, max_kb, min_psnr):
+    """Save resized images with each encoder setting; report size, encode time and PSNR"""
+    images = []
+    for filename in sorted(os.listdir(input_folder)):
+        with Image.open(os.path.join(input_folder, filename)) as img:
+            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+            images.append(img.copy())
+
+    print("=" * 78)
+    print(f"{'Setting':<24}{'KB/image':>10}{'Saved':>9}{'Encode ms':>11}{'PSNR min':>12}{'PSNR avg':>12}")
+    print("-" * 78)
+    baseline = None
+    for label, output_format, options in encoder_settings(max_kb, min_psnr):
+        resizer = ImageResizer(input_folder, temp, **options)
+        path = os.path.join(temp, f"encoded.{FORMAT_EXTENSIONS[output_format]}")
+        sizes, times, scores = [], [], []
+        for img in images:
+            start = time.perf_counter()
+            resizer.save_image(img, path, output_format)
+            times.append(time.perf_counter() - start)
+            sizes.append(os.path.getsize(path))
+            with Image.open(path) as encoded:
+                scores.append(image_resizer.psnr(img, encoded))
+        kb = sum(sizes) / len(sizes) / 1024
+        baseline = baseline or kb
+        print(f"{label:<24}{kb:>10.1f}{1 - kb / baseline:>9.0%}{sum(times) / len(times) * 1e3:>11.1f}"
+              f"{min(scores):>10.1f}dB{sum(scores) / len(scores):>10.1f}dB")
+    print("=" * 78)
+
+
+def compare_reducing_gap(input_folder, temp, gaps, width, height, maintain_aspect):
+    """Time resize_file per image for each reducing_gap and compare with full decoding"""
+    files = sorted(os.listdir(input_folder))
+    results = {}
+    for gap in [None] + gaps:
+        output_folder = os.path.join(temp, f"gap-{gap}")
+        os.makedirs(output_folder, exist_ok=True)
+        resizer = ImageResizer(input_folder, output_folder, width, height, maintain_aspect,
+                               reducing_gap=gap)
+        times = []
+        for filename in files:
+            start = time.perf_counter()
+            resizer.resize_file(os.path.join(input_folder, filename), os.path.join(output_folder, filename))
+            times.append(time.perf_counter() - start)
+        results[gap] = (output_folder, times)
+
+    reference = results[None][0]
+    print("=" * 60)
+    print(f"{'reducing_gap':>13}{'ms/image':>11}{'Speedup':>10}{'PSNR min':>12}{'PSNR avg':>12}")
+    print("-" * 60)
+    baseline = sum(results[None][1]) / len(files)
+    for gap, (output_folder, times) in results.items():
+        per_image = sum(times) / len(files)
+        if gap is None:
+            print(f"{'None (full)':>13}{per_image * 1e3:>11.1f}{1:>9.2f}x{'-':>12}{'-':>12}")
+            continue
+        scores = [psnr(os.path.join(reference, f), os.path.join(output_folder, f)) for f in files]
+        print(f"{gap:>13}{per_image * 1e3:>11.1f}{baseline / per_image:>9.2f}x"
+              f"{min(scores):>10.1f}dB{sum(scores) / len(scores):>10.1f}dB")
+    print("=" * 60)
+
+
+def compare_renditions(input_folder, temp, maintain_aspect):
+    """Time batch_render against one resize_file call per image, rendition and format"""
+    formats = ('JPEG', 'WEBP')
+    resizer = ImageResizer(input_folder, os.path.join(temp, 'rendered'), maintain_aspect=maintain_aspect,
+                           formats=formats)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resizer.batch_render()
+    rendered = time.perf_counter() - start
+
+    separate_folder = os.path.join(temp, 'separate')
+    os.makedirs(separate_folder, exist_ok=True)
+    files = sorted(os.listdir(input_folder))
+    start = time.perf_counter()
+    for rendition in DEFAULT_RENDITIONS:
+        single = ImageResizer(input_folder, separate_folder, rendition['width'], rendition['height'],
+                              maintain_aspect)
+        for output_format in formats:
+            for filename in files:
+                name = f"{os.path.splitext(filename)[0]}_{rendition['name']}.{FORMAT_EXTENSIONS[output_format]}"
+                single.resize_file(os.path.join(input_folder, filename), os.path.join(separate_folder, name))
+    separate = time.perf_counter() - start
+
+    scores = [psnr(os.path.join(resizer.output_folder, name), os.path.join(separate_folder, name))
+              for name in os.listdir(separate_folder)]
+    outputs = len(files) * len(DEFAULT_RENDITIONS) * len(formats)
+    print("=" * 60)
+    print(f"{outputs} outputs from {len(files)} images")
+    print(f"Separate resizes: {separate:.2f}s ({outputs} decodes)")
+    print(f"batch_render:     {rendered:.2f}s ({len(files)} decodes), {separate / rendered:.2f}x faster")
+    identical = sum(score == float('inf') for score in scores)
+    print(f"Against separate resizes: {identical}/{outputs} identical, min PSNR {min(scores):.1f}dB")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch_resize across worker counts")
+    parser.add_argument('--images', type=int, default=40, help="Number of sample images")
+    parser.add_argument('--size', default='3000x2000', help="Sample image size, WIDTHxHEIGHT")
+    parser.add_argument('--target', default='800x600', help="Resize target, WIDTHxHEIGHT")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker counts to try")
+    parser.add_argument('--reducing-gap', type=float, nargs='+',
+                        help="Compare these reducing_gap values with full decoding instead")
+    parser.add_argument('--renditions', action='store_true',
+                        help="Compare batch_render with separate resizes instead")
+    parser.add_argument('--encoders', action='store_true',
+                        help="Compare encoder settings by output size and encode time instead")
+    parser.add_argument('--max-kb', type=int, default=30, help="File size target for --encoders")
+    parser.add_argument('--min-psnr', type=float, default=38, help="Quality target (dB) for --encoders")
+    parser.add_argument('--memory-budget', type=int, metavar='MB',
+                        help="Check peak memory under this budget instead")
+    parser.add_argument('--exact', action='store_true', help="Resize to exact dimensions (maintain_aspect=False)")
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.lower().split('x'))
+    target_width, target_height = map(int, args.target.lower().split('x'))
+
+    with tempfile.TemporaryDirectory() as temp:
+        if args.memory_budget:
+            print(f"Generating {args.images} large images of {width}x{height}...")
+            if not check_memory_budget(temp, args.images, width, height, args.workers[0],
+                                       target_width, target_height, args.memory_budget):
+                sys.exit(1)
+            return
+
+        input_folder = os.path.join(temp, 'images')
+        output_folder = os.path.join(temp, 'output')
+        print(f"Generating {args.images} sample images of {width}x{height}...")
+        make_samples(input_folder, args.images, width, height)
+
+        if args.reducing_gap:
+            compare_reducing_gap(input_folder, temp, args.reducing_gap, target_width, target_height,
+                                 not args.exact)
+            return
+        if args.encoders:
+            compare_encoders(input_folder, temp, target_width, target_height, args.max_kb, args.min_psnr)
+            return
+        if args.renditions:
+            compare_renditions(input_folder, temp, not args.exact)
+            return
+
+        print(f"CPU cores: {os.cpu_count()}")
+        print("=" * 60)
+        print(f"{'Workers':>8}{'Seconds':>10}{'Images/s':>11}{'Speedup':>10}{'Errors':>9}")
+        print("-" * 60)
+        baseline = None
+        for workers in args.workers:
+            seconds, processed, errors = time_batch(input_folder, output_folder, workers,
+                                                    target_width, target_height)
+            baseline = baseline or seconds
+            print(f"{workers:>8}{seconds:>10.2f}{processed / seconds:>11.1f}{baseline / seconds:>9.2f}x{errors:>9}")
+        print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,83 @@ Image Resizer Tool
 Batch resize and convert images in a folder
 """
 
+import io
 import os
 import sys
-from PIL import Image
+import math
+import time
+import concurrent.futures
+from itertools import islice
+from PIL import Image, ImageChops, ImageStat
 from pathlib import Path
 
+from manifest import Manifest
+from run_report import RunReport
+
+
+# Sizes produced by batch_render, in any order
+DEFAULT_RENDITIONS = (
+    {'name': 'large', 'width': 1600, 'height': 1200},
+    {'name': 'medium', 'width': 800, 'height': 600},
+    {'name': 'thumb', 'width': 200, 'height': 150},
+)
+
+# File extension for each output format
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png', 'TIFF': 'tiff'}
+
+# Manifest file kept in the output folder, per kind of batch
+MANIFEST_NAMES = {'resize_file': '.resize-manifest.json', 'render_file': '.render-manifest.json'}
+
+
+def resize_chunk(resizer, chunk, method='resize_file'):
+    """
+    Resize a chunk of images in a worker process
+    
+    Args:
+        resizer: ImageResizer holding the resize settings
+        chunk: List of (filename, input_path, output_path)
+        method: ImageResizer method to run on each image
+            ('resize_file' or 'render_file')
+    
+    Returns:
+        List of (filename, output_path, original_size, new_size, error, stats),
+        stats being the image's stage timings and byte counts
+    """
+    process = getattr(resizer, method)
+    results = []
+    for filename, input_path, output_path in chunk:
+        stats = {}
+        try:
+            original_size, new_size = process(input_path, output_path, stats)
+            resizer.count_bytes(method, input_path, output_path, stats)
+            results.append((filename, output_path, original_size, new_size, None, stats))
+        except Exception as e:
+            results.append((filename, output_path, None, None, str(e), None))
+    return results
+
+
+def pixel_bytes(mode):
+    """Bytes Pillow keeps in memory per pixel of an image mode"""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+
+def psnr(reference, image):
+    """Peak signal-to-noise ratio of an image against a reference of the same size, in dB"""
+    diff = ImageChops.difference(reference.convert('RGB'), image.convert('RGB'))
+    mse = sum(rms ** 2 for rms in ImageStat.Stat(diff).rms) / 3
+    return float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def describe_size(size):
+    """Format a size, or a list of rendition sizes, as WIDTHxHEIGHT"""
+    if isinstance(size, list):
+        return ", ".join(describe_size(s) for s in size)
+    return f"{size[0]}x{size[1]}"
+
 
 class ImageResizer:
     """Class to handle batch image resizing operations"""
@@ -15,7 +87,11 @@ class ImageResizer:
     # Supported image formats
     SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tiff')
     
-    def __init__(self, input_folder, output_folder, width=800, height=600, maintain_aspect=True):
+    def __init__(self, input_folder, output_folder, width=800, height=600, maintain_aspect=True,
+                 workers=1, chunk_size=4, reducing_gap=2.0, renditions=DEFAULT_RENDITIONS,
+                 formats=('JPEG', 'WEBP'), quality=95, incremental=True, recursive=True,
+                 memory_budget=None, report_path=None, optimize=True, progressive=False, webp_method=4,
+                 max_bytes=None, min_psnr=None, min_quality=40):
         """
         Initialize the Image Resizer
         
@@ -25,110 +101,713 @@ class ImageResizer:
             width: Target width in pixels
             height: Target height in pixels
             maintain_aspect: Whether to maintain aspect ratio
+            workers: Number of worker processes for batch_resize (1 = no pool)
+            chunk_size: Images sent to a worker per task
+            reducing_gap: Shrink cheaply (JPEG DCT-scaled decoding, then a box
+                reduce) down to this multiple of the target size before the
+                LANCZOS resample; None decodes and resamples at full size
+            renditions: Sizes made by batch_render, as dicts with
+                'name', 'width' and 'height'
+            formats: Formats each rendition is saved in by batch_render
+            quality: JPEG/WebP quality of the output
+            incremental: Skip images whose content and settings haven't
+                changed since the last run (see manifest.py)
+            recursive: Also process images in subfolders, mirroring the
+                folder structure in the output folder
+            memory_budget: Bytes of decoded pixels allowed at once, across
+                all workers; oversized images are decoded at a reduced
+                scale or in strips to fit (None = no limit)
+            report_path: Write a JSON run report (stage timings, throughput,
+                bytes in/out) here after each batch
+            optimize: Extra encoder pass for smaller JPEG/PNG files (slower)
+            progressive: Save JPEGs as progressive
+            webp_method: WebP encoder effort, 0 (fast) to 6 (smallest)
+            max_bytes: Largest JPEG/WebP file wanted; quality is lowered
+                (not below min_quality) until the file fits
+            min_psnr: Lowest acceptable PSNR (dB) of a JPEG/WebP output
+                against the resized image; the lowest quality (from
+                min_quality up to quality) that reaches it is used
+            min_quality: Lowest quality the max_bytes/min_psnr search may use
         """
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.width = width
         self.height = height
         self.maintain_aspect = maintain_aspect
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.reducing_gap = reducing_gap
+        self.renditions = renditions
+        self.formats = formats
+        self.quality = quality
+        self.incremental = incremental
+        self.recursive = recursive
+        self.memory_budget = memory_budget
+        self.report_path = report_path
+        self.run_report = None
+        self.optimize = optimize
+        self.progressive = progressive
+        self.webp_method = webp_method
+        self.max_bytes = max_bytes
+        self.min_psnr = min_psnr
+        self.min_quality = min(min_quality, quality)
+        self.manifest = None
         self.processed_count = 0
         self.error_count = 0
+        self.skipped_count = 0
         
+    def __getstate__(self):
+        """
+        Pickle only the resize settings: a copy is sent to the worker with
+        every chunk, and the manifest and run report grow with the batch
+        """
+        state = self.__dict__.copy()
+        state['manifest'] = None
+        state['run_report'] = None
+        return state
+    
     def get_image_files(self):
         """
         Get all image files from input folder
         
         Returns:
-            List of image file paths
+            List of image file paths, relative to the input folder
+        """
+        return list(self.iter_image_files())
+    
+    def iter_image_files(self):
+        """
+        Yield image files from the input folder as each folder is read
+        
+        Folders are read with os.scandir one at a time, so the first file
+        comes back straight away and only the folders still to visit are
+        held in memory. Symlinked folders and the output folder (if it is
+        inside the input folder) are not entered.
+        
+        Yields:
+            Image file paths, relative to the input folder
         """
         if not os.path.exists(self.input_folder):
             print(f"Error: Input folder '{self.input_folder}' does not exist!")
-            return []
-        
-        image_files = []
-        for filename in os.listdir(self.input_folder):
-            if filename.lower().endswith(self.SUPPORTED_FORMATS):
-                image_files.append(filename)
+            return
         
-        return image_files
+        output_folder = os.path.realpath(self.output_folder)
+        folders = ['']
+        while folders:
+            folder = folders.pop()
+            try:
+                with os.scandir(os.path.join(self.input_folder, folder)) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive and os.path.realpath(entry.path) != output_folder:
+                                folders.append(os.path.join(folder, entry.name))
+                        elif entry.name.lower().endswith(self.SUPPORTED_FORMATS):
+                            yield os.path.join(folder, entry.name)
+            except OSError as e:
+                print(f"Warning: Cannot read folder '{folder or self.input_folder}': {e}")
     
-    def resize_image(self, input_path, output_path):
+    def iter_tasks(self):
         """
-        Resize a single image
+        Yield (filename, input_path, output_path) for every image, creating
+        the matching output subfolders as they are reached
+        """
+        made = set()
+        for filename in self.iter_image_files():
+            folder = os.path.dirname(filename)
+            if folder not in made:
+                os.makedirs(os.path.join(self.output_folder, folder), exist_ok=True)
+                made.add(folder)
+            yield filename, os.path.join(self.input_folder, filename), os.path.join(self.output_folder, filename)
+    
+    def resize_file(self, input_path, output_path, stats=None):
+        """
+        Resize a single image without printing anything
         
         Args:
             input_path: Path to input image
             output_path: Path to save resized image
+            stats: Optional dict to add decode/resample/encode seconds to
+        
+        Returns:
+            Tuple of (original size, new size)
+        """
+        start = time.perf_counter()
+        with Image.open(input_path) as img:
+            # Get original dimensions
+            original_size = img.size
+            target_size = self.rendition_size(original_size, self.width, self.height)
+            img = self.decode_within_budget(img, target_size)
+            
+            box = None
+            if self.reducing_gap and target_size != original_size:
+                # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while
+                # keeping at least reducing_gap times the requested size
+                drafted = img.draft(None, (int(self.width * self.reducing_gap), int(self.height * self.reducing_gap)))
+                if drafted is not None:
+                    box = drafted[1]   # Where the original maps to in the drafted image
+            # Decode now, so decoding and resampling are timed apart
+            img.load()
+            decoded = time.perf_counter()
+            
+            # Resize to fit (maintain_aspect; the same steps and result as
+            # thumbnail()) or to exact dimensions (may distort)
+            if img.size != target_size:
+                img = img.resize(target_size, Image.Resampling.LANCZOS, box=box, reducing_gap=self.reducing_gap)
+            new_size = target_size
+            resampled = time.perf_counter()
+            
+            # Save the resized image
+            self.save_image(img, output_path)
+        
+        if stats is not None:
+            stats.update(decode=decoded - start, resample=resampled - decoded,
+                         encode=time.perf_counter() - resampled)
+        return original_size, new_size
+    
+    def save_options(self, output_format, quality):
+        """Encoder options for a format"""
+        if output_format == 'JPEG':
+            return {'quality': quality, 'optimize': self.optimize, 'progressive': self.progressive}
+        if output_format == 'WEBP':
+            return {'quality': quality, 'method': self.webp_method}
+        return {'quality': quality, 'optimize': self.optimize}
+    
+    def encode(self, img, output_format, quality):
+        """Encode an image in memory and return the bytes"""
+        buffer = io.BytesIO()
+        img.save(buffer, format=output_format, **self.save_options(output_format, quality))
+        return buffer.getvalue()
+    
+    def search_quality(self, img, output_format):
+        """
+        Binary search the quality range (min_quality to quality) for the
+        lowest quality that reaches min_psnr and/or the highest that fits
+        in max_bytes; if both can't be met, max_bytes wins
+        
+        Returns:
+            Tuple of (encoded bytes, quality)
+        """
+        encoded = {}
+        
+        def encode(quality):
+            if quality not in encoded:
+                encoded[quality] = self.encode(img, output_format, quality)
+            return encoded[quality]
+        
+        def looks_right(quality):
+            with Image.open(io.BytesIO(encode(quality))) as candidate:
+                return psnr(img, candidate) >= self.min_psnr
+        
+        low, high = self.min_quality, self.quality
+        if self.min_psnr is not None:
+            while low < high:
+                middle = (low + high) // 2
+                if looks_right(middle):
+                    high = middle
+                else:
+                    low = middle + 1
+        
+        low = self.min_quality
+        if self.max_bytes is not None and len(encode(high)) > self.max_bytes:
+            # Never below min_quality, even if nothing fits
+            high = max(low, high - 1)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if len(encode(middle)) <= self.max_bytes:
+                    low = middle
+                else:
+                    high = middle - 1
+        return encode(high), high
+    
+    def save_image(self, img, output_path, output_format=None):
+        """
+        Save an image with the encoder settings, searching for the quality
+        when max_bytes or min_psnr is set
+        
+        Args:
+            img: Image to save
+            output_path: File to write
+            output_format: Pillow format name; by default taken from the
+                file extension
+        """
+        if output_format is None:
+            output_format = Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+        
+        if output_format in ('JPEG', 'WEBP') and (self.max_bytes is not None or self.min_psnr is not None):
+            data, _ = self.search_quality(img, output_format)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        else:
+            img.save(output_path, format=output_format, **self.save_options(output_format, self.quality))
+    
+    def decode_plan(self, img, target_size):
+        """
+        Choose how to decode an opened (not yet loaded) image so that
+        decoding and resizing it to target_size fits in memory_budget
+        
+        Returns:
+            Tuple of (strategy, setting, estimated peak bytes):
+            ('full', None, ...) decode as usual;
+            ('draft', size, ...) JPEG DCT-scaled decoding to at least size;
+            ('bands', (factor, rows), ...) decode raw pixel data `rows` rows
+            at a time, box-reducing each strip by `factor`
+        
+        Raises:
+            MemoryError: If the image can't be decoded within the budget
+        """
+        width, height = img.size
+        bpp = pixel_bytes(img.mode)
+        gap = self.reducing_gap or 1.0
+        wanted = (max(1, int(target_size[0] * gap)), max(1, int(target_size[1] * gap)))
+        
+        def cost(decoded_width, decoded_height):
+            # Decoded pixels, one working copy (box reduction or resample
+            # pass) of at most the pre-reduced size, and the result
+            decoded = decoded_width * decoded_height
+            return (decoded + min(decoded, wanted[0] * wanted[1]) + target_size[0] * target_size[1]) * bpp
+        
+        full = cost(width, height)
+        if full <= self.memory_budget:
+            return 'full', None, full
+        
+        if img.format == 'JPEG':
+            # Same scale choice as JpegImageFile.draft(): 1/8, 1/4 or 1/2
+            for size in (wanted, target_size):
+                fits = min(width // size[0], height // size[1])
+                scale = next(a for a in (8, 4, 2, 1) if fits >= a or a == 1)
+                drafted = cost(-(-width // scale), -(-height // scale))
+                if drafted <= self.memory_budget:
+                    return 'draft', size, drafted
+        
+        elif len(img.tile) == 1 and img.tile[0][0] == 'raw':
+            # Uncompressed pixels (TIFF, BMP, PPM) can be read a strip at a time,
+            # leaving at least half the budget for the strips
+            factor = max(1, min(width // wanted[0], height // wanted[1]))
+            largest = max(1, min(width // target_size[0], height // target_size[1]))
+            while factor < largest and cost(-(-width // factor), -(-height // factor)) > self.memory_budget // 2:
+                factor += 1
+            reduced = cost(-(-width // factor), -(-height // factor))
+            # A strip and its reduced copy
+            rows = (self.memory_budget - reduced) // (width * bpp * 2) // factor * factor
+            if rows >= factor:
+                return 'bands', (factor, min(rows, height)), reduced + rows * width * bpp * 2
+        
+        raise MemoryError(f"{img.format} image of {width}x{height} needs about {full // 2**20} MB, "
+                          f"over the memory budget of {self.memory_budget // 2**20} MB")
+    
+    def decode_within_budget(self, img, target_size):
+        """
+        Apply the decode plan for an image opened with Image.open
+        
+        Returns:
+            The image to resize: img itself (possibly set to draft mode), or
+            a smaller, already reduced copy decoded strip by strip
+        """
+        if self.memory_budget is None:
+            return img
+        strategy, setting, _ = self.decode_plan(img, target_size)
+        if strategy == 'draft':
+            img.draft(None, setting)
+        elif strategy == 'bands':
+            return self.decode_bands(img, *setting)
+        return img
+    
+    def decode_bands(self, img, factor, rows):
         """
+        Decode an image with uncompressed pixel data `rows` rows at a time,
+        box-reducing each strip by `factor` into a smaller image
+        
+        Strips start on multiples of `factor`, so the result is the same as
+        img.reduce(factor) without ever holding the full image.
+        """
+        # Tiles are plain tuples before Pillow 11, named tuples since
+        codec, _, offset, args = img.tile[0]
+        width, height = img.size
+        args = args if isinstance(args, tuple) else (args,)
+        rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+        if not stride:
+            # Bytes per row of this raw mode, packed the same way
+            stride = len(Image.new(img.mode, (width, 1)).tobytes('raw', rawmode))
+        
+        reduced = Image.new(img.mode, (-(-width // factor), -(-height // factor)))
+        if img.mode == 'P':
+            reduced.putpalette(img.getpalette())
+        for top in range(0, height, rows):
+            count = min(rows, height - top)
+            # Bottom-up files (BMP) store the last row first
+            first = top if orientation > 0 else height - top - count
+            with Image.open(img.filename) as strip:
+                strip.tile = [(codec, (0, 0, width, count), offset + first * stride, (rawmode, stride, orientation))]
+                strip._size = (width, count)
+                if hasattr(strip, '_tile_size'):
+                    # Newer Pillow sizes a TIFF's buffer from this, which
+                    # would allocate the full image for every strip
+                    strip._tile_size = strip._size
+                strip.load()
+                reduced.paste(strip.reduce(factor), (0, top // factor))
+        return reduced
+    
+    def memory_cost(self, input_path, method):
+        """Estimated peak bytes of processing an image, read from its header only"""
+        if self.memory_budget is None:
+            return 0
         try:
             with Image.open(input_path) as img:
-                # Get original dimensions
-                original_width, original_height = img.size
-                print(f"  Original size: {original_width}x{original_height}")
-                
-                if self.maintain_aspect:
-                    # Maintain aspect ratio using thumbnail
-                    img.thumbnail((self.width, self.height), Image.Resampling.LANCZOS)
-                    new_width, new_height = img.size
+                if method == 'render_file':
+                    target_size = max((self.rendition_size(img.size, r['width'], r['height']) for r in self.renditions),
+                                      key=lambda size: size[0] * size[1], default=(1, 1))
                 else:
-                    # Resize to exact dimensions (may distort)
-                    img = img.resize((self.width, self.height), Image.Resampling.LANCZOS)
-                    new_width, new_height = self.width, self.height
-                
-                # Save the resized image
-                img.save(output_path, quality=95, optimize=True)
-                print(f"  Resized to: {new_width}x{new_height}")
-                print(f"  Saved: {output_path}")
-                
-                self.processed_count += 1
+                    target_size = self.rendition_size(img.size, self.width, self.height)
+                return self.decode_plan(img, target_size)[2]
+        except Exception:
+            return 0   # The worker reports the error
+    
+    def rendition_size(self, original_size, width, height):
+        """Output size for a rendition: with maintain_aspect, the size thumbnail() would give"""
+        if not self.maintain_aspect:
+            return (width, height)
+        original_width, original_height = original_size
+        if width >= original_width and height >= original_height:
+            return original_size
+        # Round to whichever neighbour keeps the aspect ratio closest, as thumbnail() does
+        aspect = original_width / original_height
+        if width / height >= aspect:
+            width = max(min(math.floor(height * aspect), math.ceil(height * aspect),
+                            key=lambda n: abs(aspect - n / height)), 1)
+        else:
+            height = max(min(math.floor(width / aspect), math.ceil(width / aspect),
+                             key=lambda n: abs(aspect - width / n) if n else 0), 1)
+        return (width, height)
+    
+    def rendition_path(self, output_path, name, output_format):
+        """File a rendition of the image resized to output_path is saved as"""
+        extension = FORMAT_EXTENSIONS.get(output_format, output_format.lower())
+        return f"{os.path.splitext(output_path)[0]}_{name}.{extension}"
+    
+    def render_file(self, input_path, output_path, stats=None):
+        """
+        Decode an image once and save every rendition in every format
+        
+        Renditions are made largest first, each one resampled from the
+        smallest image already made that is at least as big, so the full
+        size image is only resampled once. Outputs are named
+        <name>_<rendition>.<ext> next to output_path.
+        
+        Args:
+            input_path: Path to input image
+            output_path: Path the image would be resized to; its folder and
+                name are used for the rendition files
+            stats: Optional dict to add decode/resample/encode seconds to
+        
+        Returns:
+            Tuple of (original size, list of rendition sizes)
+        """
+        start = time.perf_counter()
+        resample = encode = 0.0
+        with Image.open(input_path) as img:
+            original_size = img.size
+            targets = sorted(
+                ((rendition['name'], self.rendition_size(original_size, rendition['width'], rendition['height']))
+                 for rendition in self.renditions),
+                key=lambda target: target[1][0] * target[1][1], reverse=True)
+            if targets:
+                img = self.decode_within_budget(img, targets[0][1])
+            
+            if self.reducing_gap and targets:
+                # Decode only as much of a JPEG as the largest rendition needs
+                largest = targets[0][1]
+                img.draft(None, (int(largest[0] * self.reducing_gap), int(largest[1] * self.reducing_gap)))
+            if img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGBA' if 'transparency' in img.info or 'A' in img.getbands() else 'RGB')
+            else:
+                img.load()
+            decoded = time.perf_counter()
+            
+            made = [img]
+            sizes = []
+            for name, size in targets:
+                step = time.perf_counter()
+                # Smallest image so far that still covers this rendition
+                source = min((m for m in made if m.width >= size[0] and m.height >= size[1]),
+                             key=lambda m: m.width * m.height, default=img)
+                rendition = source.resize(size, Image.Resampling.LANCZOS, reducing_gap=self.reducing_gap)
+                made.append(rendition)
+                sizes.append(size)
+                resampled = time.perf_counter()
+                resample += resampled - step
                 
+                for output_format in self.formats:
+                    out = rendition
+                    if output_format == 'JPEG' and out.mode not in ('RGB', 'L'):
+                        out = out.convert('RGB')
+                    self.save_image(out, self.rendition_path(output_path, name, output_format), output_format)
+                encode += time.perf_counter() - resampled
+        
+        if stats is not None:
+            stats.update(decode=decoded - start, resample=resample, encode=encode)
+        return original_size, sizes
+    
+    def resize_image(self, input_path, output_path):
+        """
+        Resize a single image
+        
+        Args:
+            input_path: Path to input image
+            output_path: Path to save resized image
+        
+        Returns:
+            True if the image was resized
+        """
+        stats = {}
+        try:
+            (original_width, original_height), (new_width, new_height) = self.resize_file(
+                input_path, output_path, stats)
+            self.count_bytes('resize_file', input_path, output_path, stats)
         except Exception as e:
             print(f"  Error processing image: {str(e)}")
             self.error_count += 1
+            if self.run_report:
+                self.run_report.add_error()
+            return False
+        
+        print(f"  Original size: {original_width}x{original_height}")
+        print(f"  Resized to: {new_width}x{new_height}")
+        print(f"  Saved: {output_path}")
+        self.processed_count += 1
+        if self.run_report:
+            self.run_report.add(stats)
+        return True
     
-    def batch_resize(self):
+    def count_bytes(self, method, input_path, output_path, stats):
+        """Add the size of an image and of the files made from it to its stats"""
+        stats['bytes_in'] = os.path.getsize(input_path)
+        stats['bytes_out'] = sum(os.path.getsize(path) for path in self.output_settings(method, output_path)[1])
+    
+    def output_settings(self, method, output_path):
         """
-        Process all images in the input folder
+        Everything that decides what an image's outputs look like
+        
+        Returns:
+            Tuple of (settings dict, list of output files)
         """
-        # Create output folder if it doesn't exist
-        os.makedirs(self.output_folder, exist_ok=True)
+        settings = {'method': method, 'maintain_aspect': self.maintain_aspect,
+                    'reducing_gap': self.reducing_gap, 'quality': self.quality, 'optimize': self.optimize,
+                    'progressive': self.progressive, 'webp_method': self.webp_method,
+                    'max_bytes': self.max_bytes, 'min_psnr': self.min_psnr, 'min_quality': self.min_quality,
+                    'memory_budget': self.memory_budget}
+        if method == 'render_file':
+            settings['renditions'] = [dict(rendition) for rendition in self.renditions]
+            settings['formats'] = list(self.formats)
+            outputs = [self.rendition_path(output_path, rendition['name'], output_format)
+                       for rendition in self.renditions for output_format in self.formats]
+        else:
+            settings.update(width=self.width, height=self.height,
+                            format=os.path.splitext(output_path)[1].lower())
+            outputs = [output_path]
+        return settings, outputs
+    
+    def select_tasks(self, tasks, method):
+        """
+        Drop tasks whose outputs are up to date, according to the manifest
+        in the output folder, and count them as skipped
         
-        # Get all image files
-        image_files = self.get_image_files()
+        Args:
+            tasks: Iterable of (filename, input_path, output_path)
+            method: ImageResizer method the tasks will run
         
-        if not image_files:
+        Yields:
+            Tasks still to do, as they are checked
+        """
+        if not self.incremental:
+            self.manifest = None
+            yield from tasks
+            return
+        
+        self.manifest = Manifest(os.path.join(self.output_folder, MANIFEST_NAMES[method]))
+        for task in tasks:
+            filename, input_path, output_path = task
+            settings, outputs = self.output_settings(method, output_path)
+            try:
+                if self.manifest.up_to_date(filename, input_path, settings, outputs):
+                    self.skipped_count += 1
+                    continue
+            except OSError:
+                pass   # Let the worker report the error
+            yield task
+    
+    def resize_parallel(self, tasks, total=None, method='resize_file'):
+        """
+        Resize images in a pool of worker processes
+        
+        Tasks are sent in chunks of `chunk_size`, with at most two chunks
+        per worker in flight, so the task list is never copied to the pool
+        all at once. With a memory_budget, a chunk is also held back while
+        the estimated peak memory of the chunks in flight plus its own
+        would exceed the budget. Counts are aggregated as results come back.
+        
+        Args:
+            tasks: Iterable of (filename, input_path, output_path)
+            total: Number of tasks for progress output, if known
+            method: ImageResizer method run on each image
+        """
+        tasks = iter(tasks)
+        done = 0
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}   # future -> estimated peak bytes
+            in_flight = 0
+            chunk = None
+            while True:
+                # Keep the pool fed without queueing everything up front
+                while len(pending) < self.workers * 2:
+                    if chunk is None:
+                        chunk = list(islice(tasks, self.chunk_size))
+                        # A worker handles its chunk one image at a time
+                        cost = max((self.memory_cost(task[1], method) for task in chunk), default=0)
+                    if not chunk:
+                        break
+                    if pending and self.memory_budget is not None and in_flight + cost > self.memory_budget:
+                        break   # Wait for memory to be freed
+                    pending[executor.submit(resize_chunk, self, chunk, method)] = cost
+                    in_flight += cost
+                    chunk = None
+                if not pending:
+                    break
+                
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    in_flight -= pending.pop(future)
+                    for filename, output_path, original_size, new_size, error, stats in future.result():
+                        done += 1
+                        self.report_result(done, total, filename, original_size, new_size, error, stats)
+    
+    def report_result(self, done, total, filename, original_size, new_size, error, stats=None):
+        """Print one line of progress and update the counts and run report"""
+        position = f"{done}/{total}" if total else f"{done}"
+        if error:
+            print(f"[{position}] {filename}: Error processing image: {error}")
+            self.error_count += 1
+            if self.run_report:
+                self.run_report.add_error()
+        else:
+            print(f"[{position}] {filename}: {describe_size(original_size)} -> {describe_size(new_size)}")
+            self.processed_count += 1
+            if self.manifest:
+                self.manifest.done(filename)
+            if self.run_report and stats:
+                self.run_report.add(stats)
+    
+    def print_summary(self, title):
+        """Print the counts at the end of a batch"""
+        if not (self.processed_count or self.skipped_count or self.error_count):
             print("No image files found in the input folder!")
             return
+        print("\n" + "="*60)
+        print(title)
+        print("="*60)
+        print(f"Successfully processed: {self.processed_count} image(s)")
+        if self.skipped_count:
+            print(f"Skipped (unchanged): {self.skipped_count} image(s)")
+        print(f"Errors encountered: {self.error_count} image(s)")
+        print(f"Output folder: {self.output_folder}")
+        
+        if not self.run_report:
+            return
+        report = self.run_report.finish(self.skipped_count)
+        if report['images']:
+            print("Time per stage: " + ", ".join(
+                f"{stage} {timing['share']:.0%} (p50 {timing['p50_ms']:.1f} ms)"
+                for stage, timing in report['stages'].items()))
+            print(f"Throughput: {report['images_per_second']:.1f} images/s, "
+                  f"{report['bytes_in'] / 2**20:.1f} MB in, {report['bytes_out'] / 2**20:.1f} MB out, "
+                  f"CPU {report['cpu_utilization']:.0%} busy")
+        if self.report_path:
+            self.run_report.write(self.report_path, report)
+            print(f"Run report: {self.report_path}")
+    
+    def batch_resize(self):
+        """
+        Process all images in the input folder
+        """
+        # Create output folder if it doesn't exist
+        os.makedirs(self.output_folder, exist_ok=True)
         
-        print(f"\nFound {len(image_files)} image(s) to process")
+        # Images are found and processed as the folders are walked
+        print(f"\nProcessing images in '{self.input_folder}'")
         print(f"Target dimensions: {self.width}x{self.height}")
         print(f"Maintain aspect ratio: {self.maintain_aspect}")
+        if self.workers > 1:
+            print(f"Worker processes: {self.workers}")
         print("="*60)
         
-        # Process each image
-        for idx, filename in enumerate(image_files, 1):
-            print(f"\n[{idx}/{len(image_files)}] Processing: {filename}")
-            
-            input_path = os.path.join(self.input_folder, filename)
-            output_path = os.path.join(self.output_folder, filename)
-            
-            self.resize_image(input_path, output_path)
+        self.run_report = RunReport('resize_file', self.workers)
+        tasks = self.select_tasks(self.iter_tasks(), 'resize_file')
+        
+        try:
+            if self.workers > 1:
+                self.resize_parallel(tasks)
+            else:
+                # Process each image
+                for idx, (filename, input_path, output_path) in enumerate(tasks, 1):
+                    print(f"\n[{idx}] Processing: {filename}")
+                    if self.resize_image(input_path, output_path) and self.manifest:
+                        self.manifest.done(filename)
+        finally:
+            if self.manifest:
+                self.manifest.save()
         
         # Print summary
-        print("\n" + "="*60)
-        print("PROCESSING COMPLETE")
+        self.print_summary("PROCESSING COMPLETE")
+    
+    def batch_render(self):
+        """
+        Make every rendition, in every format, of all images in the input folder
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+        
+        print(f"\nRendering images in '{self.input_folder}'")
+        print("Renditions: " + ", ".join(f"{r['name']} {r['width']}x{r['height']}" for r in self.renditions))
+        print(f"Formats: {', '.join(self.formats)}")
+        if self.workers > 1:
+            print(f"Worker processes: {self.workers}")
         print("="*60)
-        print(f"Successfully processed: {self.processed_count} image(s)")
-        print(f"Errors encountered: {self.error_count} image(s)")
-        print(f"Output folder: {self.output_folder}")
+        
+        self.run_report = RunReport('render_file', self.workers)
+        tasks = self.select_tasks(self.iter_tasks(), 'render_file')
+        
+        try:
+            if self.workers > 1:
+                self.resize_parallel(tasks, method='render_file')
+            else:
+                for idx, task in enumerate(tasks, 1):
+                    filename, _, original_size, new_size, error, stats = resize_chunk(self, [task], 'render_file')[0]
+                    self.report_result(idx, None, filename, original_size, new_size, error, stats)
+        finally:
+            if self.manifest:
+                self.manifest.save()
+        
+        self.print_summary("RENDERING COMPLETE")
     
-    def convert_format(self, output_format='PNG'):
+    def convert_format(self, output_format='PNG', quality=None, optimize=False):
         """
         Convert images to a different format
         
+        Conversion keeps Pillow's encoder defaults rather than the resize
+        settings (quality=95, optimize), which make larger JPEG/WebP files
+        and much slower PNGs; max_bytes/min_psnr still apply to JPEG/WebP.
+        
         Args:
             output_format: Target format (PNG, JPEG, WEBP, etc.)
+            quality: JPEG/WebP quality (None = the encoder's default)
+            optimize: Extra encoder pass for smaller JPEG/PNG files (slower)
         """
+        output_format = output_format.upper()
+        options = {}
+        if quality is not None:
+            options['quality'] = quality
+        if optimize:
+            options['optimize'] = True
         os.makedirs(self.output_folder, exist_ok=True)
         image_files = self.get_image_files()
         
@@ -150,12 +829,16 @@ class ImageResizer:
             output_path = os.path.join(self.output_folder, new_filename)
             
             try:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
                 with Image.open(input_path) as img:
                     # Convert RGBA to RGB if saving as JPEG
-                    if output_format.upper() == 'JPEG' and img.mode == 'RGBA':
+                    if output_format == 'JPEG' and img.mode == 'RGBA':
                         img = img.convert('RGB')
                     
-                    img.save(output_path, format=output_format)
+                    if output_format in ('JPEG', 'WEBP') and (self.max_bytes is not None or self.min_psnr is not None):
+                        self.save_image(img, output_path, output_format)
+                    else:
+                        img.save(output_path, format=output_format, **options)
                     print(f"  Converted to: {new_filename}")
                     self.processed_count += 1
                     
@@ -179,6 +862,7 @@ def main():
     width = 800
     height = 600
     maintain_aspect = True
+    workers = os.cpu_count() or 1
     
     # Check if input folder exists, create example if not
     if not os.path.exists(input_folder):
@@ -211,19 +895,27 @@ def main():
         if aspect_input == 'n':
             maintain_aspect = False
         
+        workers_input = input(f"Worker processes (default: {workers}): ").strip()
+        if workers_input:
+            workers = int(workers_input)
+        
     except ValueError:
         print("Invalid input! Using default values.")
     
     # Create resizer and process images
-    resizer = ImageResizer(input_folder, output_folder, width, height, maintain_aspect)
+    resizer = ImageResizer(input_folder, output_folder, width, height, maintain_aspect, workers,
+                           report_path=os.path.join(output_folder, 'run-report.json'))
     
     print("\nOptions:")
     print("1. Resize images")
     print("2. Convert format")
+    print("3. Make renditions (" + ", ".join(r['name'] for r in DEFAULT_RENDITIONS) + " as JPEG and WebP)")
     
-    choice = input("\nSelect option (1 or 2, default: 1): ").strip()
+    choice = input("\nSelect option (1, 2 or 3, default: 1): ").strip()
     
-    if choice == '2':
+    if choice == '3':
+        resizer.batch_render()
+    elif choice == '2':
         format_input = input("Enter target format (PNG, JPEG, WEBP, default: PNG): ").strip().upper()
         output_format = format_input if format_input else 'PNG'
         resizer.convert_format(output_format)
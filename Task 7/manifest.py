@@ -0,0 +1,76 @@
+"""
+Processing manifest for the Image Resizer.
+Remembers, per source image, a hash of its content, the settings it was
+processed with and the files it produced, so a rerun only processes images
+that are new, changed, processed with other settings or missing an output.
+"""
+
+import hashlib
+import json
+import os
+
+
+def file_hash(path, block_size=1024 * 1024):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    JSON file of {source name: {hash, size, mtime, params, outputs}}.
+
+    The content hash decides whether a source changed. Size and mtime are
+    only a shortcut: while they match the stored ones, the file is not
+    read again, so checking an unchanged folder costs one stat per image.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._pending = {}   # name -> entry, until the image is processed
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass   # Missing or unreadable: everything is processed
+
+    def up_to_date(self, name, input_path, params, outputs):
+        """
+        Check whether a source was already processed with these params.
+        If not, remember what it looks like now; call done() once it has
+        been processed.
+        """
+        stat = os.stat(input_path)
+        entry = self.entries.get(name)
+        current = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'params': params, 'outputs': outputs}
+
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            current['hash'] = entry['hash']
+        else:
+            current['hash'] = file_hash(input_path)
+
+        if (entry is not None and entry['hash'] == current['hash'] and entry['params'] == params
+                and entry['outputs'] == outputs and all(os.path.exists(path) for path in outputs)):
+            # Touched but unchanged files get their new mtime recorded
+            self.entries[name] = current
+            return True
+
+        self._pending[name] = current
+        return False
+
+    def done(self, name):
+        """Record a source as processed"""
+        entry = self._pending.pop(name, None)
+        if entry is not None:
+            self.entries[name] = entry
+
+    def save(self):
+        """Write the manifest atomically"""
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp, self.path)
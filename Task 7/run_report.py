@@ -0,0 +1,103 @@
+"""
+Run report for the Image Resizer.
+Collects per-image stage timings (decode, resample, encode) and byte counts
+from a batch and summarises them as JSON, to show where the time goes:
+
+    resizer = ImageResizer('images', 'output', report_path='output/run-report.json')
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+# Stages timed for every image, in order
+STAGES = ('decode', 'resample', 'encode')
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class RunReport:
+    """
+    Stage timings and totals for one batch.
+
+    CPU time is read from os.times(), which counts worker processes once
+    the pool has shut down. CPU seconds close to wall seconds x workers
+    means the batch was CPU-bound; much lower means it was waiting on I/O.
+    """
+
+    def __init__(self, method, workers):
+        self.method = method
+        self.workers = workers
+        self.started = datetime.now()
+        self.stages = {stage: [] for stage in STAGES}
+        self.images = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._start = time.perf_counter()
+        self._cpu_start = self.cpu_seconds()
+
+    @staticmethod
+    def cpu_seconds():
+        """User + system time of this process and its finished children"""
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    def add(self, stats):
+        """Record one processed image: stage seconds plus bytes_in and bytes_out"""
+        self.images += 1
+        for stage in STAGES:
+            self.stages[stage].append(stats.get(stage, 0.0))
+        self.bytes_in += stats.get('bytes_in', 0)
+        self.bytes_out += stats.get('bytes_out', 0)
+
+    def add_error(self):
+        self.errors += 1
+
+    def finish(self, skipped=0):
+        """Return the report as a dict"""
+        wall = time.perf_counter() - self._start
+        cpu = self.cpu_seconds() - self._cpu_start
+        stage_total = sum(sum(samples) for samples in self.stages.values()) or 1e-9
+        return {
+            'method': self.method,
+            'started': self.started.isoformat(timespec='seconds'),
+            'workers': self.workers,
+            'images': self.images,
+            'errors': self.errors,
+            'skipped': skipped,
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(cpu, 4),
+            'cpu_utilization': round(cpu / (wall * self.workers), 3) if wall else 0.0,
+            'images_per_second': round(self.images / wall, 3) if wall else 0.0,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'stages': {
+                stage: {
+                    'total_seconds': round(sum(samples), 4),
+                    'share': round(sum(samples) / stage_total, 3),
+                    'mean_ms': round(sum(samples) / len(samples) * 1e3, 3) if samples else 0.0,
+                    'p50_ms': round(percentile(samples, 0.50) * 1e3, 3),
+                    'p90_ms': round(percentile(samples, 0.90) * 1e3, 3),
+                    'p99_ms': round(percentile(samples, 0.99) * 1e3, 3),
+                    'max_ms': round(max(samples, default=0.0) * 1e3, 3),
+                }
+                for stage, samples in self.stages.items()
+            },
+        }
+
+    def write(self, path, report):
+        """Write a finished report as JSON"""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
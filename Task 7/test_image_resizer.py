@@ -0,0 +1,225 @@
+"""
+Tests for the Image Resizer
+Run with: python -m unittest test_image_resizer (or pytest)
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+import benchmark
+from image_resizer import MANIFEST_NAMES, ImageResizer
+from manifest import Manifest
+
+
+def noisy_image(width=160, height=120):
+    """A detailed image, so JPEG quality makes a visible difference in size"""
+    return Image.effect_noise((width, height), 64).convert('RGB')
+
+
+class SearchQualityTest(unittest.TestCase):
+    """Quality search for max_bytes / min_psnr"""
+
+    def search(self, **settings):
+        resizer = ImageResizer('images', 'output', **settings)
+        return resizer.search_quality(noisy_image(), 'JPEG')
+
+    def test_fits_max_bytes(self):
+        data, quality = self.search(quality=95, max_bytes=9000)
+        self.assertLessEqual(len(data), 9000)
+        self.assertTrue(40 <= quality < 95)
+
+    def test_never_below_min_quality_when_quality_is_the_floor(self):
+        data, quality = self.search(quality=40, min_quality=40, max_bytes=1000)
+        self.assertEqual(quality, 40)
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (160, 120))
+
+    def test_never_below_zero(self):
+        _, quality = self.search(quality=0, min_quality=0, max_bytes=1)
+        self.assertEqual(quality, 0)
+
+    def test_never_below_min_quality_after_psnr_search(self):
+        # Any quality reaches 0 dB, so the PSNR search settles at the floor
+        _, quality = self.search(quality=95, min_quality=30, min_psnr=0, max_bytes=1)
+        self.assertEqual(quality, 30)
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    """Decoding oversized images within memory_budget"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def save(self, name, **options):
+        path = os.path.join(self.folder.name, name)
+        noisy_image(1200, 900).save(path, **options)
+        return path
+
+    def check_bands(self, path):
+        resizer = ImageResizer(self.folder.name, self.folder.name, 100, 75, memory_budget=2 * 2**20)
+        with Image.open(path) as img:
+            strategy, (factor, rows), _ = resizer.decode_plan(img, (100, 75))
+            self.assertEqual(strategy, 'bands')
+            self.assertLess(rows, img.height)
+            banded = resizer.decode_within_budget(img, (100, 75))
+        with Image.open(path) as img:
+            self.assertEqual(banded.tobytes(), img.reduce(factor).tobytes())
+
+    def test_bmp_in_bands(self):
+        self.check_bands(self.save('big.bmp'))
+
+    def test_tiff_in_bands(self):
+        self.check_bands(self.save('big.tiff'))
+
+    def test_budget_is_part_of_the_manifest_key(self):
+        unlimited = ImageResizer('images', 'output').output_settings('resize_file', 'output/a.jpg')[0]
+        limited = ImageResizer('images', 'output', memory_budget=2**26).output_settings('resize_file', 'output/a.jpg')[0]
+        self.assertNotEqual(unlimited, limited)
+
+
+@unittest.skipUnless(os.path.isdir('/proc/self'), "peak RSS is read from /proc")
+class PeakMemoryTest(unittest.TestCase):
+    """Peak RSS of a whole batch, JPEG, TIFF and BMP, measured in a child process"""
+
+    BUDGET = 16 * 2**20
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.TemporaryDirectory()
+        cls.input = os.path.join(cls.folder.name, 'large')
+        cls.output = os.path.join(cls.folder.name, 'output')
+        benchmark.make_large_samples(cls.input, 3, 4000, 3000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.folder.cleanup()
+
+    def peak(self, workers, memory_budget):
+        return benchmark.peak_memory(self.input, self.output, workers, 800, 600, memory_budget)[1]
+
+    def test_unlimited_batch_exceeds_the_budget(self):
+        # Otherwise the checks below would prove nothing
+        self.assertGreater(self.peak(1, None), 2 * self.BUDGET)
+
+    def test_sequential_peak_within_budget(self):
+        self.assertLessEqual(self.peak(1, self.BUDGET), self.BUDGET)
+
+    def test_parallel_peak_within_budget(self):
+        self.assertLessEqual(self.peak(2, self.BUDGET), self.BUDGET)
+
+
+class IncrementalTest(unittest.TestCase):
+    """Which images a rerun processes again, according to the manifest"""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.input = os.path.join(folder.name, 'in')
+        self.output = os.path.join(folder.name, 'out')
+        os.makedirs(self.input)
+        for index, name in enumerate(('a.jpg', 'b.png', 'c.jpg')):
+            noisy_image(160 + index, 120).save(os.path.join(self.input, name))
+
+    def run_batch(self, method='batch_resize', width=80, **settings):
+        resizer = ImageResizer(self.input, self.output, width, 60, **settings)
+        with contextlib.redirect_stdout(io.StringIO()):
+            getattr(resizer, method)()
+        return resizer.processed_count, resizer.skipped_count, resizer.error_count
+
+    def manifest(self, method='resize_file'):
+        return Manifest(os.path.join(self.output, MANIFEST_NAMES[method])).entries
+
+    def test_rerun_skips_every_image(self):
+        self.assertEqual(self.run_batch(), (3, 0, 0))
+        self.assertEqual(self.run_batch(), (0, 3, 0))
+        self.assertEqual(self.run_batch('batch_render'), (3, 0, 0))
+        self.assertEqual(self.run_batch('batch_render'), (0, 3, 0))
+
+    def test_touched_but_unchanged_source_is_skipped(self):
+        self.run_batch()
+        path = os.path.join(self.input, 'a.jpg')
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(self.run_batch(), (0, 3, 0))
+        self.assertEqual(self.manifest()['a.jpg']['mtime'], 0)
+
+    def test_changed_settings_reprocess(self):
+        self.run_batch()
+        for settings in ({'width': 40}, {'quality': 80}):
+            with self.subTest(**settings):
+                self.assertEqual(self.run_batch(**settings), (3, 0, 0))
+                self.assertEqual(self.run_batch(**settings), (0, 3, 0))
+                self.run_batch()
+
+    def test_changed_format_reprocesses(self):
+        self.run_batch('batch_render', formats=('JPEG',))
+        self.assertEqual(self.run_batch('batch_render', formats=('JPEG', 'WEBP')), (3, 0, 0))
+        self.assertEqual(self.run_batch('batch_render', formats=('JPEG', 'WEBP')), (0, 3, 0))
+
+    def test_modified_source_reprocesses(self):
+        self.run_batch()
+        noisy_image(200, 150).save(os.path.join(self.input, 'b.png'))
+        self.assertEqual(self.run_batch(), (1, 2, 0))
+        with Image.open(os.path.join(self.output, 'b.png')) as img:
+            self.assertEqual(img.size, (80, 60))
+
+    def test_deleted_output_reprocesses(self):
+        self.run_batch()
+        os.remove(os.path.join(self.output, 'c.jpg'))
+        self.assertEqual(self.run_batch(), (1, 2, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'c.jpg')))
+
+    def test_failed_image_is_not_recorded(self):
+        with open(os.path.join(self.input, 'broken.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.run_batch(workers=workers)[2], 1)
+                self.assertNotIn('broken.jpg', self.manifest())
+        # Retried on every run, while the others are skipped
+        self.assertEqual(self.run_batch(), (0, 3, 1))
+
+
+class ConvertFormatTest(unittest.TestCase):
+    """convert_format keeps the encoder defaults, not the resize settings"""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.input = os.path.join(folder.name, 'in')
+        self.output = os.path.join(folder.name, 'out')
+        os.makedirs(self.input)
+        # Smooth with some detail, like a photo
+        self.image = Image.merge('RGB', (Image.linear_gradient('L').resize((320, 240)),
+                                         Image.radial_gradient('L').resize((320, 240)),
+                                         Image.effect_noise((320, 240), 16)))
+        self.image.save(os.path.join(self.input, 'photo.png'))
+
+    def convert(self, output_format, **options):
+        resizer = ImageResizer(self.input, self.output, incremental=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            resizer.convert_format(output_format, **options)
+        self.assertEqual(resizer.error_count, 0)
+        return os.path.getsize(os.path.join(self.output, f"photo.{output_format.lower()}"))
+
+    def default_size(self, output_format, **options):
+        buffer = io.BytesIO()
+        self.image.save(buffer, format=output_format, **options)
+        return len(buffer.getvalue())
+
+    def test_sizes_do_not_regress(self):
+        for output_format in ('JPEG', 'WEBP', 'PNG'):
+            with self.subTest(output_format=output_format):
+                self.assertLessEqual(self.convert(output_format), self.default_size(output_format))
+
+    def test_quality_when_asked(self):
+        self.assertEqual(self.convert('JPEG', quality=95), self.default_size('JPEG', quality=95))
+        self.assertGreater(self.convert('JPEG', quality=95), self.default_size('JPEG'))
+
+
+if __name__ == '__main__':
+    unittest.main()